@@ -0,0 +1,101 @@
+"""
+Synthetic Module Corpus
+
+Generates context modules shaped like the real ones (prioritized
+`## Context:` blocks separated by `---`) so the pipeline can be benchmarked
+at any corpus size. Output is fully determined by the seed.
+"""
+
+import os
+import random
+from typing import List
+
+TOPICS = [
+    "Authentication", "Caching", "Deployment", "Logging", "Pagination",
+    "Rate Limiting", "Retries", "Schema Migrations", "Search", "Testing",
+    "Accessibility", "Error Handling", "Feature Flags", "Observability", "Queues",
+]
+
+VOCABULARY = (
+    "module context service request response client server handler config "
+    "token cache query index record batch worker thread process latency error "
+    "retry policy schema field value model prompt output input stream buffer"
+).split()
+
+# Filler the optimizers are expected to remove
+FILLER = ["basically", "really", "very", "just", "actually", "simply"]
+
+
+def _paragraph(rng: random.Random, words: int, terms: List[str]) -> str:
+    tokens = []
+    for i in range(words):
+        if i % 17 == 0:
+            tokens.append(rng.choice(terms))
+        elif i % 11 == 0:
+            tokens.append(rng.choice(FILLER))
+        else:
+            tokens.append(rng.choice(VOCABULARY))
+    return " ".join(tokens).capitalize() + "."
+
+
+def generate_module(rng: random.Random, blocks: int, words_per_block: int) -> str:
+    """
+    Generate the content of one synthetic module.
+
+    Args:
+        rng: Seeded random generator
+        blocks: Number of context blocks
+        words_per_block: Approximate words in each block
+
+    Returns:
+        Module content
+    """
+    sections = []
+    for index in range(blocks):
+        topic = rng.choice(TOPICS)
+        terms = [topic.replace(" ", ""), f"{topic.split()[0]}Manager", "ContextModule"]
+        priority = ("high", "medium", "low")[index % 3]
+        paragraph = _paragraph(rng, words_per_block, terms)
+
+        # Repeat a sentence so deduplication has something to remove
+        repeated = f"Always validate {terms[0]} input before use."
+        sections.append(
+            f"#priority: {priority}\n"
+            f"## Context: {topic}\n"
+            f"<context name=\"{terms[0]}\">\n{paragraph}\n{repeated}\n{repeated}\n</context>\n"
+        )
+
+    return "\n---\n".join(sections)
+
+
+def generate_corpus(
+    output_dir: str,
+    num_modules: int,
+    blocks_per_module: int = 4,
+    words_per_block: int = 150,
+    seed: int = 0
+) -> List[str]:
+    """
+    Write a synthetic corpus of context modules.
+
+    Args:
+        output_dir: Directory to write modules into
+        num_modules: Number of modules to generate
+        blocks_per_module: Context blocks per module
+        words_per_block: Approximate words in each block
+        seed: Seed for the generated content
+
+    Returns:
+        File names of the generated modules
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    rng = random.Random(seed)
+    names = []
+
+    for index in range(num_modules):
+        name = f"bench-module-{index:05d}.md"
+        with open(os.path.join(output_dir, name), 'w', encoding='utf-8') as f:
+            f.write(generate_module(rng, blocks_per_module, words_per_block))
+        names.append(name)
+
+    return names
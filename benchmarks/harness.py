@@ -0,0 +1,209 @@
+"""
+Benchmark Harness
+
+Measures pipeline stages: wall time, throughput, per-item latency
+percentiles and peak traced memory, plus comparison of a run against a saved
+baseline to catch regressions.
+"""
+
+import time
+import functools
+import tracemalloc
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+# Metrics compared against the baseline and whether higher values are better
+COMPARED_METRICS = {
+    "throughput": True,
+    "p50_ms": False,
+    "p95_ms": False,
+    "peak_memory_mb": False,
+}
+
+# Absolute changes below these are treated as noise, whatever the relative change
+NOISE_FLOORS = {
+    "p50_ms": 1.0,
+    "p95_ms": 1.0,
+    "peak_memory_mb": 1.0,
+}
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """
+    Compute a percentile with linear interpolation.
+
+    Args:
+        values: Sample values
+        pct: Percentile between 0 and 100
+
+    Returns:
+        Percentile value (0.0 for no samples)
+    """
+    if not values:
+        return 0.0
+
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100
+    lower = int(rank)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (rank - lower)
+
+
+class StageRecorder:
+    """
+    Collects per-item latencies for one stage.
+
+    Wrap the function handling a single item with timed() (or timed_async()
+    for coroutines); the wrappers are safe to call from several threads.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.latencies: List[float] = []
+        self.items = 0
+
+    def record(self, seconds: float) -> None:
+        """Record the latency of one item."""
+        self.latencies.append(seconds)
+
+    def timed(self, fn: Callable) -> Callable:
+        """Wrap a function so each call is recorded as one item."""
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.record(time.perf_counter() - start)
+        return wrapper
+
+    def timed_async(self, fn: Callable) -> Callable:
+        """Wrap a coroutine function so each call is recorded as one item."""
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await fn(*args, **kwargs)
+            finally:
+                self.record(time.perf_counter() - start)
+        return wrapper
+
+
+@contextmanager
+def measure_stage(name: str, results: Dict[str, Dict[str, Any]]) -> Iterator[StageRecorder]:
+    """
+    Measure a stage and store its metrics in `results[name]`.
+
+    The stage's item count defaults to the number of recorded latencies;
+    set `recorder.items` when items are not timed one by one. Peak memory is
+    the traced allocation high-water mark above what was already allocated
+    when the stage started, reported when tracemalloc is tracing.
+
+    Args:
+        name: Stage name
+        results: Dictionary receiving the stage metrics
+    """
+    recorder = StageRecorder(name)
+    tracing = tracemalloc.is_tracing()
+    start_memory = 0
+    if tracing:
+        tracemalloc.reset_peak()
+        start_memory = tracemalloc.get_traced_memory()[0]
+
+    start = time.perf_counter()
+    yield recorder
+    elapsed = time.perf_counter() - start
+
+    items = recorder.items or len(recorder.latencies)
+    latencies_ms = [latency * 1000 for latency in recorder.latencies]
+
+    results[name] = {
+        "items": items,
+        "seconds": round(elapsed, 4),
+        "throughput": round(items / elapsed, 2) if elapsed > 0 else 0.0,
+        "p50_ms": round(percentile(latencies_ms, 50), 3),
+        "p95_ms": round(percentile(latencies_ms, 95), 3),
+        "peak_memory_mb": (
+            round((tracemalloc.get_traced_memory()[1] - start_memory) / (1024 * 1024), 2) if tracing else None
+        ),
+    }
+
+
+def compare_to_baseline(
+    results: Dict[str, Dict[str, Any]],
+    baseline: Dict[str, Dict[str, Any]],
+    tolerance: float = 0.2
+) -> List[Dict[str, Any]]:
+    """
+    Find metrics that regressed by more than the tolerance.
+
+    Args:
+        results: Stage metrics of the current run
+        baseline: Stage metrics of the baseline run
+        tolerance: Allowed relative change in the wrong direction (0.2 = 20%);
+            changes smaller than the metric's noise floor are ignored
+
+    Returns:
+        List of regressions with the stage, metric, baseline and current values
+    """
+    regressions = []
+
+    for stage, metrics in results.items():
+        reference = baseline.get(stage)
+        if not reference:
+            continue
+
+        for metric, higher_is_better in COMPARED_METRICS.items():
+            current, previous = metrics.get(metric), reference.get(metric)
+            if not current or not previous:
+                continue
+
+            if abs(current - previous) < NOISE_FLOORS.get(metric, 0):
+                continue
+
+            change = (current - previous) / previous
+            if (higher_is_better and change < -tolerance) or (not higher_is_better and change > tolerance):
+                regressions.append({
+                    "stage": stage,
+                    "metric": metric,
+                    "baseline": previous,
+                    "current": current,
+                    "change_percent": round(change * 100, 1),
+                })
+
+    return regressions
+
+
+def format_report(results: Dict[str, Dict[str, Any]], regressions: Optional[List[Dict[str, Any]]] = None) -> str:
+    """
+    Format stage metrics (and any regressions) as a text table.
+
+    Args:
+        results: Stage metrics
+        regressions: Optional regressions found against a baseline
+
+    Returns:
+        Report text
+    """
+    lines = [
+        f"{'stage':<18}{'items':>8}{'seconds':>10}{'items/s':>11}{'p50 ms':>10}{'p95 ms':>10}{'peak MB':>10}",
+    ]
+    for stage, m in results.items():
+        peak = "-" if m["peak_memory_mb"] is None else f"{m['peak_memory_mb']:.2f}"
+        lines.append(
+            f"{stage:<18}{m['items']:>8}{m['seconds']:>10.2f}{m['throughput']:>11.2f}"
+            f"{m['p50_ms']:>10.2f}{m['p95_ms']:>10.2f}{peak:>10}"
+        )
+
+    if regressions is not None:
+        lines.append("")
+        if regressions:
+            lines.append("Regressions against baseline:")
+            for r in regressions:
+                lines.append(
+                    f"  {r['stage']}.{r['metric']}: {r['baseline']} -> {r['current']} ({r['change_percent']:+.1f}%)"
+                )
+        else:
+            lines.append("No regressions against baseline.")
+
+    return "\n".join(lines)
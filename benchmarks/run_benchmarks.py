@@ -0,0 +1,405 @@
+#!/usr/bin/env python3
+"""
+End-to-End Pipeline Benchmark
+
+Generates a synthetic module corpus and drives optimize -> evaluate -> apply
+plus the feedback database against the fake LLM provider, reporting
+throughput, p50/p95 latency and peak memory per stage. Results can be saved
+as a baseline and later runs compared against it to catch regressions. The
+startup stage times CLI commands that don't call a model, in fresh
+interpreters, against a budget on top of the interpreter's own startup.
+
+Usage:
+    python benchmarks/run_benchmarks.py --modules 50 --workers 4
+    python benchmarks/run_benchmarks.py --save-baseline benchmarks/baseline.json
+    python benchmarks/run_benchmarks.py --baseline benchmarks/baseline.json
+"""
+
+import os
+import sys
+import copy
+import json
+import time
+import shutil
+import logging
+import argparse
+import platform
+import tempfile
+import subprocess
+import tracemalloc
+from datetime import datetime
+from typing import Any, Dict, List
+
+import yaml
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(BENCHMARK_DIR)
+
+# Add the project root and scripts directory to the path
+sys.path.append(PROJECT_ROOT)
+sys.path.append(os.path.join(PROJECT_ROOT, "scripts"))
+
+from corpus import generate_corpus
+from harness import measure_stage, compare_to_baseline, format_report, percentile
+
+STAGES = ["startup", "optimize", "evaluate", "apply", "feedback_ingest", "feedback_query"]
+
+# optimize_context.py commands that never call a model and so must start without loading DSPy
+STARTUP_COMMANDS = {
+    "list": ["list"],
+    "feedback": ["feedback", "--module", "bench-module-00000.md", "--type", "positive", "--score", "8"],
+    "identify": ["identify"],
+    "export": ["export"],
+}
+
+# Stages that need another stage's output; prerequisites run but are only reported if requested
+PREREQUISITES = {
+    "evaluate": "optimize",
+    "apply": "optimize",
+    "feedback_query": "feedback_ingest",
+}
+
+
+def build_config(base_config_path: str, workspace: str, args: argparse.Namespace) -> Dict[str, Any]:
+    """
+    Derive a benchmark configuration from the project configuration.
+
+    All paths point into the workspace and every stage uses the fake
+    provider with the requested latency and error injection.
+
+    Args:
+        base_config_path: Path to the project DSP configuration
+        workspace: Temporary benchmark directory
+        args: Parsed command line arguments
+
+    Returns:
+        Configuration dictionary
+    """
+    with open(base_config_path, 'r') as f:
+        config = copy.deepcopy(yaml.safe_load(f))
+
+    paths = config.setdefault("paths", {})
+    paths.update({
+        "original_modules_dir": os.path.join(workspace, "modules"),
+        "optimized_modules_dir": os.path.join(workspace, "optimized"),
+        "backup_modules_dir": os.path.join(workspace, "backups"),
+        "evaluation_dir": os.path.join(workspace, "evaluation"),
+        "logs_dir": os.path.join(workspace, "logs"),
+        "database_path": os.path.join(workspace, "context_feedback.db"),
+        "manifest_path": os.path.join(workspace, "optimization_manifest.json"),
+    })
+
+    fake_model = {
+        "name": "fake-bench",
+        "provider": "fake",
+        "temperature": 0.0,
+        "max_tokens": 4096,
+        "latency_ms": args.latency_ms,
+        "jitter_ms": args.jitter_ms,
+        "error_rate": args.error_rate,
+        "seed": args.seed,
+    }
+    models = config.setdefault("models", {})
+    models["options"] = [m for m in models.get("options", []) if m.get("name") != fake_model["name"]] + [fake_model]
+    models["default"] = fake_model["name"]
+
+    config.setdefault("dsp", {}).setdefault("lm_config", {})["max_workers"] = args.workers
+    config["cache"] = {**config.get("cache", {}), "enabled": args.cache,
+                       "path": os.path.join(workspace, "llm_cache.db")}
+
+    evaluation = config.setdefault("evaluation", {})
+    evaluation["backend"] = "native"
+    evaluation.setdefault("promptfoo", {})["max_concurrent"] = args.workers
+    evaluation["native"] = {"max_workers": args.workers}
+
+    # Settings read by scripts/context (evaluation backend)
+    config["optimized_dir"] = paths["optimized_modules_dir"]
+    config["backup_dir"] = os.path.join(workspace, "backups", "context")
+    config["dspy"] = {"model": fake_model["name"], **fake_model}
+
+    return config
+
+
+def _imports_dspy(argv: List[str]) -> bool:
+    """Run a command with -X importtime and check whether it imported DSPy."""
+    process = subprocess.run([sys.executable, "-X", "importtime", *argv],
+                             capture_output=True, text=True, check=True)
+    return any(
+        line.rsplit("|", 1)[-1].strip() == "dspy"
+        for line in process.stderr.splitlines() if line.startswith("import time:")
+    )
+
+
+def bench_startup(config_path: str, config: Dict[str, Any], args, results: Dict) -> None:
+    """Time optimize_context.py commands that don't call a model, each in a fresh interpreter."""
+    script = os.path.join(PROJECT_ROOT, "scripts", "optimize_context.py")
+    commands = {
+        name: [script, "--log-level", "error", *command, "--config", config_path]
+        for name, command in STARTUP_COMMANDS.items()
+    }
+
+    def run(argv: List[str]) -> float:
+        start = time.perf_counter()
+        subprocess.run([sys.executable, *argv], check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        return time.perf_counter() - start
+
+    # The interpreter's own startup is the floor no command can get under.
+    # Rounds alternate between it and every command, so a burst of load on the
+    # machine slows all of them a little rather than one command's every run.
+    interpreter_ms = []
+    command_ms = {name: [] for name in commands}
+
+    with measure_stage("startup", results) as recorder:
+        for _ in range(args.startup_runs):
+            interpreter_ms.append(run(["-c", "pass"]) * 1000)
+            for name, argv in commands.items():
+                seconds = run(argv)
+                recorder.record(seconds)
+                command_ms[name].append(seconds * 1000)
+
+    results["startup"]["interpreter_p50_ms"] = round(percentile(interpreter_ms, 50), 1)
+    results["startup"]["command_p50_ms"] = {
+        name: round(percentile(timings, 50), 1) for name, timings in command_ms.items()
+    }
+    results["startup"]["dspy_loaded_by"] = [name for name, argv in commands.items() if _imports_dspy(argv)]
+
+
+def check_startup(metrics: Dict[str, Any], budget_ms: float) -> List[str]:
+    """
+    Check the startup stage against its budget.
+
+    The budget is measured on top of the interpreter's own startup, recorded in
+    the same run, so it holds on slower machines and interpreters.
+
+    Args:
+        metrics: Metrics of the startup stage
+        budget_ms: Maximum median wall time per command beyond the interpreter's
+            (0 disables the time check)
+
+    Returns:
+        Descriptions of the commands over budget or loading DSPy
+    """
+    failures = [f"{name} imports dspy" for name in metrics["dspy_loaded_by"]]
+    if budget_ms:
+        limit_ms = metrics["interpreter_p50_ms"] + budget_ms
+        failures += [
+            f"{name} took {ms:.1f} ms (budget {budget_ms:.0f} ms over the "
+            f"{metrics['interpreter_p50_ms']:.1f} ms interpreter startup)"
+            for name, ms in metrics["command_p50_ms"].items() if ms > limit_ms
+        ]
+    return failures
+
+
+def bench_optimize(config_path: str, config: Dict[str, Any], args, results: Dict) -> None:
+    """Optimize every module with ContextOptimizer.batch_optimize."""
+    from context_pipeline import ContextOptimizer
+
+    optimizer = ContextOptimizer(config_path, use_cache=args.cache)
+
+    with measure_stage("optimize", results) as recorder:
+        optimizer.optimize_module = recorder.timed(optimizer.optimize_module)
+        outcome = optimizer.batch_optimize(max_modules=args.modules, workers=args.workers)
+
+    results["optimize"]["failed"] = outcome["failed"]
+
+
+def bench_evaluate(config_path: str, config: Dict[str, Any], args, results: Dict) -> None:
+    """Evaluate original vs. optimized modules with the native evaluation backend."""
+    from lib.fake_provider import FakeLM
+    from scripts.context.evaluator import ContextEvaluator
+    from scripts.context.native_evaluator import DSPyModelClient
+
+    fake_model = next(m for m in config["models"]["options"] if m["name"] == config["models"]["default"])
+    evaluator = ContextEvaluator(config_path, model_client=DSPyModelClient(FakeLM.from_config(fake_model)))
+
+    original_dir = config["paths"]["original_modules_dir"]
+    module_paths = [
+        os.path.join(original_dir, name)
+        for name in sorted(os.listdir(config["paths"]["optimized_modules_dir"]))
+    ]
+
+    with measure_stage("evaluate", results) as recorder:
+        evaluator.evaluate_module_async = recorder.timed_async(evaluator.evaluate_module_async)
+        outcome = evaluator.batch_evaluate(module_paths, max_concurrent=args.workers)
+
+    results["evaluate"]["failed"] = len(outcome.get("failed", []))
+
+
+def bench_apply(config_path: str, config: Dict[str, Any], args, results: Dict) -> None:
+    """Apply every optimized module with apply_all_optimizations."""
+    import apply_optimizations
+
+    paths = config["paths"]
+    modules = apply_optimizations.get_modules_to_apply(paths["optimized_modules_dir"], paths["original_modules_dir"])
+    apply_one = apply_optimizations.apply_optimization
+
+    with measure_stage("apply", results) as recorder:
+        apply_optimizations.apply_optimization = recorder.timed(apply_one)
+        try:
+            outcome = apply_optimizations.apply_all_optimizations(
+                modules, paths["backup_modules_dir"], logging.getLogger("benchmark")
+            )
+        finally:
+            apply_optimizations.apply_optimization = apply_one
+
+    results["apply"]["failed"] = outcome["failed"]
+
+
+def bench_feedback(config_path: str, config: Dict[str, Any], args, results: Dict) -> None:
+    """Ingest synthetic feedback events, then query per-module performance."""
+    from feedback_system import ContextFeedback
+
+    feedback = ContextFeedback(config["paths"]["database_path"])
+    module_names = [f"bench-module-{i:05d}" for i in range(args.modules)]
+    feedback_types = ["positive", "positive", "negative", "suggestion"]
+    chunk_size = 1000
+
+    with measure_stage("feedback_ingest", results) as recorder:
+        submit = recorder.timed(lambda writer, chunk: writer.submit_many(chunk))
+        with feedback.buffered_writer() as writer:
+            for start in range(0, args.feedback_events, chunk_size):
+                chunk = [
+                    {
+                        "module_name": module_names[i % len(module_names)],
+                        "model_used": "fake-bench",
+                        "feedback_type": feedback_types[i % len(feedback_types)],
+                        "session_id": f"bench-{i // 100}",
+                    }
+                    for i in range(start, min(start + chunk_size, args.feedback_events))
+                ]
+                submit(writer, chunk)
+        recorder.items = args.feedback_events
+
+    with measure_stage("feedback_query", results) as recorder:
+        get_performance = recorder.timed(feedback.get_module_performance)
+        for name in module_names:
+            get_performance(name)
+        recorder.timed(feedback.get_modules_needing_optimization)()
+
+
+BENCHMARKS = {
+    "startup": bench_startup,
+    "optimize": bench_optimize,
+    "evaluate": bench_evaluate,
+    "apply": bench_apply,
+    "feedback_ingest": bench_feedback,
+}
+
+
+def parse_arguments():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Benchmark the optimize -> evaluate -> apply pipeline")
+    parser.add_argument("--config", type=str, default=os.path.join(PROJECT_ROOT, "config", "dsp_config.yaml"),
+                        help="Base configuration file")
+    parser.add_argument("--modules", type=int, default=20, help="Number of synthetic modules")
+    parser.add_argument("--blocks", type=int, default=4, help="Context blocks per module")
+    parser.add_argument("--words", type=int, default=150, help="Approximate words per block")
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent modules in batch stages")
+    parser.add_argument("--feedback-events", type=int, default=50000, help="Feedback events to ingest")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="Fake provider latency per request")
+    parser.add_argument("--jitter-ms", type=float, default=10.0, help="Fake provider latency jitter")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fake provider error rate")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the corpus and the fake provider")
+    parser.add_argument("--cache", action="store_true", help="Enable the LLM response cache")
+    parser.add_argument("--startup-runs", type=int, default=5, help="Runs per command in the startup stage")
+    parser.add_argument("--startup-budget-ms", type=float, default=100.0,
+                        help="Maximum median startup time per command beyond the interpreter's own "
+                             "(0 disables the check)")
+    parser.add_argument("--stages", type=str, default=",".join(STAGES),
+                        help=f"Comma-separated stages to run ({', '.join(STAGES)})")
+    parser.add_argument("--no-trace-memory", action="store_true",
+                        help="Skip tracemalloc (faster, but no peak memory figures)")
+    parser.add_argument("--output", type=str, help="Write results as JSON")
+    parser.add_argument("--baseline", type=str, help="Compare against a baseline results file")
+    parser.add_argument("--save-baseline", type=str, help="Save this run as a baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="Allowed relative regression against the baseline (0.2 = 20%%)")
+    parser.add_argument("--keep-workspace", action="store_true", help="Keep the generated workspace")
+    parser.add_argument("--verbose", action="store_true", help="Show pipeline logging")
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_arguments()
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING)
+    if not args.verbose:
+        # Pipeline components configure their own INFO handlers
+        logging.disable(logging.INFO)
+
+    stages = [s.strip() for s in args.stages.split(",") if s.strip()]
+    original_cwd = os.getcwd()
+    workspace = tempfile.mkdtemp(prefix="context_bench_")
+    results: Dict[str, Dict[str, Any]] = {}
+
+    try:
+        config = build_config(args.config, workspace, args)
+        config_path = os.path.join(workspace, "dsp_config.yaml")
+        with open(config_path, 'w') as f:
+            yaml.safe_dump(config, f)
+
+        generate_corpus(config["paths"]["original_modules_dir"], args.modules,
+                        args.blocks, args.words, args.seed)
+
+        # Stages run from the workspace so relative paths never touch the project tree
+        os.chdir(workspace)
+
+        if not args.no_trace_memory:
+            tracemalloc.start()
+
+        required = set(stages) | {PREREQUISITES[s] for s in stages if s in PREREQUISITES}
+        for stage, bench in BENCHMARKS.items():
+            if stage in required:
+                bench(config_path, config, args, results)
+
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+    finally:
+        os.chdir(original_cwd)
+        if args.keep_workspace:
+            print(f"Workspace kept at {workspace}")
+        else:
+            shutil.rmtree(workspace, ignore_errors=True)
+
+    results = {stage: metrics for stage, metrics in results.items() if stage in stages}
+
+    startup_failures = check_startup(results["startup"], args.startup_budget_ms) if "startup" in results else []
+
+    regressions = None
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            regressions = compare_to_baseline(results, json.load(f)["stages"], args.tolerance)
+
+    report = {
+        "timestamp": datetime.now().isoformat(),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "parameters": {k: v for k, v in vars(args).items() if k not in ("output", "baseline", "save_baseline")},
+        "stages": results,
+        "regressions": regressions,
+        "startup_failures": startup_failures,
+    }
+
+    print(format_report(results, regressions))
+
+    if "startup" in results:
+        startup = results["startup"]
+        print(f"\nStartup p50 (interpreter alone: {startup['interpreter_p50_ms']:.1f} ms): "
+              + ", ".join(f"{name} {ms:.1f} ms" for name, ms in startup["command_p50_ms"].items()))
+        for failure in startup_failures:
+            print(f"  Startup check failed: {failure}")
+
+    for path in filter(None, [args.output, args.save_baseline]):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Results saved to {path}")
+
+    return 1 if regressions or startup_failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
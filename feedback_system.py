@@ -7,21 +7,34 @@ and provides analysis to prioritize optimization efforts.
 """
 
 import argparse
+import atexit
 import json
 import logging
 import os
+import queue
 import sqlite3
 import sys
+import threading
+import time
 from datetime import datetime
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple, Union
 
+from lib.db import get_connection_manager, ensure_rollup_table
+from lib.stream_export import StreamingExporter
+
 logging.basicConfig(
     level=logging.INFO,
     format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
 )
 logger = logging.getLogger("ContextFeedback")
 
+INSERT_FEEDBACK_SQL = '''
+    INSERT INTO module_feedback 
+    (module_name, model_used, feedback_type, feedback_detail, session_id) 
+    VALUES (?, ?, ?, ?, ?)
+'''
+
 class ContextFeedback:
     """
     Tracks and analyzes feedback data for context modules.
@@ -36,12 +49,13 @@ class ContextFeedback:
             db_path: Path to the SQLite database file
         """
         self.db_path = db_path
+        self._db = get_connection_manager(db_path)
         self._initialize_db()
         logger.info(f"Feedback system initialized with database at {db_path}")
     
     def _initialize_db(self) -> None:
         """Create database tables if they don't exist."""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._db.connection()
         cursor = conn.cursor()
         
         # Table for storing module feedback
@@ -71,8 +85,19 @@ class ContextFeedback:
         )
         ''')
         
+        # Per-module, per-model feedback counts maintained by triggers
+        ensure_rollup_table(
+            conn, "module_feedback_rollup", "module_feedback",
+            key_columns={"module_name": "{row}.module_name", "model_used": "{row}.model_used"},
+            sum_columns={
+                "feedback_count": "1",
+                "negative_count": "CASE WHEN {row}.feedback_type = 'negative' THEN 1 ELSE 0 END",
+                "positive_count": "CASE WHEN {row}.feedback_type = 'positive' THEN 1 ELSE 0 END"
+            },
+            max_columns={"last_feedback_at": "{row}.timestamp"}
+        )
+        
         conn.commit()
-        conn.close()
     
     def add_feedback(
         self, 
@@ -95,21 +120,16 @@ class ContextFeedback:
         Returns:
             ID of the inserted feedback record
         """
-        conn = sqlite3.connect(self.db_path)
+        conn = self._db.connection()
         cursor = conn.cursor()
         
         cursor.execute(
-            '''
-            INSERT INTO module_feedback 
-            (module_name, model_used, feedback_type, feedback_detail, session_id) 
-            VALUES (?, ?, ?, ?, ?)
-            ''', 
+            INSERT_FEEDBACK_SQL, 
             (module_name, model_used, feedback_type, feedback_detail, session_id)
         )
         
         feedback_id = cursor.lastrowid
         conn.commit()
-        conn.close()
         
         logger.info(f"Recorded {feedback_type} feedback for module {module_name}")
         return feedback_id
@@ -124,7 +144,7 @@ class ContextFeedback:
         Returns:
             List of inserted feedback IDs
         """
-        conn = sqlite3.connect(self.db_path)
+        conn = self._db.connection()
         cursor = conn.cursor()
         feedback_ids = []
         
@@ -133,11 +153,7 @@ class ContextFeedback:
             
             for feedback in feedback_data:
                 cursor.execute(
-                    '''
-                    INSERT INTO module_feedback 
-                    (module_name, model_used, feedback_type, feedback_detail, session_id) 
-                    VALUES (?, ?, ?, ?, ?)
-                    ''', 
+                    INSERT_FEEDBACK_SQL, 
                     (
                         feedback.get("module_name"),
                         feedback.get("model_used"),
@@ -153,12 +169,49 @@ class ContextFeedback:
             cursor.execute("ROLLBACK")
             logger.error(f"Error adding batch feedback: {e}")
             raise e
-        finally:
-            conn.close()
         
         logger.info(f"Added {len(feedback_ids)} feedback entries")
         return feedback_ids
     
+    def export_data(
+        self, 
+        output_path: str, 
+        since: Optional[str] = None,
+        output_format: Optional[str] = None
+    ) -> Dict:
+        """
+        Stream feedback and optimization records to an NDJSON or Parquet file.
+        
+        Args:
+            output_path: Path of the export file (.ndjson, .ndjson.gz, .jsonl or .parquet)
+            since: Cursor printed by the previous export, or a timestamp
+            output_format: ndjson or parquet (inferred from the extension if omitted)
+        
+        Returns:
+            Dictionary with output paths, row counts and the cursor for the next export
+        """
+        result = StreamingExporter(self._db.connection()).export(
+            output_path,
+            {"module_feedback": "timestamp", "optimization_results": "timestamp"},
+            since=since,
+            output_format=output_format
+        )
+        
+        logger.info(f"Exported {sum(result['rows'].values())} records to {output_path}")
+        return result
+    
+    def buffered_writer(self, **kwargs) -> "BufferedFeedbackWriter":
+        """
+        Create a buffered writer for high-volume feedback ingestion.
+        
+        Args:
+            **kwargs: Options passed to BufferedFeedbackWriter
+        
+        Returns:
+            Started BufferedFeedbackWriter for this database
+        """
+        return BufferedFeedbackWriter(self.db_path, **kwargs)
+    
     def record_optimization(
         self,
         module_name: str,
@@ -182,7 +235,7 @@ class ContextFeedback:
         Returns:
             ID of the inserted optimization record
         """
-        conn = sqlite3.connect(self.db_path)
+        conn = self._db.connection()
         cursor = conn.cursor()
         
         cursor.execute(
@@ -200,7 +253,6 @@ class ContextFeedback:
         
         result_id = cursor.lastrowid
         conn.commit()
-        conn.close()
         
         logger.info(f"Recorded optimization for {module_name} with {improvement_percent}% improvement")
         return result_id
@@ -216,7 +268,7 @@ class ContextFeedback:
         Returns:
             True if successful, False otherwise
         """
-        conn = sqlite3.connect(self.db_path)
+        conn = self._db.connection()
         cursor = conn.cursor()
         
         cursor.execute(
@@ -232,7 +284,6 @@ class ContextFeedback:
         
         success = cursor.rowcount > 0
         conn.commit()
-        conn.close()
         
         if success:
             logger.info(f"Marked optimization for {module_name} as applied")
@@ -258,18 +309,18 @@ class ContextFeedback:
         Returns:
             List of modules sorted by optimization priority
         """
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
+        conn = self._db.connection()
         cursor = conn.cursor()
+        cursor.row_factory = sqlite3.Row
         
         query = '''
         WITH feedback_counts AS (
             SELECT 
                 module_name,
-                COUNT(*) as total_feedback,
-                SUM(CASE WHEN feedback_type = 'negative' THEN 1 ELSE 0 END) as negative_count,
-                SUM(CASE WHEN feedback_type = 'positive' THEN 1 ELSE 0 END) as positive_count
-            FROM module_feedback
+                SUM(feedback_count) as total_feedback,
+                SUM(negative_count) as negative_count,
+                SUM(positive_count) as positive_count
+            FROM module_feedback_rollup
             GROUP BY module_name
             HAVING total_feedback >= ?
         )
@@ -287,7 +338,6 @@ class ContextFeedback:
         
         cursor.execute(query, (min_feedback_count, threshold, limit))
         results = [dict(row) for row in cursor.fetchall()]
-        conn.close()
         
         logger.info(f"Found {len(results)} modules needing optimization")
         return results
@@ -302,18 +352,18 @@ class ContextFeedback:
         Returns:
             Dictionary with module performance metrics
         """
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
+        conn = self._db.connection()
         cursor = conn.cursor()
+        cursor.row_factory = sqlite3.Row
         
         # Get feedback statistics
         cursor.execute(
             '''
             SELECT 
-                COUNT(*) as total_feedback,
-                SUM(CASE WHEN feedback_type = 'negative' THEN 1 ELSE 0 END) as negative_count,
-                SUM(CASE WHEN feedback_type = 'positive' THEN 1 ELSE 0 END) as positive_count
-            FROM module_feedback
+                COALESCE(SUM(feedback_count), 0) as total_feedback,
+                COALESCE(SUM(negative_count), 0) as negative_count,
+                COALESCE(SUM(positive_count), 0) as positive_count
+            FROM module_feedback_rollup
             WHERE module_name = ?
             ''',
             (module_name,)
@@ -338,7 +388,6 @@ class ContextFeedback:
         )
         optimization_history = [dict(row) for row in cursor.fetchall()]
         
-        conn.close()
         
         return {
             "module_name": module_name,
@@ -356,9 +405,9 @@ class ContextFeedback:
         Returns:
             Dictionary containing the full performance report
         """
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
+        conn = self._db.connection()
         cursor = conn.cursor()
+        cursor.row_factory = sqlite3.Row
         
         # Get overall statistics
         cursor.execute("SELECT COUNT(DISTINCT module_name) as total_modules FROM module_feedback")
@@ -419,7 +468,6 @@ class ContextFeedback:
         )
         recent_optimizations = [dict(row) for row in cursor.fetchall()]
         
-        conn.close()
         
         report = {
             "generated_at": datetime.now().isoformat(),
@@ -441,6 +489,248 @@ class ContextFeedback:
         
         return report
 
+class BufferedFeedbackWriter:
+    """
+    Buffers feedback events in memory and writes them in batches.
+    
+    Events are queued by submit() and written by a background thread with
+    executemany in a single transaction whenever the batch reaches
+    max_batch_size or flush_interval seconds have passed. Pending events are
+    flushed on close() and at interpreter exit.
+    
+    Events missing a required field are rejected when submitted. If a batch
+    still fails to insert, its events are retried one at a time so only the
+    bad ones are dropped.
+    """
+    
+    _STOP = object()
+    
+    def __init__(
+        self,
+        db_path: str = "context_feedback.db",
+        max_batch_size: int = 5000,
+        flush_interval: float = 1.0,
+        max_queue_size: int = 100000
+    ):
+        """
+        Initialize and start the writer.
+        
+        Args:
+            db_path: Path to the SQLite database file
+            max_batch_size: Number of events that triggers a flush
+            flush_interval: Maximum seconds an event waits before being written
+            max_queue_size: Queue capacity; submit() blocks when it is full
+        """
+        self.db_path = db_path
+        self.max_batch_size = max_batch_size
+        self.flush_interval = flush_interval
+        
+        self._db = get_connection_manager(db_path)
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_queue_size)
+        self._closed = False
+        
+        self._started_at = time.monotonic()
+        self._written = 0
+        self._failed = 0
+        self._rejected = 0
+        self._flushes = 0
+        self._last_batch_size = 0
+        self._last_flush_seconds = 0.0
+        
+        self._thread = threading.Thread(target=self._run, name="feedback-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+    
+    def __enter__(self) -> "BufferedFeedbackWriter":
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+    
+    def submit(
+        self,
+        module_name: str,
+        model_used: str,
+        feedback_type: str,
+        feedback_detail: Optional[str] = None,
+        session_id: Optional[str] = None
+    ) -> bool:
+        """
+        Queue a feedback event for writing.
+        
+        Args:
+            module_name: Name of the context module receiving feedback
+            model_used: AI model that used the module
+            feedback_type: Type of feedback (positive, negative, suggestion)
+            feedback_detail: Optional detailed feedback
+            session_id: Optional session identifier
+        
+        Returns:
+            True if the event was queued, False if it was rejected for
+            missing a required field
+        """
+        if self._closed:
+            raise RuntimeError("BufferedFeedbackWriter is closed")
+        
+        # Rows without these fail the table's NOT NULL constraints, and would
+        # take the rest of their batch with them
+        missing = [
+            name for name, value in
+            (("module_name", module_name), ("model_used", model_used), ("feedback_type", feedback_type))
+            if not value
+        ]
+        if missing:
+            self.reject()
+            logger.warning(f"Rejecting feedback event missing {', '.join(missing)}")
+            return False
+        
+        self._queue.put((module_name, model_used, feedback_type, feedback_detail, session_id))
+        return True
+    
+    def submit_many(self, feedback_data: List[Dict]) -> int:
+        """
+        Queue multiple feedback events given as dictionaries.
+        
+        Args:
+            feedback_data: List of dictionaries containing feedback information
+        
+        Returns:
+            Number of events queued; the rest were rejected
+        """
+        queued = 0
+        for feedback in feedback_data:
+            queued += self.submit(
+                feedback.get("module_name"),
+                feedback.get("model_used"),
+                feedback.get("feedback_type"),
+                feedback.get("feedback_detail"),
+                feedback.get("session_id")
+            )
+        return queued
+    
+    def reject(self, count: int = 1) -> None:
+        """
+        Count events that were dropped before being queued (e.g. malformed
+        input), so they show up as failed in the metrics.
+        
+        Args:
+            count: Number of events rejected
+        """
+        self._rejected += count
+    
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Block until every event submitted so far has been written.
+        
+        Args:
+            timeout: Maximum seconds to wait
+        
+        Returns:
+            True if the flush completed within the timeout
+        """
+        if not self._thread.is_alive():
+            return self._queue.empty()
+        
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+    
+    def close(self) -> None:
+        """Flush pending events and stop the writer thread."""
+        if self._closed:
+            return
+        
+        self._closed = True
+        self._queue.put(self._STOP)
+        self._thread.join()
+        atexit.unregister(self.close)
+    
+    def _run(self) -> None:
+        """Collect queued events into batches and write them."""
+        batch = []
+        deadline = None
+        
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+            
+            if isinstance(item, tuple):
+                batch.append(item)
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_interval
+                if len(batch) < self.max_batch_size:
+                    continue
+            
+            # Batch full, interval elapsed, flush requested or stopping
+            if batch:
+                self._write_batch(batch)
+                batch = []
+            deadline = None
+            
+            if isinstance(item, threading.Event):
+                item.set()
+            elif item is self._STOP:
+                return
+    
+    def _write_batch(self, batch: List[Tuple]) -> None:
+        """Write one batch of events in a single transaction."""
+        started = time.perf_counter()
+        try:
+            with self._db.transaction() as conn:
+                conn.executemany(INSERT_FEEDBACK_SQL, batch)
+            written = len(batch)
+        except sqlite3.Error as e:
+            # The transaction rolled back every row; retry them one by one so
+            # only the rows that fail are lost
+            logger.warning(f"Error writing {len(batch)} buffered feedback entries, "
+                           f"retrying them individually: {e}")
+            written = self._write_rows(batch)
+        
+        self._written += written
+        self._flushes += 1
+        self._last_batch_size = len(batch)
+        self._last_flush_seconds = time.perf_counter() - started
+        logger.debug(f"Flushed {len(batch)} feedback entries in {self._last_flush_seconds * 1000:.1f} ms")
+    
+    def _write_rows(self, batch: List[Tuple]) -> int:
+        """
+        Write events one transaction at a time, counting the ones that fail.
+        
+        Returns:
+            Number of events written
+        """
+        written = 0
+        for row in batch:
+            try:
+                with self._db.transaction() as conn:
+                    conn.execute(INSERT_FEEDBACK_SQL, row)
+                written += 1
+            except sqlite3.Error as e:
+                self._failed += 1
+                logger.error(f"Error writing feedback for module {row[0]}: {e}")
+        return written
+    
+    def metrics(self) -> Dict:
+        """
+        Get ingestion metrics for this writer.
+        
+        Returns:
+            Dictionary with queue depth, write counts and throughput
+        """
+        elapsed = time.monotonic() - self._started_at
+        return {
+            "queue_depth": self._queue.qsize(),
+            "written": self._written,
+            "failed": self._failed + self._rejected,
+            "flushes": self._flushes,
+            "last_batch_size": self._last_batch_size,
+            "last_flush_seconds": round(self._last_flush_seconds, 6),
+            "events_per_second": round(self._written / elapsed, 1) if elapsed > 0 else 0.0
+        }
+
 def main():
     """Command-line interface for the feedback system."""
     parser = argparse.ArgumentParser(description="Context Module Feedback System")
@@ -459,6 +749,16 @@ def main():
     batch_parser = subparsers.add_parser("batch-add", help="Add multiple feedback entries from JSON")
     batch_parser.add_argument("input_file", help="JSON file containing feedback data")
     
+    # Buffered ingestion command
+    ingest_parser = subparsers.add_parser("ingest", 
+                               help="Stream feedback events (one JSON object per line) through the buffered writer")
+    ingest_parser.add_argument("input_file", nargs="?", default="-",
+                             help="NDJSON file of feedback events (default: stdin)")
+    ingest_parser.add_argument("--batch-size", type=int, default=5000,
+                             help="Number of events written per transaction")
+    ingest_parser.add_argument("--flush-interval", type=float, default=1.0,
+                             help="Maximum seconds an event is buffered before being written")
+    
     # Record optimization command
     optimize_parser = subparsers.add_parser("record-optimization", help="Record module optimization")
     optimize_parser.add_argument("module_name", help="Name of the optimized module")
@@ -489,6 +789,11 @@ def main():
     perf_parser.add_argument("module_name", help="Name of the module")
     perf_parser.add_argument("--json", action="store_true", help="Output in JSON format")
     
+    # Export command
+    export_parser = subparsers.add_parser("export", help="Stream feedback data to NDJSON or Parquet")
+    export_parser.add_argument("output", help="Output file (.ndjson, .ndjson.gz, .jsonl or .parquet)")
+    export_parser.add_argument("--since", help="Cursor printed by the previous export, or a timestamp")
+    
     # Generate report command
     report_parser = subparsers.add_parser("generate-report", help="Generate performance report")
     report_parser.add_argument("--output", help="Output file path")
@@ -511,6 +816,36 @@ def main():
         feedback_ids = feedback_system.batch_add_feedback(feedback_data)
         print(f"Added {len(feedback_ids)} feedback entries")
     
+    elif args.command == "ingest":
+        input_stream = sys.stdin if args.input_file == "-" else open(args.input_file, 'r')
+        
+        with feedback_system.buffered_writer(
+            max_batch_size=args.batch_size, flush_interval=args.flush_interval
+        ) as writer:
+            for line_number, line in enumerate(input_stream, 1):
+                if not line.strip():
+                    continue
+                # One bad line must not abort the rest of the ingest
+                try:
+                    feedback = json.loads(line)
+                except ValueError as e:
+                    writer.reject()
+                    logger.warning(f"Skipping malformed feedback on line {line_number}: {e}")
+                    continue
+                if not isinstance(feedback, dict):
+                    writer.reject()
+                    logger.warning(f"Skipping feedback on line {line_number}: expected a JSON object")
+                    continue
+                writer.submit_many([feedback])
+        
+        if input_stream is not sys.stdin:
+            input_stream.close()
+        
+        metrics = writer.metrics()
+        print(f"Ingested {metrics['written']} feedback entries "
+             f"({metrics['failed']} failed, {metrics['flushes']} flushes, "
+             f"{metrics['events_per_second']:.0f} events/s)")
+    
     elif args.command == "record-optimization":
         result_id = feedback_system.record_optimization(
             args.module_name, args.model,
@@ -561,6 +896,15 @@ def main():
                     print(f"- {opt['timestamp']}: {opt['improvement_percent']:.2f}% improvement "
                          f"({opt['target_model']}) {applied}")
     
+    elif args.command == "export":
+        result = feedback_system.export_data(args.output, args.since)
+        
+        for table, count in result["rows"].items():
+            print(f"Exported {count} {table} records")
+        print(f"Output saved to: {', '.join(result['output_paths'])}")
+        if result["cursor"]:
+            print(f"Next incremental export: --since '{result['cursor']}'")
+    
     elif args.command == "generate-report":
         report = feedback_system.generate_performance_report(args.output)
         
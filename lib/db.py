@@ -0,0 +1,298 @@
+"""
+SQLite Connection Management
+
+This module provides a shared connection manager for the feedback databases.
+Each thread gets one long-lived connection per database file, configured for
+concurrent access (WAL journaling, synchronous=NORMAL and a busy timeout), so
+callers avoid reconnecting per call and reuse SQLite's per-connection
+prepared statement cache.
+"""
+
+import os
+import atexit
+import sqlite3
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class SQLiteConnectionManager:
+    """
+    Hands out per-thread SQLite connections for a single database file.
+
+    Connections are created lazily on first use in each thread and kept open
+    until close_all() is called or the process exits.
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        busy_timeout_ms: int = 5000,
+        cached_statements: int = 256,
+        journal_mode: str = "WAL",
+        synchronous: str = "NORMAL"
+    ):
+        """
+        Initialize the connection manager.
+
+        Args:
+            db_path: Path to the SQLite database file
+            busy_timeout_ms: How long a connection waits on a locked database
+            cached_statements: Size of each connection's prepared statement cache
+            journal_mode: SQLite journal mode
+            synchronous: SQLite synchronous setting
+        """
+        self.db_path = db_path
+        self.busy_timeout_ms = busy_timeout_ms
+        self.cached_statements = cached_statements
+        self.journal_mode = journal_mode
+        self.synchronous = synchronous
+
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open and configure a new connection."""
+        directory = os.path.dirname(self.db_path)
+        if directory and self.db_path != ":memory:":
+            os.makedirs(directory, exist_ok=True)
+
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=self.busy_timeout_ms / 1000,
+            cached_statements=self.cached_statements,
+            check_same_thread=False
+        )
+        conn.execute(f"PRAGMA journal_mode={self.journal_mode}")
+        conn.execute(f"PRAGMA synchronous={self.synchronous}")
+        conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}")
+        conn.execute("PRAGMA foreign_keys=ON")
+
+        with self._lock:
+            self._connections.append(conn)
+
+        logger.debug(f"Opened SQLite connection to {self.db_path} in thread {threading.current_thread().name}")
+        return conn
+
+    def connection(self) -> sqlite3.Connection:
+        """
+        Get the calling thread's connection, opening it if needed.
+
+        Callers commit before returning, so a transaction still open here was
+        left behind by an operation that failed midway. It is rolled back so
+        it cannot hold the write lock or leak into the next operation.
+
+        Returns:
+            SQLite connection owned by the current thread
+        """
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._connect()
+            self._local.conn = conn
+        elif conn.in_transaction:
+            logger.warning(f"Rolling back transaction left open on {self.db_path}")
+            conn.rollback()
+        return conn
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        """
+        Run a block in a transaction on the calling thread's connection,
+        committing on success and rolling back on error.
+
+        Yields:
+            SQLite connection owned by the current thread
+        """
+        conn = self.connection()
+        with conn:
+            yield conn
+
+    def close_all(self) -> None:
+        """Close every connection opened by this manager."""
+        with self._lock:
+            connections, self._connections = self._connections, []
+
+        for conn in connections:
+            try:
+                conn.close()
+            except sqlite3.ProgrammingError:
+                pass
+
+        self._local = threading.local()
+
+
+_managers: Dict[str, SQLiteConnectionManager] = {}
+_managers_lock = threading.Lock()
+
+
+def get_connection_manager(db_path: str, **options) -> SQLiteConnectionManager:
+    """
+    Get the shared connection manager for a database file.
+
+    Managers are shared per resolved path, so every feedback class that uses
+    the same database also shares its per-thread connections.
+
+    Args:
+        db_path: Path to the SQLite database file
+        **options: Settings passed to SQLiteConnectionManager on first creation
+
+    Returns:
+        Connection manager for the database
+    """
+    key = db_path if db_path == ":memory:" else os.path.abspath(db_path)
+
+    with _managers_lock:
+        manager = _managers.get(key)
+        if manager is None:
+            manager = SQLiteConnectionManager(db_path, **options)
+            _managers[key] = manager
+        return manager
+
+
+def get_connection(db_path: str) -> sqlite3.Connection:
+    """
+    Get the calling thread's shared connection to a database file.
+
+    Args:
+        db_path: Path to the SQLite database file
+
+    Returns:
+        SQLite connection owned by the current thread
+    """
+    return get_connection_manager(db_path).connection()
+
+
+def ensure_rollup_table(
+    conn: sqlite3.Connection,
+    rollup_table: str,
+    source_table: str,
+    key_columns: Dict[str, str],
+    sum_columns: Dict[str, str],
+    max_columns: Optional[Dict[str, str]] = None
+) -> None:
+    """
+    Create a rollup table kept up to date by triggers on its source table.
+
+    The rollup holds one row per key with running sums (counts are sums of 1)
+    and maxima, so aggregate reads cost one lookup per key instead of a scan
+    of the source table. Insert, update and delete triggers apply each change
+    incrementally; maxima only grow, since they cannot be recomputed without
+    a scan. A key's row is deleted once its row count (the sum column whose
+    expression is `1`) drops to zero, so deleted or renamed keys don't linger.
+    The rollup is backfilled from existing rows when first created.
+
+    Column expressions are SQL written against a `{row}` placeholder, which is
+    substituted with NEW/OLD in triggers and the source table in the backfill.
+    NULL keys are stored as empty strings so they take part in the primary key.
+
+    Args:
+        conn: Open SQLite connection
+        rollup_table: Name of the rollup table
+        source_table: Table whose rows are aggregated
+        key_columns: Rollup key column -> source expression
+        sum_columns: Rollup sum column -> per-row source expression
+        max_columns: Rollup max column -> per-row source expression
+    """
+    max_columns = max_columns or {}
+
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (rollup_table,)
+    ).fetchone()
+
+    keys = list(key_columns)
+    columns = keys + list(sum_columns) + list(max_columns)
+
+    def values(row: str) -> List[str]:
+        return (
+            [f"COALESCE({expr.format(row=row)}, '')" for expr in key_columns.values()]
+            + [f"COALESCE({expr.format(row=row)}, 0)" for expr in sum_columns.values()]
+            + [expr.format(row=row) for expr in max_columns.values()]
+        )
+
+    def key_match(row: str) -> str:
+        return " AND ".join(
+            f"{key} = COALESCE({expr.format(row=row)}, '')" for key, expr in key_columns.items()
+        )
+
+    upsert_updates = ", ".join(
+        [f"{col} = {col} + excluded.{col}" for col in sum_columns]
+        + [f"{col} = COALESCE(MAX({col}, excluded.{col}), {col}, excluded.{col})" for col in max_columns]
+    )
+
+    def upsert(row: str) -> str:
+        return (
+            f"INSERT INTO {rollup_table} ({', '.join(columns)}) "
+            f"VALUES ({', '.join(values(row))}) "
+            f"ON CONFLICT ({', '.join(keys)}) DO UPDATE SET {upsert_updates};"
+        )
+
+    # Sum of 1 per source row, which tells when a key has no rows left
+    count_column = next((col for col, expr in sum_columns.items() if expr.strip() == "1"), None)
+
+    def subtract(row: str) -> str:
+        updates = ", ".join(
+            f"{col} = {col} - COALESCE({expr.format(row=row)}, 0)" for col, expr in sum_columns.items()
+        )
+        statement = f"UPDATE {rollup_table} SET {updates} WHERE {key_match(row)};"
+        if count_column:
+            statement += f" DELETE FROM {rollup_table} WHERE {key_match(row)} AND {count_column} <= 0;"
+        return statement
+
+    column_defs = (
+        [f"{key} TEXT NOT NULL" for key in keys]
+        + [f"{col} NUMERIC NOT NULL DEFAULT 0" for col in sum_columns]
+        + [f"{col} TEXT" for col in max_columns]
+    )
+
+    conn.execute(
+        f"CREATE TABLE IF NOT EXISTS {rollup_table} "
+        f"({', '.join(column_defs)}, PRIMARY KEY ({', '.join(keys)})) WITHOUT ROWID"
+    )
+    conn.execute(
+        f"CREATE TRIGGER IF NOT EXISTS {rollup_table}_after_insert AFTER INSERT ON {source_table} "
+        f"BEGIN {upsert('NEW')} END"
+    )
+    # Recreated every time, so databases created with older trigger bodies
+    # pick up the current ones
+    conn.execute(f"DROP TRIGGER IF EXISTS {rollup_table}_after_delete")
+    conn.execute(
+        f"CREATE TRIGGER {rollup_table}_after_delete AFTER DELETE ON {source_table} "
+        f"BEGIN {subtract('OLD')} END"
+    )
+    conn.execute(f"DROP TRIGGER IF EXISTS {rollup_table}_after_update")
+    conn.execute(
+        f"CREATE TRIGGER {rollup_table}_after_update AFTER UPDATE ON {source_table} "
+        f"BEGIN {subtract('OLD')} {upsert('NEW')} END"
+    )
+
+    if not exists:
+        backfill_values = values(source_table)
+        key_count = len(keys)
+        select_columns = (
+            backfill_values[:key_count]
+            + [f"SUM({expr})" for expr in backfill_values[key_count:key_count + len(sum_columns)]]
+            + [f"MAX({expr})" for expr in backfill_values[key_count + len(sum_columns):]]
+        )
+        conn.execute(
+            f"INSERT INTO {rollup_table} ({', '.join(columns)}) "
+            f"SELECT {', '.join(select_columns)} FROM {source_table} "
+            f"GROUP BY {', '.join(backfill_values[:key_count])}"
+        )
+        logger.info(f"Backfilled rollup table {rollup_table} from {source_table}")
+    elif count_column:
+        # Rows left behind by triggers that did not delete empty keys
+        conn.execute(f"DELETE FROM {rollup_table} WHERE {count_column} <= 0")
+
+
+@atexit.register
+def close_all_connections() -> None:
+    """Close every managed connection, checkpointing WAL files on exit."""
+    with _managers_lock:
+        managers = list(_managers.values())
+
+    for manager in managers:
+        manager.close_all()
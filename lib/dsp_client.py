@@ -12,6 +12,10 @@ import logging
 from typing import Dict, Any, Optional, List, Tuple
 import dspy
 
+from lib.llm_cache import LLMResponseCache
+from lib.token_counter import get_counter, encoding_for_model
+from lib.lm_registry import LMRegistry
+
 class DSPClient:
     """
     Client for interacting with DSPy to optimize context modules.
@@ -27,6 +31,8 @@ class DSPClient:
         """
         self.logger = logging.getLogger(__name__)
         self.config = self._load_config(config_path)
+        self.cache = LLMResponseCache.from_config(self.config)
+        self.lm_registry = LMRegistry(self.config)
         self._configure_dspy()
         
     def _load_config(self, config_path: str) -> Dict[str, Any]:
@@ -56,23 +62,14 @@ class DSPClient:
             for model_name, model_config in self.config['models'].items():
                 self.logger.info(f"Configuring model: {model_name}")
                 
-                if model_config['api_type'] == 'openai':
-                    lm = dspy.OpenAI(
-                        model=model_config['model_name'],
-                        max_tokens=model_config['max_tokens'],
-                        temperature=model_config['temperature']
-                    )
-                elif model_config['api_type'] == 'anthropic':
-                    lm = dspy.Anthropic(
-                        model=model_config['model_name'],
-                        max_tokens=model_config['max_tokens'],
-                        temperature=model_config['temperature']
-                    )
-                else:
+                try:
+                    # Built once and shared, behind the provider's limits and retries
+                    lm = self.lm_registry.get_lm(model_config['api_type'], model_config)
+                except ValueError:
                     self.logger.warning(f"Unsupported API type: {model_config['api_type']}")
                     continue
                     
-                # Register the language model with DSPy
+                # Register the language model with DSPy as the default
                 dspy.settings.configure(lm=lm)
                 self.logger.info(f"Successfully configured DSPy with model {model_name}")
                 
@@ -139,19 +136,18 @@ class DSPClient:
         
         return ContextOptimizer()
     
-    def _create_teleprompter(self, strategy: Dict[str, Any]) -> dspy.Teleprompter:
+    def _get_strategy_instructions(self, strategy: Dict[str, Any]) -> str:
         """
-        Create a DSPy Teleprompter for the optimization process.
+        Get the optimizer instructions for a strategy.
         
         Args:
             strategy: The strategy configuration to use
             
         Returns:
-            Configured Teleprompter
+            Instruction text for the Teleprompter
         """
         if strategy['name'] == "token_reduction":
-            teleprompter = dspy.Teleprompter(
-                instructions="""
+            return """
                 You are an AI context module optimizer. Your task is to optimize the given context 
                 module content to use fewer tokens while preserving all important information.
                 
@@ -166,10 +162,8 @@ class DSPClient:
                 Your output should be the optimized content only, not including any explanations 
                 or comparisons to the original.
                 """
-            )
         elif strategy['name'] == "clarity_improvement":
-            teleprompter = dspy.Teleprompter(
-                instructions="""
+            return """
                 You are an AI context module optimizer. Your task is to improve the clarity and 
                 structure of the given context module content while preserving all information.
                 
@@ -184,11 +178,9 @@ class DSPClient:
                 Your output should be the optimized content only, not including any explanations 
                 or comparisons to the original.
                 """
-            )
         else:
-            # Default teleprompter
-            teleprompter = dspy.Teleprompter(
-                instructions="""
+            # Default instructions
+            return """
                 You are an AI context module optimizer. Your task is to optimize the given context 
                 module content while preserving all important information.
                 
@@ -203,9 +195,20 @@ class DSPClient:
                 Your output should be the optimized content only, not including any explanations 
                 or comparisons to the original.
                 """
-            )
+    
+    def _create_teleprompter(self, strategy: Dict[str, Any]) -> dspy.Teleprompter:
+        """
+        Create a DSPy Teleprompter for the optimization process.
+        
+        Args:
+            strategy: The strategy configuration to use
             
-        return teleprompter
+        Returns:
+            Configured Teleprompter
+        """
+        return dspy.Teleprompter(
+            instructions=self._get_strategy_instructions(strategy)
+        )
         
     def optimize_module_content(
         self, 
@@ -236,41 +239,47 @@ class DSPClient:
                 model_name = self.config['general']['default_model']
                 model_config = self.config['models'].get(model_name)
                 
-            if model_config['api_type'] == 'openai':
-                lm = dspy.OpenAI(
-                    model=model_config['model_name'],
-                    max_tokens=model_config['max_tokens'],
-                    temperature=model_config['temperature']
-                )
-            elif model_config['api_type'] == 'anthropic':
-                lm = dspy.Anthropic(
-                    model=model_config['model_name'],
-                    max_tokens=model_config['max_tokens'],
-                    temperature=model_config['temperature']
-                )
-            else:
-                raise ValueError(f"Unsupported API type: {model_config['api_type']}")
-                
-            # Configure DSPy with the language model
-            dspy.settings.configure(lm=lm)
+            # Reuse the model built for this configuration; the global DSPy
+            # settings are left alone so concurrent callers don't interfere
+            lm = self.lm_registry.get_lm(model_config['api_type'], model_config)
             
             # Get optimization strategy
             strategy = self.get_strategy(strategy_name)
             
-            # Create the optimizer module
-            optimizer = self._create_context_optimizer_module()
-            
-            # Create the teleprompter for the strategy
-            teleprompter = self._create_teleprompter(strategy)
+            # Serve identical requests from the response cache
+            cache_key = LLMResponseCache.make_key(
+                content,
+                strategy['name'],
+                model_config['model_name'],
+                model_config['temperature'],
+                self._get_strategy_instructions(strategy)
+            )
+            cached_content = self.cache.get(cache_key)
             
-            # Optimize the content
-            self.logger.info(f"Optimizing module with model {model_name} and strategy {strategy['name']}")
-            optimized = teleprompter(optimizer)(content)
+            if cached_content is not None:
+                self.logger.info(f"Serving optimization for model {model_name} and strategy {strategy['name']} from cache")
+                optimized = {"optimized_content": cached_content}
+            else:
+                # Compile the optimizer module once per model and strategy
+                program = self.lm_registry.get_program(
+                    (model_name, strategy['name']),
+                    lambda: self._create_teleprompter(strategy)(self._create_context_optimizer_module())
+                )
+                
+                # Optimize the content
+                self.logger.info(f"Optimizing module with model {model_name} and strategy {strategy['name']}")
+                with dspy.settings.context(lm=lm):
+                    optimized = program(content)
+                self.cache.set(cache_key, optimized["optimized_content"])
             
-            # Calculate token reduction
-            original_tokens = len(content.split())
-            optimized_tokens = len(optimized["optimized_content"].split())
-            token_reduction = 1 - (optimized_tokens / original_tokens)
+            # Calculate token reduction with the model's tokenizer
+            token_counter = get_counter(
+                model_config.get('tokenizer') or encoding_for_model(model_config['model_name'])
+            )
+            original_tokens, optimized_tokens = token_counter.count_many(
+                [content, optimized["optimized_content"]]
+            )
+            token_reduction = 1 - (optimized_tokens / original_tokens) if original_tokens else 0
             
             return {
                 "success": True,
@@ -278,11 +287,13 @@ class DSPClient:
                 "optimized_content": optimized["optimized_content"],
                 "model": model_name,
                 "strategy": strategy['name'],
+                "cached": cached_content is not None,
                 "token_stats": {
                     "original": original_tokens,
                     "optimized": optimized_tokens,
                     "reduction": token_reduction,
-                    "reduction_percentage": f"{token_reduction * 100:.2f}%"
+                    "reduction_percentage": f"{token_reduction * 100:.2f}%",
+                    "encoding": token_counter.encoding_name
                 }
             }
             
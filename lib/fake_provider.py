@@ -0,0 +1,309 @@
+"""
+Fake LLM Provider
+
+This module provides a deterministic stand-in language model so that the
+optimization pipeline can run offline. It is registered under `models.options`
+with `provider: "fake"` and rewrites its input with a fixed, token-reducing
+transformation. Latency, jitter and error rates can be injected to load-test
+batch concurrency, caching and retry behavior without network access.
+
+Example configuration:
+
+    models:
+      options:
+        - name: "fake-fast"
+          provider: "fake"
+          latency_ms: 50
+          jitter_ms: 20
+          error_rate: 0.05
+          rate_limit_rate: 0.05
+          seed: 42
+"""
+
+import re
+import time
+import random
+import logging
+import threading
+from collections import deque
+from typing import Dict, Any, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Filler phrases removed by the transformation, longest first
+FILLER_PATTERNS = [
+    (re.compile(r'\bin order to\b', re.IGNORECASE), "to"),
+    (re.compile(r'\b(?:basically|actually|really|very|simply|just|quite)\s+', re.IGNORECASE), ""),
+    (re.compile(r'\bit is important to note that\s+', re.IGNORECASE), ""),
+    (re.compile(r'\bplease note that\s+', re.IGNORECASE), ""),
+]
+
+# Field markers used by DSPy's chat adapter
+CHAT_FIELD_PATTERN = re.compile(r'\[\[ ## (\w+) ## \]\]')
+
+# Field prefixes in the "Follow the following format." section of DSPy's legacy templates
+TEMPLATE_FIELD_PATTERN = re.compile(r'^([^:\n]+):[^\n]*\$\{', re.MULTILINE)
+
+
+class FakeProviderError(RuntimeError):
+    """Injected provider failure, shaped like an HTTP server error."""
+
+    status_code = 500
+
+
+class FakeRateLimitError(FakeProviderError):
+    """Injected rate limit response carrying a Retry-After delay."""
+
+    status_code = 429
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def transform_text(text: str) -> str:
+    """
+    Apply the fake provider's deterministic optimization to a text.
+
+    Trailing whitespace and filler phrases are removed, runs of blank lines
+    are collapsed and repeated lines are dropped. Code fences and context
+    block tags are left untouched.
+
+    Args:
+        text: Input text
+
+    Returns:
+        Transformed text
+    """
+    lines = []
+    seen = set()
+    in_code = False
+
+    for line in text.splitlines():
+        stripped = line.rstrip()
+
+        if stripped.lstrip().startswith("```"):
+            in_code = not in_code
+            lines.append(stripped)
+            continue
+
+        if not in_code and not stripped.lstrip().startswith("<"):
+            for pattern, replacement in FILLER_PATTERNS:
+                stripped = pattern.sub(replacement, stripped)
+
+            key = stripped.strip().lower()
+            if key and len(key) > 20 and key in seen:
+                continue
+            seen.add(key)
+
+        if not stripped and lines and not lines[-1]:
+            continue
+        lines.append(stripped)
+
+    return "\n".join(lines).strip()
+
+
+class FakeLM:
+    """
+    Deterministic stand-in for a DSPy language model.
+
+    Responses depend only on the prompt, so repeated requests return
+    identical output. Latency, jitter and failures are drawn from a seeded
+    random generator, so a run with the same seed and request order
+    reproduces the same timings and errors.
+    """
+
+    provider = "fake"
+
+    def __init__(
+        self,
+        model: str = "fake",
+        latency_ms: float = 0.0,
+        jitter_ms: float = 0.0,
+        error_rate: float = 0.0,
+        rate_limit_rate: float = 0.0,
+        retry_after: float = 1.0,
+        seed: Optional[int] = 0,
+        **kwargs
+    ):
+        """
+        Initialize the fake model.
+
+        Args:
+            model: Model name reported to callers
+            latency_ms: Base latency added to every request
+            jitter_ms: Maximum extra latency, drawn uniformly per request
+            error_rate: Probability of raising FakeProviderError
+            rate_limit_rate: Probability of raising FakeRateLimitError
+            retry_after: Retry-After seconds reported by rate limit errors
+            seed: Seed for latency and error injection (None for nondeterministic)
+            **kwargs: Generation settings (temperature, max_tokens, ...) kept
+                for compatibility with DSPy's LM interface
+        """
+        self.model = model
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.seed = seed
+        self.kwargs = {"model": model, **kwargs}
+        # Bounded so long load tests don't accumulate every response
+        self.history = deque(maxlen=100)
+
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "errors": 0, "rate_limited": 0}
+
+    @classmethod
+    def from_config(cls, model_config: Dict[str, Any]) -> "FakeLM":
+        """
+        Create a fake model from a `models.options` entry.
+
+        Args:
+            model_config: Model configuration dictionary
+
+        Returns:
+            FakeLM instance
+        """
+        return cls(
+            model=model_config.get("name", "fake"),
+            latency_ms=model_config.get("latency_ms", 0.0),
+            jitter_ms=model_config.get("jitter_ms", 0.0),
+            error_rate=model_config.get("error_rate", 0.0),
+            rate_limit_rate=model_config.get("rate_limit_rate", 0.0),
+            retry_after=model_config.get("retry_after", 1.0),
+            seed=model_config.get("seed", 0),
+            temperature=model_config.get("temperature", 0.0),
+            max_tokens=model_config.get("max_tokens", 4096)
+        )
+
+    def copy(self, **kwargs) -> "FakeLM":
+        """Create a copy with updated generation settings."""
+        settings = {k: v for k, v in self.kwargs.items() if k != "model"}
+        settings.update(kwargs)
+        return FakeLM(
+            model=self.model,
+            latency_ms=self.latency_ms,
+            jitter_ms=self.jitter_ms,
+            error_rate=self.error_rate,
+            rate_limit_rate=self.rate_limit_rate,
+            retry_after=self.retry_after,
+            seed=self.seed,
+            **settings
+        )
+
+    def _simulate_request(self) -> None:
+        """Sleep for the injected latency and raise any injected failure."""
+        with self._lock:
+            self.stats["requests"] += 1
+            delay = self.latency_ms + self._random.uniform(0, self.jitter_ms)
+            roll = self._random.random()
+
+        if delay > 0:
+            time.sleep(delay / 1000)
+
+        if roll < self.rate_limit_rate:
+            with self._lock:
+                self.stats["rate_limited"] += 1
+            raise FakeRateLimitError(f"Rate limit exceeded for {self.model}", self.retry_after)
+
+        if roll < self.rate_limit_rate + self.error_rate:
+            with self._lock:
+                self.stats["errors"] += 1
+            raise FakeProviderError(f"Injected failure from {self.model}")
+
+    def _complete_chat(self, messages: List[Dict[str, Any]]) -> str:
+        """Answer a DSPy chat adapter request with every output field filled in."""
+        user_message = next(
+            (m.get("content", "") for m in reversed(messages) if m.get("role") == "user"), ""
+        )
+        if not isinstance(user_message, str):
+            user_message = str(user_message)
+
+        inputs_text, _, instructions = user_message.partition("Respond with")
+        output_fields = [f for f in CHAT_FIELD_PATTERN.findall(instructions) if f != "completed"]
+
+        # The longest input field is the content being optimized
+        sections = re.split(r'\[\[ ## \w+ ## \]\]', inputs_text)
+        source = max(sections, key=len).strip() if sections else inputs_text
+
+        if not output_fields:
+            return transform_text(source)
+
+        parts = []
+        for field in output_fields:
+            value = "Applied deterministic fake optimization." if field == "reasoning" else transform_text(source)
+            parts.append(f"[[ ## {field} ## ]]\n{value}")
+        parts.append("[[ ## completed ## ]]")
+        return "\n\n".join(parts)
+
+    def _complete_template(self, prompt: str) -> str:
+        """Continue a DSPy legacy template prompt from its last, unfinished field."""
+        sections = prompt.split("\n\n---\n\n")
+        format_section = next((s for s in sections if s.startswith("Follow the following format.")), "")
+        prefixes = TEMPLATE_FIELD_PATTERN.findall(format_section)
+        example = sections[-1]
+
+        if not prefixes or not example:
+            return transform_text(prompt)
+
+        # Values of the fields already filled in for this example
+        filled = {}
+        current = None
+        for line in example.splitlines():
+            for prefix in prefixes:
+                if line.startswith(f"{prefix}:"):
+                    current = prefix
+                    filled[current] = line[len(prefix) + 1:].strip()
+                    break
+            else:
+                if current:
+                    filled[current] += "\n" + line
+
+        if current is None:
+            return transform_text(prompt)
+
+        source = max(
+            (value for prefix, value in filled.items() if prefix != current),
+            key=len,
+            default=""
+        )
+        output = transform_text(source)
+
+        remaining = prefixes[prefixes.index(current) + 1:]
+        first = " apply the deterministic fake optimization." if current == "Reasoning" else f" {output}"
+        return first + "".join(f"\n\n{prefix}: {output}" for prefix in remaining)
+
+    def __call__(self, prompt: Optional[str] = None, messages: Optional[List[Dict[str, Any]]] = None,
+                 **kwargs) -> List[str]:
+        """
+        Generate completions for a prompt or chat messages.
+
+        Args:
+            prompt: Prompt text (DSPy legacy templates or plain prompts)
+            messages: Chat messages (DSPy chat adapter)
+            **kwargs: Generation settings; `n` sets the number of completions
+
+        Returns:
+            List of completions
+        """
+        self._simulate_request()
+
+        if messages:
+            completion = self._complete_chat(messages)
+        elif prompt and "Follow the following format." in prompt:
+            completion = self._complete_template(prompt)
+        else:
+            completion = transform_text(prompt or "")
+
+        self.history.append({"prompt": prompt, "messages": messages, "response": completion, "kwargs": kwargs})
+        return [completion] * max(1, int(kwargs.get("n", 1) or 1))
+
+    def basic_request(self, prompt: str, **kwargs) -> Dict[str, Any]:
+        """Legacy DSPy request interface returning an OpenAI-style payload."""
+        return {"choices": [{"text": text} for text in self(prompt, **kwargs)]}
+
+    def inspect_history(self, n: int = 1) -> List[Dict[str, Any]]:
+        """Return the last n requests and responses."""
+        return list(self.history)[-n:]
@@ -0,0 +1,279 @@
+"""
+LLM Response Cache
+
+This module provides a persistent, content-addressed cache for LLM optimization
+responses. Entries are keyed by a hash of everything that determines the
+response (content, strategy, model, temperature and prompt template), so
+re-running an optimization on unchanged content is served from disk instead
+of the provider.
+"""
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from typing import Dict, Any, Optional
+
+# Part of every key. Bump it to orphan entries written by an older keying
+# scheme; version 1 keys could hold responses from a model other than the one
+# named in the key (concurrent batches with --model), so none are reused.
+KEY_VERSION = 2
+
+
+class LLMResponseCache:
+    """
+    SQLite-backed response cache with LRU eviction.
+
+    The least recently used entries are evicted once the cache grows beyond
+    either the maximum number of entries or the maximum total response size.
+    """
+
+    def __init__(
+        self,
+        path: str = "data/llm_cache.db",
+        max_entries: int = 10000,
+        max_size_mb: float = 256,
+        enabled: bool = True
+    ):
+        """
+        Initialize the cache.
+
+        Args:
+            path: Path to the SQLite database file backing the cache
+            max_entries: Maximum number of cached responses
+            max_size_mb: Maximum total size of cached responses in megabytes
+            enabled: Whether lookups and writes are performed at all
+        """
+        self.logger = logging.getLogger(__name__)
+        self.path = path
+        self.max_entries = max_entries
+        self.max_size_bytes = int(max_size_mb * 1024 * 1024)
+        self.enabled = enabled
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._lock = threading.Lock()
+        self._conn = None
+
+        if self.enabled:
+            self._init_database()
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "LLMResponseCache":
+        """
+        Create a cache from the `cache` section of the DSP configuration.
+
+        Args:
+            config: The full configuration dictionary
+
+        Returns:
+            Configured cache instance
+        """
+        cache_config = config.get("cache", {}) or {}
+        return cls(
+            path=cache_config.get("path", "data/llm_cache.db"),
+            max_entries=cache_config.get("max_entries", 10000),
+            max_size_mb=cache_config.get("max_size_mb", 256),
+            enabled=cache_config.get("enabled", True)
+        )
+
+    @staticmethod
+    def make_key(
+        content: str,
+        strategy: Optional[str],
+        model: Optional[str],
+        temperature: Optional[float],
+        prompt_template: Optional[str]
+    ) -> str:
+        """
+        Build the content-addressed key for an optimization request.
+
+        Args:
+            content: The content sent to the model
+            strategy: Name of the optimization strategy
+            model: Name of the model
+            temperature: Sampling temperature
+            prompt_template: Instructions or guidelines sent with the content
+
+        Returns:
+            Hex SHA-256 digest identifying the request
+        """
+        payload = json.dumps(
+            {
+                "version": KEY_VERSION,
+                "content": content,
+                "strategy": strategy,
+                "model": model,
+                "temperature": temperature,
+                "prompt_template": prompt_template
+            },
+            sort_keys=True,
+            ensure_ascii=False
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _init_database(self) -> None:
+        """Open the cache database and create the schema if needed."""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute('''
+        CREATE TABLE IF NOT EXISTS responses (
+            key TEXT PRIMARY KEY,
+            response TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            created_at REAL NOT NULL,
+            last_accessed REAL NOT NULL
+        )
+        ''')
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_responses_last_accessed ON responses (last_accessed)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Look up a cached response.
+
+        Args:
+            key: Key produced by make_key
+
+        Returns:
+            The cached response, or None on a miss
+        """
+        if not self.enabled:
+            return None
+
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+
+            if row is None:
+                self.misses += 1
+                return None
+
+            self._conn.execute(
+                "UPDATE responses SET last_accessed = ? WHERE key = ?", (time.time(), key)
+            )
+            self._conn.commit()
+            self.hits += 1
+            return row[0]
+
+    def contains(self, key: str) -> bool:
+        """
+        Check whether a response is cached without counting a hit or miss.
+
+        Args:
+            key: Key produced by make_key
+
+        Returns:
+            True if the key is cached
+        """
+        if not self.enabled:
+            return False
+
+        with self._lock:
+            return self._conn.execute(
+                "SELECT 1 FROM responses WHERE key = ?", (key,)
+            ).fetchone() is not None
+
+    def set(self, key: str, response: str) -> None:
+        """
+        Store a response and evict old entries if the cache is over its limits.
+
+        Args:
+            key: Key produced by make_key
+            response: The response text to cache
+        """
+        if not self.enabled or response is None:
+            return
+
+        now = time.time()
+        size = len(response.encode("utf-8"))
+
+        with self._lock:
+            self._conn.execute(
+                '''
+                INSERT OR REPLACE INTO responses (key, response, size, created_at, last_accessed)
+                VALUES (?, ?, ?, ?, ?)
+                ''',
+                (key, response, size, now, now)
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self) -> None:
+        """Delete least recently used entries until the cache fits its limits."""
+        count, total_size = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()
+
+        if count <= self.max_entries and total_size <= self.max_size_bytes:
+            return
+
+        evicted = 0
+        cursor = self._conn.execute(
+            "SELECT key, size FROM responses ORDER BY last_accessed ASC"
+        )
+        stale_keys = []
+        for key, entry_size in cursor:
+            if count - evicted <= self.max_entries and total_size <= self.max_size_bytes:
+                break
+            stale_keys.append((key,))
+            total_size -= entry_size
+            evicted += 1
+
+        self._conn.executemany("DELETE FROM responses WHERE key = ?", stale_keys)
+        self.evictions += evicted
+        self.logger.debug(f"Evicted {evicted} entries from LLM response cache")
+
+    def clear(self) -> None:
+        """Remove every cached response."""
+        if not self.enabled:
+            return
+
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get cache statistics for this process.
+
+        Returns:
+            Dictionary with hit/miss counters and current cache size
+        """
+        entries = 0
+        size_bytes = 0
+        if self.enabled:
+            with self._lock:
+                entries, size_bytes = self._conn.execute(
+                    "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+                ).fetchone()
+
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "entries": entries,
+            "size_bytes": size_bytes
+        }
+
+    def close(self) -> None:
+        """Close the underlying database connection."""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
@@ -0,0 +1,150 @@
+"""
+Language Model Registry
+
+This module builds DSPy language models and compiled programs once and
+shares them. Constructing a provider client sets up its HTTP session, and
+compiling a program repeats the same work for every module, so both are
+cached: models by their provider and generation settings, programs by a
+caller-chosen key such as (model, strategy). Every model is wrapped with the
+configured retries and provider rate limits (lib/retry.py).
+
+Models are configured for a call with `dspy.settings.context(lm=...)`, not
+`dspy.settings.configure`, so concurrent callers can use different models.
+"""
+
+import os
+import json
+import logging
+import threading
+from typing import Any, Callable, Dict, Hashable
+
+from lib.retry import wrap_lm
+
+logger = logging.getLogger(__name__)
+
+# Providers supported by create_lm
+PROVIDERS = ("openai", "anthropic", "fake")
+
+
+def create_lm(provider: str, model_config: Dict[str, Any]) -> Any:
+    """
+    Construct a DSPy language model for a provider.
+
+    Args:
+        provider: Provider name (openai, anthropic or fake)
+        model_config: Model settings; the model name is read from `model_name`
+            or `name`, plus optional `temperature` and `max_tokens`
+
+    Returns:
+        DSPy language model
+
+    Raises:
+        ValueError: If the provider is not supported
+    """
+    import dspy
+
+    model_name = model_config.get("model_name") or model_config["name"]
+    temperature = model_config.get("temperature", 0.2)
+    max_tokens = model_config.get("max_tokens", 4096)
+
+    if provider == "openai":
+        return dspy.OpenAI(
+            model=model_name,
+            api_key=os.environ.get("OPENAI_API_KEY"),
+            temperature=temperature,
+            max_tokens=max_tokens
+        )
+    if provider == "anthropic":
+        return dspy.Anthropic(
+            model=model_name,
+            api_key=os.environ.get("ANTHROPIC_API_KEY"),
+            temperature=temperature,
+            max_tokens=max_tokens
+        )
+    if provider == "fake":
+        from lib.fake_provider import FakeLM
+        return FakeLM.from_config({**model_config, "name": model_name})
+
+    raise ValueError(f"Unsupported provider: {provider}")
+
+
+class LMRegistry:
+    """
+    Thread-safe cache of language models and compiled programs.
+
+    Each entry is built at most once, even when several threads ask for it
+    at the same time; callers asking for other entries are not blocked
+    while it is built.
+    """
+
+    def __init__(self, config: Dict[str, Any]):
+        """
+        Initialize the registry.
+
+        Args:
+            config: The full configuration dictionary, for retry and rate
+                limit settings
+        """
+        self.config = config
+        self._lms: Dict[Hashable, Any] = {}
+        self._programs: Dict[Hashable, Any] = {}
+        self._lock = threading.Lock()
+        self._key_locks: Dict[Hashable, threading.Lock] = {}
+
+    def _get_or_create(self, cache: Dict[Hashable, Any], key: Hashable, factory: Callable[[], Any]) -> Any:
+        """Return a cached entry, building it under a per-key lock on first use."""
+        entry = cache.get(key)
+        if entry is not None:
+            return entry
+
+        with self._lock:
+            key_lock = self._key_locks.setdefault((id(cache), key), threading.Lock())
+
+        with key_lock:
+            entry = cache.get(key)
+            if entry is None:
+                entry = factory()
+                cache[key] = entry
+            return entry
+
+    def get_lm(self, provider: str, model_config: Dict[str, Any]) -> Any:
+        """
+        Get the shared, rate limited model for a provider and settings.
+
+        Args:
+            provider: Provider name
+            model_config: Model settings (see create_lm)
+
+        Returns:
+            DSPy language model wrapped with retries and rate limits
+
+        Raises:
+            ValueError: If the provider is not supported
+        """
+        key = (provider, json.dumps(model_config, sort_keys=True, default=str))
+
+        def build() -> Any:
+            logger.info(f"Creating {provider} model {model_config.get('model_name') or model_config.get('name')}")
+            return wrap_lm(create_lm(provider, model_config), provider, self.config)
+
+        return self._get_or_create(self._lms, key, build)
+
+    def get_program(self, key: Hashable, factory: Callable[[], Any]) -> Any:
+        """
+        Get a compiled program, building it on first use.
+
+        Args:
+            key: Cache key, e.g. (model name, strategy name)
+            factory: Builds and compiles the program
+
+        Returns:
+            Compiled program
+        """
+        return self._get_or_create(self._programs, key, factory)
+
+    def clear(self) -> None:
+        """Drop every cached model and program."""
+        with self._lock:
+            self._lms.clear()
+            self._programs.clear()
+            self._key_locks.clear()
@@ -0,0 +1,200 @@
+"""
+Module Optimization Manifest
+
+This module tracks the state of context module sources between batch runs so
+that only modules whose content changed since their last successful
+optimization are sent to the optimizer again.
+"""
+
+import os
+import json
+import hashlib
+import logging
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+
+
+class ModuleManifest:
+    """
+    JSON manifest of module content hashes and optimization history.
+
+    Each entry records the module's content hash, mtime and size, plus the
+    content hash, model and strategy of its last successful optimization.
+    The mtime and size are used to avoid re-hashing files that were not
+    touched since the previous run.
+    """
+
+    def __init__(self, path: str = "data/optimization_manifest.json"):
+        """
+        Initialize the manifest.
+
+        Args:
+            path: Path to the JSON manifest file
+        """
+        self.logger = logging.getLogger(__name__)
+        self.path = path
+        self.entries: Dict[str, Dict[str, Any]] = self._load()
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "ModuleManifest":
+        """
+        Create a manifest from the `paths` section of the DSP configuration.
+
+        Args:
+            config: The full configuration dictionary
+
+        Returns:
+            Manifest instance
+        """
+        paths = config.get("paths", {}) or {}
+        return cls(paths.get("manifest_path", "data/optimization_manifest.json"))
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        """Load manifest entries from disk, starting empty if none exist."""
+        if not os.path.exists(self.path):
+            return {}
+
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            return data.get("modules", {})
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"Ignoring unreadable manifest {self.path}: {str(e)}")
+            return {}
+
+    def save(self) -> None:
+        """Write the manifest to disk atomically."""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"version": 1, "modules": self.entries}, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+    @staticmethod
+    def _key(module_path: str) -> str:
+        """Normalize a module path into a manifest key."""
+        return os.path.normpath(module_path).replace(os.sep, "/")
+
+    @staticmethod
+    def hash_bytes(data: bytes) -> str:
+        """
+        Compute the SHA-256 hash of module contents already read into memory.
+
+        Args:
+            data: Raw bytes of the module file
+
+        Returns:
+            Hex digest matching hash_file for the same contents
+        """
+        return hashlib.sha256(data).hexdigest()
+
+    @staticmethod
+    def hash_file(module_path: str) -> str:
+        """
+        Compute the SHA-256 hash of a module file.
+
+        Args:
+            module_path: Path to the module file
+
+        Returns:
+            Hex digest of the file contents
+        """
+        digest = hashlib.sha256()
+        with open(module_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(65536), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def content_hash(self, module_path: str) -> str:
+        """
+        Get the current content hash of a module, re-hashing only if its
+        mtime or size changed since it was last seen.
+
+        Args:
+            module_path: Path to the module file
+
+        Returns:
+            Hex digest of the module contents
+        """
+        stat = os.stat(module_path)
+        entry = self.entries.setdefault(self._key(module_path), {})
+
+        if entry.get("mtime") == stat.st_mtime and entry.get("size") == stat.st_size and entry.get("content_hash"):
+            return entry["content_hash"]
+
+        entry["content_hash"] = self.hash_file(module_path)
+        entry["mtime"] = stat.st_mtime
+        entry["size"] = stat.st_size
+        return entry["content_hash"]
+
+    def needs_optimization(self, module_path: str, model: Optional[str] = None,
+                           strategy: Optional[str] = None) -> bool:
+        """
+        Check whether a module changed since its last successful optimization.
+
+        A module also needs optimization if it was last optimized with a
+        different model or strategy.
+
+        Args:
+            module_path: Path to the module file
+            model: Model the optimization would use
+            strategy: Strategy the optimization would use
+
+        Returns:
+            True if the module should be optimized
+        """
+        current_hash = self.content_hash(module_path)
+        entry = self.entries[self._key(module_path)]
+
+        return (
+            entry.get("last_optimized_hash") != current_hash
+            or entry.get("model") != model
+            or entry.get("strategy") != strategy
+        )
+
+    def filter_changed(self, module_paths: List[str], model: Optional[str] = None,
+                       strategy: Optional[str] = None) -> List[str]:
+        """
+        Filter a list of modules down to those that need optimization.
+
+        Args:
+            module_paths: Paths to the candidate module files
+            model: Model the optimization would use
+            strategy: Strategy the optimization would use
+
+        Returns:
+            Module paths that changed, in their original order
+        """
+        changed = [
+            path for path in module_paths
+            if self.needs_optimization(path, model, strategy)
+        ]
+        self.logger.info(f"{len(changed)} of {len(module_paths)} modules changed since last optimization")
+        return changed
+
+    def record_optimization(self, module_path: str, model: Optional[str] = None,
+                            strategy: Optional[str] = None,
+                            content_hash: Optional[str] = None) -> None:
+        """
+        Record a successful optimization of a module.
+
+        Args:
+            module_path: Path to the module file
+            model: Model used for the optimization
+            strategy: Strategy used for the optimization
+            content_hash: Hash of the content that was optimized (defaults to
+                the module's current content hash)
+        """
+        if content_hash is None:
+            content_hash = self.content_hash(module_path)
+
+        entry = self.entries.setdefault(self._key(module_path), {})
+        entry.update({
+            "last_optimized_hash": content_hash,
+            "model": model,
+            "strategy": strategy,
+            "optimized_at": datetime.now().isoformat()
+        })
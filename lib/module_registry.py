@@ -0,0 +1,343 @@
+"""
+Module Registry
+
+This module indexes the context modules under a directory by name, so
+resolving a module name to its file doesn't walk the tree. The index records
+each module's path, size, mtime, content hash and YAML front matter, and is
+kept in a sidecar file (`.module-index.json`) in the indexed directory.
+Registries that skip different directories list different modules, so the
+sidecar keeps one set of entries per set of excluded directories.
+
+Refreshing the index stats every file but only re-reads files whose mtime or
+size changed since the index was written. Lookups are dictionary reads; a
+lookup that misses, or finds a file that has since been deleted, refreshes
+the index once before giving up.
+"""
+
+import os
+import json
+import logging
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+import yaml
+
+INDEX_NAME = ".module-index.json"
+INDEX_VERSION = 2
+MODULE_EXTENSION = ".md"
+
+# Directories that hold copies of modules rather than modules
+DEFAULT_EXCLUDE_DIRS = ("_optimized", "_backups")
+
+YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+logger = logging.getLogger(__name__)
+
+
+def parse_front_matter(text: str) -> Dict[str, Any]:
+    """
+    Parse the YAML front matter at the start of a module.
+
+    Args:
+        text: Module content
+
+    Returns:
+        Front matter fields, or an empty dict if there is none or it is invalid
+    """
+    if not text.startswith("---"):
+        return {}
+
+    lines = text.splitlines()
+    for index, line in enumerate(lines[1:], start=1):
+        if line.strip() == "---":
+            try:
+                data = yaml.load("\n".join(lines[1:index]), Loader=YAML_LOADER)
+            except yaml.YAMLError:
+                return {}
+            return data if isinstance(data, dict) else {}
+    return {}
+
+
+class ModuleRegistry:
+    """
+    Index of the context modules under a root directory.
+
+    Modules are named by their path relative to the root without the `.md`
+    suffix (e.g. `languages/python`). `resolve` also accepts a bare file
+    stem (`python`) and returns the first module with that stem in sorted
+    order.
+    """
+
+    def __init__(self, root: str, index_path: Optional[str] = None,
+                 exclude_dirs: Iterable[str] = DEFAULT_EXCLUDE_DIRS):
+        """
+        Initialize the registry and bring its index up to date.
+
+        Args:
+            root: Directory containing the modules
+            index_path: Path to the index file (defaults to `.module-index.json`
+                in the root); None keeps the default
+            exclude_dirs: Directory names to skip while scanning
+        """
+        self.root = Path(root)
+        self.index_path = Path(index_path) if index_path else self.root / INDEX_NAME
+        self.exclude_dirs = set(exclude_dirs)
+        self._index_key = ",".join(sorted(self.exclude_dirs))
+        self.entries: Dict[str, Dict[str, Any]] = self._load()
+        self._by_stem: Dict[str, List[str]] = {}
+        self._lock = threading.RLock()
+        self.refresh()
+
+    def _read_index(self) -> Dict[str, Any]:
+        """Read the index file, returning an empty index if it is missing, unreadable or outdated."""
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable module index {self.index_path}: {str(e)}")
+            return {}
+
+        if not isinstance(data, dict) or data.get("version") != INDEX_VERSION:
+            return {}
+        return data
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        """Load this exclusion set's index entries from disk, starting empty if none exist."""
+        entries = self._read_index().get("indexes", {}).get(self._index_key)
+        self._saved = entries is not None
+        return entries or {}
+
+    def save(self) -> None:
+        """Write the index to disk atomically, if the root exists and is writable."""
+        if not self.root.is_dir():
+            return
+
+        tmp_path = f"{self.index_path}.{os.getpid()}.tmp"
+        try:
+            with self._lock:
+                # Keep the entries saved by registries with other exclusion sets
+                indexes = self._read_index().get("indexes", {})
+                indexes[self._index_key] = self.entries
+                data = {"version": INDEX_VERSION, "indexes": indexes}
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(data, f, indent=1, sort_keys=True)
+            os.replace(tmp_path, self.index_path)
+            self._saved = True
+        except OSError as e:
+            # The index only saves work on the next run
+            logger.warning(f"Cannot save module index {self.index_path}: {str(e)}")
+
+    def _scan(self) -> Dict[str, os.stat_result]:
+        """Walk the root, returning the stat of every module file by name."""
+        found = {}
+        for root, dirs, names in os.walk(self.root):
+            dirs[:] = [d for d in dirs if not d.startswith('.') and d not in self.exclude_dirs]
+            for name in names:
+                if not name.endswith(MODULE_EXTENSION):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                rel_path = os.path.relpath(path, self.root).replace(os.sep, "/")
+                found[rel_path[:-len(MODULE_EXTENSION)]] = stat
+        return found
+
+    def _read_entry(self, name: str, stat: os.stat_result) -> Optional[Dict[str, Any]]:
+        """Read a module file and build its index entry."""
+        rel_path = f"{name}{MODULE_EXTENSION}"
+        try:
+            with open(self.root / rel_path, 'rb') as f:
+                data = f.read()
+        except OSError as e:
+            logger.warning(f"Cannot read module {rel_path}: {str(e)}")
+            return None
+
+        # Loading OpenSSL is a noticeable share of CLI startup, and a refresh
+        # that finds nothing changed never hashes
+        import hashlib
+
+        return {
+            "path": rel_path,
+            "size": stat.st_size,
+            "mtime": stat.st_mtime,
+            "hash": hashlib.sha256(data).hexdigest(),
+            "front_matter": parse_front_matter(data.decode('utf-8', errors='replace'))
+        }
+
+    def _rebuild_stems(self) -> None:
+        """Rebuild the stem -> names lookup from the entries."""
+        by_stem: Dict[str, List[str]] = {}
+        for name in sorted(self.entries):
+            by_stem.setdefault(name.rsplit("/", 1)[-1], []).append(name)
+        self._by_stem = by_stem
+
+    def refresh(self) -> Dict[str, List[str]]:
+        """
+        Bring the index up to date with the files on disk and save it if
+        anything changed.
+
+        Returns:
+            Names of the modules that were added, changed and removed
+        """
+        with self._lock:
+            found = self._scan()
+            changes = {"added": [], "changed": [], "removed": []}
+            # Touched files that kept their content still need their new mtime saved
+            dirty = not self._saved
+
+            for name in sorted(set(self.entries) - set(found)):
+                del self.entries[name]
+                changes["removed"].append(name)
+
+            for name, stat in sorted(found.items()):
+                entry = self.entries.get(name)
+                if entry and entry["mtime"] == stat.st_mtime and entry["size"] == stat.st_size:
+                    continue
+
+                new_entry = self._read_entry(name, stat)
+                if new_entry is None:
+                    continue
+                if entry is None:
+                    changes["added"].append(name)
+                elif entry["hash"] != new_entry["hash"]:
+                    changes["changed"].append(name)
+                self.entries[name] = new_entry
+                dirty = True
+
+            self._rebuild_stems()
+
+        if any(changes.values()):
+            logger.info(f"Module index for {self.root}: {len(changes['added'])} added, "
+                        f"{len(changes['changed'])} changed, {len(changes['removed'])} removed")
+        if dirty or changes["removed"]:
+            self.save()
+        return changes
+
+    def update(self, path: str) -> Optional[str]:
+        """
+        Update the entry of one module file after it was created, changed or
+        deleted, without rescanning the tree.
+
+        Args:
+            path: Path to the module file
+
+        Returns:
+            Name of the module, or None if the path is not a module under the root
+        """
+        try:
+            rel_path = Path(os.path.abspath(path)).relative_to(os.path.abspath(self.root)).as_posix()
+        except ValueError:
+            return None
+
+        parts = rel_path.split("/")
+        if not rel_path.endswith(MODULE_EXTENSION) or any(
+            part.startswith('.') or part in self.exclude_dirs for part in parts[:-1]
+        ):
+            return None
+
+        name = rel_path[:-len(MODULE_EXTENSION)]
+        with self._lock:
+            try:
+                entry = self._read_entry(name, os.stat(path))
+            except OSError:
+                entry = None
+
+            if entry is None:
+                self.entries.pop(name, None)
+            else:
+                self.entries[name] = entry
+            self._rebuild_stems()
+
+        self.save()
+        return name
+
+    def _lookup(self, name: str) -> Optional[str]:
+        """Find the indexed name for a module name or file stem."""
+        name = name.replace("\\", "/")
+        if name.endswith(MODULE_EXTENSION):
+            name = name[:-len(MODULE_EXTENSION)]
+        if name in self.entries:
+            return name
+
+        names = self._by_stem.get(name)
+        return names[0] if names else None
+
+    def resolve(self, name: str) -> Optional[Path]:
+        """
+        Resolve a module name to its file.
+
+        Args:
+            name: Module name relative to the root, or a bare file stem
+
+        Returns:
+            Path to the module file, or None if there is no such module
+        """
+        indexed = self._lookup(name)
+        if indexed is not None:
+            path = self.root / self.entries[indexed]["path"]
+            if path.exists():
+                return path
+
+        # The tree changed since the last refresh
+        self.refresh()
+        indexed = self._lookup(name)
+        return self.root / self.entries[indexed]["path"] if indexed is not None else None
+
+    def get(self, name: str) -> Optional[Dict[str, Any]]:
+        """
+        Get the index entry of a module.
+
+        Args:
+            name: Module name relative to the root, or a bare file stem
+
+        Returns:
+            The entry (path, size, mtime, hash and front_matter), or None
+        """
+        indexed = self._lookup(name)
+        return self.entries[indexed] if indexed is not None else None
+
+    def names(self) -> List[str]:
+        """List the names of all indexed modules, sorted."""
+        return sorted(self.entries)
+
+    def paths(self) -> List[Path]:
+        """List the files of all indexed modules, sorted by name."""
+        return [self.root / self.entries[name]["path"] for name in self.names()]
+
+    def __contains__(self, name: str) -> bool:
+        return self._lookup(name) is not None
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+
+_registries: Dict[tuple, ModuleRegistry] = {}
+_registries_lock = threading.Lock()
+
+
+def get_registry(root: str, exclude_dirs: Iterable[str] = DEFAULT_EXCLUDE_DIRS) -> ModuleRegistry:
+    """
+    Get the shared registry for a directory, creating it on first use.
+
+    Callers in the same process share one index per directory, so the tree
+    is scanned once. Call `refresh` on it to pick up later changes.
+
+    Args:
+        root: Directory containing the modules
+        exclude_dirs: Directory names to skip while scanning
+
+    Returns:
+        Module registry
+    """
+    key = (os.path.abspath(root), tuple(sorted(exclude_dirs)))
+    with _registries_lock:
+        registry = _registries.get(key)
+        if registry is None:
+            registry = ModuleRegistry(root, exclude_dirs=exclude_dirs)
+            _registries[key] = registry
+        return registry
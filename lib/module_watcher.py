@@ -0,0 +1,138 @@
+"""
+Module Watcher
+
+This module polls a module registry (lib/module_registry.py) for edited
+context modules and reports each one once it has been quiet for a debounce
+period, so a burst of saves triggers a single re-optimization. Touching a
+file without changing its content doesn't count as an edit. It also holds the
+live status table that `optimize_context.py watch` redraws as modules move
+through the pipeline.
+"""
+
+import time
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from lib.module_registry import ModuleRegistry
+
+# Status table columns: (field, heading, width)
+STATUS_COLUMNS = (
+    ("module", "module", 32),
+    ("state", "state", 12),
+    ("tokens", "tokens", 9),
+    ("optimized_tokens", "optimized", 11),
+    ("token_reduction", "reduction", 11),
+    ("improvement", "eval", 9),
+    ("updated", "updated", 10),
+)
+
+
+class ModuleWatcher:
+    """
+    Debounced change detection over a module registry.
+
+    Changes already on disk when the watcher starts are part of its baseline;
+    only edits made afterwards are reported.
+    """
+
+    def __init__(self, registry: ModuleRegistry, debounce: float = 2.0):
+        """
+        Initialize the watcher.
+
+        Args:
+            registry: Registry of the directory to watch
+            debounce: Seconds a module must go unchanged before it is reported
+        """
+        self.registry = registry
+        self.debounce = debounce
+        # Last time each edited module was seen changing
+        self.pending: Dict[str, float] = {}
+
+    def poll(self, busy: Optional[Set[str]] = None) -> Tuple[List[str], List[str]]:
+        """
+        Check the directory for changes.
+
+        Args:
+            busy: Modules still being processed; their new edits stay pending
+                until they are done
+
+        Returns:
+            Modules whose edits have settled, and modules that were removed
+        """
+        changes = self.registry.refresh()
+        now = time.monotonic()
+
+        for name in changes["added"] + changes["changed"]:
+            self.pending[name] = now
+        for name in changes["removed"]:
+            self.pending.pop(name, None)
+
+        busy = busy or set()
+        ready = sorted(
+            name for name, changed_at in self.pending.items()
+            if now - changed_at >= self.debounce and name not in busy
+        )
+        for name in ready:
+            del self.pending[name]
+
+        return ready, changes["removed"]
+
+
+class ModuleStatusTable:
+    """Thread-safe status of each module handled by the watcher."""
+
+    def __init__(self):
+        self.rows: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def update(self, module: str, **fields: Any) -> Dict[str, Any]:
+        """
+        Update a module's row.
+
+        Args:
+            module: Module name
+            **fields: Row fields to set (state, tokens, error, ...)
+
+        Returns:
+            Copy of the updated row
+        """
+        with self._lock:
+            row = self.rows.setdefault(module, {"module": module})
+            row.update(fields)
+            row["updated"] = datetime.now().strftime("%H:%M:%S")
+            return dict(row)
+
+    def render(self) -> str:
+        """Render the table as text, one row per module, then any errors."""
+        with self._lock:
+            rows = [dict(self.rows[name]) for name in sorted(self.rows)]
+
+        lines = ["".join(f"{heading:<{width}}" for _, heading, width in STATUS_COLUMNS).rstrip()]
+        for row in rows:
+            lines.append(format_status_row(row))
+
+        errors = [f"  {row['module']}: {row['error']}" for row in rows if row.get("error")]
+        if errors:
+            lines.append("")
+            lines.append("Errors:")
+            lines.extend(errors)
+        return "\n".join(lines)
+
+
+def format_status_row(row: Dict[str, Any]) -> str:
+    """Format one status row with the table's column widths."""
+    cells = []
+    for field, _, width in STATUS_COLUMNS:
+        value = row.get(field)
+        if value is None:
+            text = "-"
+        elif field in ("token_reduction", "improvement"):
+            text = f"{value:.1f}%"
+        else:
+            text = str(value)
+
+        if len(text) >= width:
+            text = text[:width - 2] + "~"
+        cells.append(f"{text:<{width}}")
+    return "".join(cells).rstrip()
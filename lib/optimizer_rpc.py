@@ -0,0 +1,247 @@
+"""
+Optimizer Daemon Protocol
+
+This module holds the wire protocol and client for the resident optimizer
+process (scripts/optimizer_daemon.py). Requests and responses are JSON-RPC
+2.0 objects, one per line, over a Unix domain socket. It only uses the
+standard library, so CLIs can talk to the daemon without paying for the
+imports the daemon keeps warm.
+"""
+
+import os
+import json
+import socket
+import hashlib
+import itertools
+from typing import Any, BinaryIO, Dict, Optional
+
+DEFAULT_SOCKET_PATH = "data/optimizer.sock"
+
+# Seconds to wait for a ping, so a daemon that accepts connections but hangs
+# doesn't block every CLI command
+PING_TIMEOUT = 2.0
+
+# JSON-RPC 2.0 error codes
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+INTERNAL_ERROR = -32603
+
+
+class RPCError(Exception):
+    """Error returned by the daemon, or raised by a method to be returned to the caller."""
+
+    def __init__(self, code: int, message: str, data: Any = None):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+        self.data = data
+
+    def to_dict(self) -> Dict[str, Any]:
+        error = {"code": self.code, "message": self.message}
+        if self.data is not None:
+            error["data"] = self.data
+        return error
+
+
+def socket_path_from_config(config: Dict[str, Any]) -> str:
+    """
+    Get the daemon socket path from the `daemon` section of the configuration.
+
+    Args:
+        config: The full configuration dictionary
+
+    Returns:
+        Socket path
+    """
+    return (config.get("daemon", {}) or {}).get("socket_path") or DEFAULT_SOCKET_PATH
+
+
+def config_hash(config_path: str) -> Optional[str]:
+    """
+    Hash a configuration file's content.
+
+    The daemon reports the hash of the file it loaded, so clients can tell
+    when the file was edited after the daemon started.
+
+    Args:
+        config_path: Path to the configuration file
+
+    Returns:
+        SHA-256 hex digest, or None if the file cannot be read
+    """
+    try:
+        with open(config_path, 'rb') as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    except OSError:
+        return None
+
+
+def write_message(stream: BinaryIO, message: Dict[str, Any]) -> None:
+    """Write one JSON-RPC message as a line."""
+    stream.write(json.dumps(message, default=str).encode("utf-8") + b"\n")
+    stream.flush()
+
+
+def read_message(stream: BinaryIO) -> Optional[Dict[str, Any]]:
+    """
+    Read one JSON-RPC message.
+
+    Returns:
+        The decoded message, or None when the peer closed the connection
+
+    Raises:
+        RPCError: If the line is not a JSON object
+    """
+    line = stream.readline()
+    if not line:
+        return None
+
+    try:
+        message = json.loads(line)
+    except ValueError as e:
+        raise RPCError(PARSE_ERROR, f"Parse error: {str(e)}")
+
+    if not isinstance(message, dict):
+        raise RPCError(INVALID_REQUEST, "Request must be a JSON object")
+    return message
+
+
+class OptimizerClient:
+    """
+    Client for the optimizer daemon.
+
+    A client keeps one connection open, so several calls reuse it. Calls
+    block until the daemon answers; optimizations can take minutes, so only
+    connecting is bounded by the timeout.
+    """
+
+    def __init__(self, socket_path: str = DEFAULT_SOCKET_PATH, connect_timeout: float = 1.0):
+        """
+        Initialize the client.
+
+        Args:
+            socket_path: Path to the daemon's Unix socket
+            connect_timeout: Seconds to wait for the connection
+        """
+        self.socket_path = socket_path
+        self.connect_timeout = connect_timeout
+        self._socket = None
+        self._stream = None
+        self._ids = itertools.count(1)
+
+    def connect(self) -> None:
+        """
+        Connect to the daemon.
+
+        Raises:
+            OSError: If no daemon is listening on the socket
+        """
+        if self._socket is not None:
+            return
+
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.connect_timeout)
+        try:
+            sock.connect(self.socket_path)
+        except OSError:
+            sock.close()
+            raise
+        sock.settimeout(None)
+
+        self._socket = sock
+        self._stream = sock.makefile("rwb")
+
+    def call(self, method: str, **params) -> Any:
+        """
+        Call a daemon method.
+
+        Args:
+            method: Method name
+            **params: Method parameters
+
+        Returns:
+            The method's result
+
+        Raises:
+            RPCError: If the daemon returned an error
+            ConnectionError: If the daemon closed the connection
+        """
+        self.connect()
+        request_id = next(self._ids)
+        write_message(self._stream, {"jsonrpc": "2.0", "id": request_id, "method": method, "params": params})
+
+        response = read_message(self._stream)
+        if response is None:
+            self.close()
+            raise ConnectionError("Optimizer daemon closed the connection")
+
+        if "error" in response:
+            error = response["error"]
+            raise RPCError(error.get("code", INTERNAL_ERROR), error.get("message", ""), error.get("data"))
+        return response.get("result")
+
+    def ping(self, timeout: float = PING_TIMEOUT) -> Dict[str, Any]:
+        """
+        Ping the daemon, waiting at most `timeout` seconds for the answer.
+
+        Returns:
+            The daemon's identity (pid, config_path, config_hash, cwd, uptime)
+
+        Raises:
+            OSError: If no daemon answers in time
+            RPCError: If the daemon returned an error
+        """
+        self.connect()
+        self._socket.settimeout(timeout)
+        try:
+            return self.call("ping")
+        except OSError:
+            # The stream may hold part of a late answer
+            self.close()
+            raise
+        finally:
+            if self._socket is not None:
+                self._socket.settimeout(None)
+
+    def is_running(self) -> bool:
+        """Check whether a daemon answers a ping on the socket."""
+        if not os.path.exists(self.socket_path):
+            return False
+
+        try:
+            self.ping()
+            return True
+        except (OSError, RPCError):
+            self.close()
+            return False
+
+    def close(self) -> None:
+        """Close the connection."""
+        if self._stream is not None:
+            self._stream.close()
+        if self._socket is not None:
+            self._socket.close()
+        self._socket = None
+        self._stream = None
+
+    def __enter__(self) -> "OptimizerClient":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def connect_to_daemon(config: Dict[str, Any]) -> Optional[OptimizerClient]:
+    """
+    Get a client for the running daemon, if there is one.
+
+    Args:
+        config: The full configuration dictionary
+
+    Returns:
+        Connected client, or None when no daemon is listening
+    """
+    client = OptimizerClient(socket_path_from_config(config))
+    return client if client.is_running() else None
@@ -0,0 +1,107 @@
+"""
+Request Packing
+
+This module bin-packs small context blocks into shared LLM requests. Each
+block is wrapped in numbered markers so a single response can be split back
+into one optimized block per input. Blocks missing from a response are
+reported so callers can fall back to sending them on their own.
+"""
+
+import re
+from typing import Callable, Dict, Hashable, List, Sequence, Tuple, TypeVar
+
+T = TypeVar("T")
+
+BLOCK_START = "<<<BLOCK {id}>>>"
+BLOCK_END = "<<<END BLOCK {id}>>>"
+
+BLOCK_PATTERN = re.compile(r'<<<BLOCK (\w+)>>>[ \t]*\n?(.*?)\n?[ \t]*<<<END BLOCK \1>>>', re.DOTALL)
+
+PACKING_INSTRUCTIONS = """
+The content contains several independent blocks, each starting with a <<<BLOCK id>>> line and
+ending with a <<<END BLOCK id>>> line. Optimize every block on its own and return all of them,
+each wrapped in its original marker lines with the same id and in the same order. Do not merge,
+drop or add blocks, and do not write anything outside the markers.
+"""
+
+
+def pack_items(
+    items: Sequence[T],
+    size: Callable[[T], int],
+    group: Callable[[T], Hashable],
+    budget: int,
+    max_groups: int
+) -> List[List[T]]:
+    """
+    Bin-pack items with first-fit decreasing.
+
+    Each bin holds at most `budget` in total size and items from at most
+    `max_groups` distinct groups (e.g. modules). Items larger than the budget
+    get a bin of their own.
+
+    Args:
+        items: Items to pack
+        size: Size of an item (e.g. its token count)
+        group: Group an item belongs to
+        budget: Maximum total size of a bin
+        max_groups: Maximum number of distinct groups in a bin
+
+    Returns:
+        Bins of items, each in the input order
+    """
+    order = {id(item): index for index, item in enumerate(items)}
+    bins: List[Tuple[int, set, List[T]]] = []
+
+    for item in sorted(items, key=size, reverse=True):
+        item_size, item_group = size(item), group(item)
+
+        for index, (used, groups, members) in enumerate(bins):
+            fits_groups = item_group in groups or len(groups) < max_groups
+            if used + item_size <= budget and fits_groups:
+                members.append(item)
+                groups.add(item_group)
+                bins[index] = (used + item_size, groups, members)
+                break
+        else:
+            bins.append((item_size, {item_group}, [item]))
+
+    return [sorted(members, key=lambda item: order[id(item)]) for _, _, members in bins]
+
+
+def format_packed_request(blocks: Sequence[Tuple[str, str]]) -> str:
+    """
+    Combine blocks into the content of one packed request.
+
+    Args:
+        blocks: (id, content) pairs; ids must be alphanumeric
+
+    Returns:
+        Request content with each block wrapped in its markers
+    """
+    return "\n\n".join(
+        f"{BLOCK_START.format(id=block_id)}\n{content.strip()}\n{BLOCK_END.format(id=block_id)}"
+        for block_id, content in blocks
+    )
+
+
+def split_packed_response(response: str, block_ids: Sequence[str]) -> Dict[str, str]:
+    """
+    Split a packed response back into its blocks.
+
+    Args:
+        response: Model output for a packed request
+        block_ids: Ids of the blocks that were sent
+
+    Returns:
+        Optimized content by block id, for the ids found (blocks that are
+        missing or empty are left out)
+    """
+    expected = set(block_ids)
+    blocks = {}
+
+    for match in BLOCK_PATTERN.finditer(response):
+        block_id, content = match.group(1), match.group(2).strip()
+        if block_id in expected and block_id not in blocks and content:
+            blocks[block_id] = content
+
+    return blocks
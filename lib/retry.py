@@ -0,0 +1,410 @@
+"""
+LLM Request Retries and Rate Limiting
+
+This module wraps DSPy language models so that every request goes through a
+per-provider limiter and is retried on transient failures. The limiter
+combines a token bucket (sustained requests per minute with a burst
+allowance) and a cap on in-flight requests. Failed requests are retried with
+exponential backoff and full jitter. A Retry-After hint from a rate limit
+response pauses the whole provider, so concurrent workers back off together
+instead of retrying into the same limit.
+
+Example configuration (`dsp.lm_config`):
+
+    max_attempts: 3            # Attempts per LLM request
+    retry_delay: 2             # Base backoff in seconds, doubled per attempt
+    max_retry_delay: 60        # Cap on a single backoff
+    rate_limits:
+      openai:
+        max_concurrent_requests: 4
+        requests_per_minute: 500
+        burst: 10
+"""
+
+import time
+import random
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional
+
+from lib.tracing import current_span
+
+logger = logging.getLogger(__name__)
+
+# HTTP statuses worth retrying: timeouts, conflicts, rate limits and server errors
+RETRYABLE_STATUS_CODES = {408, 409, 425, 429, 500, 502, 503, 504, 529}
+
+# Provider SDK exceptions that carry no status code but are transient
+RETRYABLE_ERROR_NAMES = {
+    "RateLimitError", "APIConnectionError", "APITimeoutError", "Timeout",
+    "InternalServerError", "ServiceUnavailableError", "OverloadedError",
+}
+
+
+def _status_code(error: BaseException) -> Optional[int]:
+    """Get the HTTP status of a provider error, if it carries one."""
+    for candidate in (error, getattr(error, "response", None)):
+        for attribute in ("status_code", "http_status", "status"):
+            value = getattr(candidate, attribute, None)
+            if isinstance(value, int):
+                return value
+    return None
+
+
+def get_retry_after(error: BaseException) -> Optional[float]:
+    """
+    Get the delay a provider asked for before the next request.
+
+    Args:
+        error: Exception raised by the request
+
+    Returns:
+        Seconds to wait, or None when the error carries no Retry-After hint
+    """
+    value = getattr(error, "retry_after", None)
+
+    if value is None:
+        headers = getattr(getattr(error, "response", None), "headers", None) or getattr(error, "headers", None)
+        if headers:
+            value = headers.get("retry-after") or headers.get("Retry-After")
+
+    if value is None:
+        return None
+
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        pass
+
+    # Retry-After may also be an HTTP date
+    from email.utils import parsedate_to_datetime
+
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def is_retryable(error: BaseException) -> bool:
+    """
+    Check whether a failed request is worth retrying.
+
+    Args:
+        error: Exception raised by the request
+
+    Returns:
+        True for rate limits, timeouts, connection failures and server errors
+    """
+    if isinstance(error, (ConnectionError, TimeoutError)):
+        return True
+
+    status = _status_code(error)
+    if status is not None:
+        return status in RETRYABLE_STATUS_CODES
+
+    return type(error).__name__ in RETRYABLE_ERROR_NAMES
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket limiting the sustained request rate.
+
+    The bucket starts full, so up to `capacity` requests go out at once
+    before the refill rate applies.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        """
+        Initialize the bucket.
+
+        Args:
+            rate: Tokens added per second
+            capacity: Maximum stored tokens (default: one second of tokens, at least 1)
+        """
+        self.rate = rate
+        self.capacity = max(1.0, capacity if capacity is not None else rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self) -> float:
+        """
+        Take one token, blocking until one is available.
+
+        Returns:
+            Seconds spent waiting
+        """
+        started = time.monotonic()
+
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return now - started
+                wait = (1 - self._tokens) / self.rate
+
+            time.sleep(wait)
+
+
+class ProviderLimiter:
+    """
+    Limits the request rate and concurrency for one provider.
+
+    Providers without a configured rate or concurrency cap are only paused
+    by Retry-After hints.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_concurrent_requests: Optional[int] = None,
+        requests_per_minute: Optional[float] = None,
+        burst: Optional[float] = None
+    ):
+        """
+        Initialize the limiter.
+
+        Args:
+            name: Provider name, for logging
+            max_concurrent_requests: Maximum requests in flight at once
+            requests_per_minute: Sustained request rate
+            burst: Requests allowed at once before the rate applies
+        """
+        self.name = name
+        self._semaphore = threading.BoundedSemaphore(max_concurrent_requests) if max_concurrent_requests else None
+        self._bucket = TokenBucket(requests_per_minute / 60, burst) if requests_per_minute else None
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def pause(self, seconds: float) -> None:
+        """
+        Hold back every request to the provider for a while.
+
+        Args:
+            seconds: How long to pause from now
+        """
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        logger.info(f"Pausing {self.name} requests for {seconds:.1f}s")
+
+    def _wait_for_pause(self) -> float:
+        waited = 0.0
+        while True:
+            with self._lock:
+                remaining = self._paused_until - time.monotonic()
+            if remaining <= 0:
+                return waited
+            time.sleep(remaining)
+            waited += remaining
+
+    @contextmanager
+    def slot(self) -> Iterator[float]:
+        """
+        Hold a request slot for the duration of the block.
+
+        Yields:
+            Seconds spent waiting for the slot
+        """
+        started = time.monotonic()
+        self._wait_for_pause()
+        if self._bucket:
+            self._bucket.acquire()
+        if self._semaphore:
+            self._semaphore.acquire()
+
+        try:
+            yield time.monotonic() - started
+        finally:
+            if self._semaphore:
+                self._semaphore.release()
+
+
+_limiters: Dict[str, ProviderLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_provider_limiter(provider: str, **limits) -> ProviderLimiter:
+    """
+    Get the shared limiter for a provider.
+
+    Limiters are shared per provider across the process, so every model and
+    client using the same provider draws from the same limits.
+
+    Args:
+        provider: Provider name (e.g. "openai")
+        **limits: Settings passed to ProviderLimiter on first creation
+
+    Returns:
+        Limiter for the provider
+    """
+    with _limiters_lock:
+        limiter = _limiters.get(provider)
+        if limiter is None:
+            limiter = ProviderLimiter(provider, **limits)
+            _limiters[provider] = limiter
+        return limiter
+
+
+class RetryPolicy:
+    """Exponential backoff with full jitter for transient request failures."""
+
+    def __init__(self, max_attempts: int = 3, base_delay: float = 2.0, max_delay: float = 60.0,
+                 jitter: bool = True):
+        """
+        Initialize the policy.
+
+        Args:
+            max_attempts: Total attempts per request, including the first
+            base_delay: Backoff cap before the first retry, doubled per attempt
+            max_delay: Largest backoff cap
+            jitter: Draw each backoff uniformly between zero and its cap
+        """
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.jitter = jitter
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "RetryPolicy":
+        """
+        Create a policy from `dsp.lm_config` in the DSP configuration.
+
+        Args:
+            config: The full configuration dictionary
+
+        Returns:
+            Configured policy
+        """
+        lm_config = (config.get("dsp", {}) or {}).get("lm_config", {}) or {}
+        return cls(
+            max_attempts=lm_config.get("max_attempts", 3),
+            base_delay=lm_config.get("retry_delay", 2.0),
+            max_delay=lm_config.get("max_retry_delay", 60.0)
+        )
+
+    def backoff(self, attempt: int) -> float:
+        """
+        Get the backoff before retrying after a failed attempt.
+
+        Args:
+            attempt: Number of the attempt that failed, starting at 1
+
+        Returns:
+            Seconds to wait
+        """
+        cap = min(self.max_delay, self.base_delay * (2 ** (attempt - 1)))
+        return random.uniform(0, cap) if self.jitter else cap
+
+    def call(self, fn: Callable, *args, limiter: Optional[ProviderLimiter] = None, **kwargs) -> Any:
+        """
+        Call a function, retrying transient failures.
+
+        The limiter slot is released while backing off, so waiting retries
+        don't hold up other requests.
+
+        Args:
+            fn: Function making the request
+            *args: Positional arguments for fn
+            limiter: Optional provider limiter each attempt goes through
+            **kwargs: Keyword arguments for fn
+
+        Returns:
+            Result of fn
+        """
+        span = current_span()
+
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                if limiter is None:
+                    return fn(*args, **kwargs)
+
+                with limiter.slot() as waited:
+                    if span is not None and waited:
+                        span.add("limiter_wait_ms", round(waited * 1000, 3))
+                    return fn(*args, **kwargs)
+
+            except Exception as e:
+                if attempt >= self.max_attempts or not is_retryable(e):
+                    raise
+
+                delay = self.backoff(attempt)
+                retry_after = get_retry_after(e)
+                if retry_after is not None:
+                    delay = max(delay, retry_after)
+                    if limiter is not None:
+                        limiter.pause(retry_after)
+
+                if span is not None:
+                    span.add("retries")
+                logger.warning(f"Request failed ({type(e).__name__}: {e}); "
+                               f"retrying in {delay:.2f}s (attempt {attempt + 1}/{self.max_attempts})")
+                time.sleep(delay)
+
+
+class RateLimitedLM:
+    """
+    Proxy for a DSPy language model that limits and retries every request.
+
+    Attributes not defined here (kwargs, history, provider, ...) are read
+    from the wrapped model, so DSPy can use the proxy in its place.
+    """
+
+    def __init__(self, lm: Any, policy: RetryPolicy, limiter: Optional[ProviderLimiter] = None):
+        """
+        Initialize the proxy.
+
+        Args:
+            lm: DSPy language model to wrap
+            policy: Retry policy for failed requests
+            limiter: Provider limiter each request goes through
+        """
+        self.lm = lm
+        self.policy = policy
+        self.limiter = limiter
+
+    def __call__(self, *args, **kwargs):
+        return self.policy.call(self.lm, *args, limiter=self.limiter, **kwargs)
+
+    def basic_request(self, *args, **kwargs):
+        return self.policy.call(self.lm.basic_request, *args, limiter=self.limiter, **kwargs)
+
+    def copy(self, **kwargs) -> "RateLimitedLM":
+        """Copy the wrapped model with updated settings, keeping the same limits."""
+        return RateLimitedLM(self.lm.copy(**kwargs), self.policy, self.limiter)
+
+    def __getattr__(self, name: str) -> Any:
+        # Guard against recursion before __init__ has set the wrapped model
+        if name == "lm":
+            raise AttributeError(name)
+        return getattr(self.lm, name)
+
+
+def wrap_lm(lm: Any, provider: str, config: Dict[str, Any]) -> RateLimitedLM:
+    """
+    Wrap a DSPy language model with the configured retries and provider limits.
+
+    Args:
+        lm: DSPy language model
+        provider: Provider name, selecting `dsp.lm_config.rate_limits.<provider>`
+        config: The full configuration dictionary
+
+    Returns:
+        Rate limited model
+    """
+    lm_config = (config.get("dsp", {}) or {}).get("lm_config", {}) or {}
+    limits = (lm_config.get("rate_limits", {}) or {}).get(provider) or {}
+
+    limiter = get_provider_limiter(
+        provider,
+        max_concurrent_requests=limits.get("max_concurrent_requests"),
+        requests_per_minute=limits.get("requests_per_minute"),
+        burst=limits.get("burst")
+    )
+    return RateLimitedLM(lm, RetryPolicy.from_config(config), limiter)
@@ -0,0 +1,273 @@
+"""
+Streaming Table Export
+
+This module exports SQLite tables without loading them into memory. Rows are
+read from the cursor in fixed-size batches and written incrementally as
+NDJSON (optionally gzip-compressed) or Parquet, so memory use stays constant
+regardless of history size.
+
+Incremental exports use a cursor holding the last exported rowid of each
+table (e.g. `feedback=1500,optimization_results=12`). Rowids only grow as
+rows are inserted, so rows written in the same second as the previous export,
+or in a table whose timestamps are formatted differently, are never skipped.
+A plain timestamp is still accepted as `since` for a first export.
+"""
+
+import os
+import re
+import gzip
+import json
+import sqlite3
+import logging
+from datetime import datetime
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+STREAMING_FORMATS = ("ndjson", "parquet")
+
+CURSOR_PATTERN = re.compile(r'^\w+=\d+(,\w+=\d+)*$')
+
+# Alias of the rowid selected ahead of each table's own columns
+ROWID_COLUMN = "_export_rowid"
+
+
+def parse_cursor(since: Optional[str]) -> Optional[Dict[str, int]]:
+    """
+    Parse an export cursor.
+
+    Args:
+        since: Cursor returned by a previous export, or a timestamp
+
+    Returns:
+        Last exported rowid by table, or None if `since` is not a cursor
+    """
+    if not since or not CURSOR_PATTERN.match(since):
+        return None
+    return {table: int(rowid) for table, rowid in (part.split("=") for part in since.split(","))}
+
+
+def format_cursor(cursors: Dict[str, int]) -> str:
+    """Format per-table rowids as a cursor string for `since`."""
+    return ",".join(f"{table}={rowid}" for table, rowid in cursors.items())
+
+
+def detect_format(output_path: str) -> str:
+    """
+    Infer the export format from an output path.
+
+    Args:
+        output_path: Path of the export file
+
+    Returns:
+        "parquet", "ndjson" or "json" (the legacy single-document format)
+    """
+    path = output_path[:-3] if output_path.endswith(".gz") else output_path
+
+    if path.endswith(".parquet"):
+        return "parquet"
+    if path.endswith((".ndjson", ".jsonl")):
+        return "ndjson"
+    return "json"
+
+
+class StreamingExporter:
+    """
+    Streams rows from one or more tables of a SQLite database to a file.
+
+    NDJSON exports hold one line per row, shaped as
+    {"table": <name>, "record": {...}}. Parquet exports write one file per
+    table next to the output path (<stem>.<table>.parquet), since each
+    Parquet file has a single schema.
+    """
+
+    def __init__(self, conn: sqlite3.Connection, batch_size: int = 5000):
+        """
+        Initialize the exporter.
+
+        Args:
+            conn: Open SQLite connection
+            batch_size: Rows fetched from the cursor per batch
+        """
+        self.conn = conn
+        self.batch_size = batch_size
+
+    def _iter_batches(
+        self,
+        table: str,
+        timestamp_column: Optional[str],
+        since: Optional[str],
+        filters: Optional[Dict[str, Any]],
+        cursor: Dict[str, int]
+    ) -> Tuple[List[str], Iterator[List[tuple]]]:
+        """
+        Run the export query for a table and return its columns and row batches.
+
+        Rows are read in rowid order up to the table's highest rowid when the
+        export starts, which becomes the table's entry in `cursor`. Rows
+        inserted while the export runs are left for the next one.
+        """
+        cursors = parse_cursor(since)
+        last_rowid = cursors.get(table, 0) if cursors is not None else 0
+        max_rowid = self.conn.execute(f"SELECT MAX(rowid) FROM {table}").fetchone()[0]
+        cursor[table] = max(last_rowid, max_rowid or 0)
+
+        clauses = ["rowid > ?", "rowid <= ?"]
+        params: List[Any] = [last_rowid, cursor[table]]
+
+        # A timestamp only selects rows on a first export; cursors take over after it
+        if since and cursors is None and timestamp_column:
+            clauses.append(f"{timestamp_column} > ?")
+            params.append(since)
+
+        for column, value in (filters or {}).items():
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+
+        # The rowid is the table's primary key, so the range scan and the
+        # ordering use it without an extra index
+        query = (
+            f"SELECT rowid AS {ROWID_COLUMN}, * FROM {table} "
+            f"WHERE {' AND '.join(clauses)} ORDER BY rowid"
+        )
+
+        db_cursor = self.conn.cursor()
+        db_cursor.execute(query, params)
+        columns = [description[0] for description in db_cursor.description][1:]
+
+        def batches() -> Iterator[List[tuple]]:
+            while True:
+                rows = db_cursor.fetchmany(self.batch_size)
+                if not rows:
+                    break
+                yield [row[1:] for row in rows]
+
+        return columns, batches()
+
+    def export(
+        self,
+        output_path: str,
+        tables: Dict[str, Optional[str]],
+        since: Optional[str] = None,
+        filters: Optional[Dict[str, Dict[str, Any]]] = None,
+        output_format: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Export tables to a file.
+
+        Args:
+            output_path: Path of the export file (".gz" enables gzip for NDJSON)
+            tables: Table name -> timestamp column compared with a timestamp `since`
+            since: Cursor returned by the previous export, or a timestamp to
+                export rows after on a first export
+            filters: Table name -> column equality filters
+            output_format: "ndjson" or "parquet" (inferred from the path if omitted)
+
+        Returns:
+            Dictionary with the output paths, row counts per table, the last
+            exported rowid per table (`cursors`) and the cursor string to pass
+            as `since` for the next incremental export
+        """
+        output_format = output_format or detect_format(output_path)
+        if output_format not in STREAMING_FORMATS:
+            raise ValueError(f"Unsupported streaming export format: {output_format}")
+
+        directory = os.path.dirname(output_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        filters = filters or {}
+        result = {
+            "format": output_format,
+            "output_paths": [],
+            "rows": {},
+            "since": since,
+            "cursors": {},
+            "export_time": datetime.now().isoformat()
+        }
+
+        if output_format == "parquet":
+            self._export_parquet(output_path, tables, since, filters, result)
+        else:
+            self._export_ndjson(output_path, tables, since, filters, result)
+        result["cursor"] = format_cursor(result["cursors"])
+
+        logger.info(f"Exported {sum(result['rows'].values())} rows to {', '.join(result['output_paths'])}")
+        return result
+
+    def _export_ndjson(self, output_path, tables, since, filters, result) -> None:
+        """Write every table to a single NDJSON stream."""
+        opener = gzip.open if output_path.endswith(".gz") else open
+
+        with opener(output_path, "wt", encoding="utf-8") as f:
+            for table, timestamp_column in tables.items():
+                columns, batches = self._iter_batches(table, timestamp_column, since, filters.get(table),
+                                                      result["cursors"])
+                count = 0
+
+                for rows in batches:
+                    for row in rows:
+                        record = dict(zip(columns, row))
+                        f.write(json.dumps({"table": table, "record": record}, default=str))
+                        f.write("\n")
+                    count += len(rows)
+
+                result["rows"][table] = count
+
+        result["output_paths"].append(output_path)
+
+    def _arrow_schema(self, table: str, columns: List[str]):
+        """Build an Arrow schema from the table's declared SQLite column types."""
+        import pyarrow as pa
+
+        declared = {
+            row[1]: (row[2] or "").upper()
+            for row in self.conn.execute(f"PRAGMA table_info({table})")
+        }
+
+        fields = []
+        for column in columns:
+            decl = declared.get(column, "")
+            if "INT" in decl or "BOOL" in decl:
+                arrow_type = pa.int64()
+            elif any(token in decl for token in ("REAL", "FLOA", "DOUB", "NUMERIC")):
+                arrow_type = pa.float64()
+            else:
+                arrow_type = pa.string()
+            fields.append(pa.field(column, arrow_type))
+
+        return pa.schema(fields)
+
+    def _export_parquet(self, output_path, tables, since, filters, result) -> None:
+        """Write each table to its own Parquet file, one row group per batch."""
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("Parquet export requires pyarrow. Install with: pip install pyarrow")
+
+        stem = output_path[:-len(".parquet")] if output_path.endswith(".parquet") else output_path
+
+        for table, timestamp_column in tables.items():
+            columns, batches = self._iter_batches(table, timestamp_column, since, filters.get(table),
+                                                  result["cursors"])
+            table_path = f"{stem}.{table}.parquet"
+            schema = self._arrow_schema(table, columns)
+            writer = None
+            count = 0
+
+            try:
+                for rows in batches:
+                    batch = pa.Table.from_pylist([dict(zip(columns, row)) for row in rows], schema=schema)
+                    if writer is None:
+                        writer = pq.ParquetWriter(table_path, schema)
+                    writer.write_table(batch)
+                    count += len(rows)
+            finally:
+                if writer is not None:
+                    writer.close()
+
+            result["rows"][table] = count
+            if writer is not None:
+                result["output_paths"].append(table_path)
@@ -0,0 +1,202 @@
+"""
+Token Counting Service
+
+This module provides token counting shared by the optimization pipeline and
+the context tooling. Encodings are selected per target model, loaded once per
+process and reused, and many strings can be counted in a single batch call.
+"""
+
+import math
+import logging
+from functools import lru_cache
+from typing import Dict, Any, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Approximate counter for models without a public tokenizer (e.g. Claude)
+APPROXIMATE_ENCODING = "approximate"
+DEFAULT_ENCODING = "cl100k_base"
+
+# Average characters per token used by the approximate counter
+APPROXIMATE_CHARS_PER_TOKEN = 3.5
+
+# Model name prefixes mapped to encodings, checked in order
+MODEL_ENCODINGS = [
+    ("gpt-4o", "o200k_base"),
+    ("o1", "o200k_base"),
+    ("o3", "o200k_base"),
+    ("gpt-4", "cl100k_base"),
+    ("gpt-3.5", "cl100k_base"),
+    ("claude", APPROXIMATE_ENCODING),
+]
+
+
+def encoding_for_model(model_name: Optional[str], config: Optional[Dict[str, Any]] = None) -> str:
+    """
+    Resolve the encoding used to count tokens for a model.
+
+    An explicit `tokenizer` on the model's entry in `models.options` takes
+    precedence over the built-in model name mapping.
+
+    Args:
+        model_name: Name of the target model
+        config: Optional DSP configuration dictionary
+
+    Returns:
+        Encoding name
+    """
+    if not model_name:
+        return DEFAULT_ENCODING
+
+    if config:
+        for model in config.get("models", {}).get("options", []) or []:
+            if model.get("name") == model_name and model.get("tokenizer"):
+                return model["tokenizer"]
+
+    for prefix, encoding in MODEL_ENCODINGS:
+        if model_name.startswith(prefix):
+            return encoding
+
+    return DEFAULT_ENCODING
+
+
+@lru_cache(maxsize=None)
+def _load_encoding(encoding_name: str):
+    """Load a tiktoken encoding once per process, or None if unavailable."""
+    try:
+        import tiktoken
+    except ImportError:
+        logger.warning("tiktoken not installed, falling back to approximate token counts")
+        return None
+
+    try:
+        return tiktoken.get_encoding(encoding_name)
+    except Exception as e:
+        # Unknown names, or BPE files that cannot be downloaded offline
+        logger.warning(f"Cannot load tiktoken encoding {encoding_name}, falling back to approximate "
+                       f"token counts: {str(e)}")
+        return None
+
+
+class TokenCounter:
+    """
+    Counts tokens with a single encoding.
+
+    Exact counts use tiktoken; the approximate encoding (and any encoding when
+    tiktoken is not installed) estimates tokens from character length.
+    """
+
+    def __init__(self, encoding_name: str = DEFAULT_ENCODING):
+        """
+        Initialize the counter.
+
+        Args:
+            encoding_name: tiktoken encoding name, or "approximate"
+        """
+        self.requested_encoding = encoding_name
+        self._encoding = None if encoding_name == APPROXIMATE_ENCODING else _load_encoding(encoding_name)
+        # Report the encoding actually used, so approximate counts are never
+        # mistaken for (or cached as) exact counts of the requested encoding
+        self.encoding_name = encoding_name if self._encoding is not None else APPROXIMATE_ENCODING
+
+    @property
+    def exact(self) -> bool:
+        """Whether counts come from a real tokenizer."""
+        return self._encoding is not None
+
+    def count(self, text: str) -> int:
+        """
+        Count the tokens in a string.
+
+        Args:
+            text: Text to count
+
+        Returns:
+            Number of tokens
+        """
+        if not text:
+            return 0
+        if self._encoding is None:
+            return math.ceil(len(text) / APPROXIMATE_CHARS_PER_TOKEN)
+        return len(self._encoding.encode(text, disallowed_special=()))
+
+    def count_many(self, texts: List[str], num_threads: int = 8) -> List[int]:
+        """
+        Count the tokens in many strings at once.
+
+        Args:
+            texts: Texts to count
+            num_threads: Threads tiktoken may use for batch encoding
+
+        Returns:
+            Token counts in the same order as the input
+        """
+        if self._encoding is None:
+            return [self.count(text) for text in texts]
+
+        encoded = self._encoding.encode_batch(
+            [text or "" for text in texts],
+            num_threads=num_threads,
+            disallowed_special=()
+        )
+        return [len(tokens) for tokens in encoded]
+
+
+@lru_cache(maxsize=None)
+def get_counter(encoding_name: str = DEFAULT_ENCODING) -> TokenCounter:
+    """
+    Get the shared counter for an encoding.
+
+    Args:
+        encoding_name: tiktoken encoding name, or "approximate"
+
+    Returns:
+        Cached TokenCounter instance
+    """
+    return TokenCounter(encoding_name)
+
+
+def counter_for_model(model_name: Optional[str], config: Optional[Dict[str, Any]] = None) -> TokenCounter:
+    """
+    Get the shared counter for a target model.
+
+    Args:
+        model_name: Name of the target model
+        config: Optional DSP configuration dictionary
+
+    Returns:
+        Cached TokenCounter instance
+    """
+    return get_counter(encoding_for_model(model_name, config))
+
+
+def count_tokens(text: str, model_name: Optional[str] = None,
+                 config: Optional[Dict[str, Any]] = None) -> int:
+    """
+    Count the tokens in a string for a target model.
+
+    Args:
+        text: Text to count
+        model_name: Name of the target model (defaults to cl100k_base)
+        config: Optional DSP configuration dictionary
+
+    Returns:
+        Number of tokens
+    """
+    return counter_for_model(model_name, config).count(text)
+
+
+def count_tokens_many(texts: List[str], model_name: Optional[str] = None,
+                      config: Optional[Dict[str, Any]] = None) -> List[int]:
+    """
+    Count the tokens in many strings for a target model.
+
+    Args:
+        texts: Texts to count
+        model_name: Name of the target model (defaults to cl100k_base)
+        config: Optional DSP configuration dictionary
+
+    Returns:
+        Token counts in the same order as the input
+    """
+    return counter_for_model(model_name, config).count_many(texts)
@@ -0,0 +1,451 @@
+"""
+Pipeline Tracing
+
+This module provides lightweight spans for timing the optimization pipeline:
+module reads, block extraction, LLM calls, diffs, writes and evaluations.
+Spans nest through a context variable, so a batch run produces one trace
+with a span per module and per stage inside it. When a trace's root span
+finishes, its spans are exported in one transaction to the `trace_spans`
+table of the feedback database, and optionally appended to an
+OpenTelemetry-compatible JSON file (one OTLP/JSON export per line, as
+written by the OpenTelemetry Collector's file exporter).
+
+Example configuration:
+
+    tracing:
+      enabled: true
+      export_to_database: true
+      otel_json_path: "logs/traces.jsonl"
+      service_name: "context-optimizer"
+"""
+
+import os
+import json
+import time
+import secrets
+import logging
+import functools
+import threading
+import contextvars
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from lib.db import get_connection_manager
+
+logger = logging.getLogger(__name__)
+
+_current_span: contextvars.ContextVar = contextvars.ContextVar("current_span", default=None)
+
+
+class Span:
+    """
+    One timed operation within a trace.
+
+    Durations come from a monotonic clock; wall-clock start and end times
+    are kept for export.
+    """
+
+    __slots__ = (
+        "name", "trace_id", "span_id", "parent_id", "attributes",
+        "start_ns", "end_ns", "duration", "status", "error", "_start",
+    )
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str] = None,
+                 attributes: Optional[Dict[str, Any]] = None):
+        """
+        Start a span.
+
+        Args:
+            name: Operation name (e.g. "llm_call")
+            trace_id: ID shared by every span in the trace
+            parent_id: ID of the enclosing span, None for a root span
+            attributes: Initial attributes
+        """
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.attributes: Dict[str, Any] = dict(attributes or {})
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.duration: Optional[float] = None
+        self.status = "ok"
+        self.error: Optional[str] = None
+        self._start = time.perf_counter()
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        """Set an attribute on the span."""
+        self.attributes[key] = value
+
+    def set_attributes(self, **attributes) -> None:
+        """Set several attributes on the span."""
+        self.attributes.update(attributes)
+
+    def add(self, key: str, amount: float = 1) -> None:
+        """Increment a numeric attribute (e.g. retries or bytes), starting from zero."""
+        self.attributes[key] = self.attributes.get(key, 0) + amount
+
+    def record_error(self, error: BaseException) -> None:
+        """Mark the span as failed."""
+        self.status = "error"
+        self.error = str(error)
+
+    def end(self) -> None:
+        """Finish the span; later calls have no effect."""
+        if self.duration is None:
+            self.duration = time.perf_counter() - self._start
+            self.end_ns = self.start_ns + int(self.duration * 1e9)
+
+    @property
+    def elapsed(self) -> float:
+        """Seconds since the span started, or its duration once finished."""
+        return self.duration if self.duration is not None else time.perf_counter() - self._start
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert the span to a dictionary."""
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_time": datetime.fromtimestamp(self.start_ns / 1e9).isoformat(),
+            "duration_ms": round(self.elapsed * 1000, 3),
+            "status": self.status,
+            "error": self.error,
+            "attributes": self.attributes,
+        }
+
+
+def current_span() -> Optional[Span]:
+    """Get the innermost active span in the calling context."""
+    return _current_span.get()
+
+
+def bind_current_span(fn: Callable) -> Callable:
+    """
+    Bind a function to the span active when it is wrapped.
+
+    Thread pools don't inherit context variables, so functions submitted to
+    an executor are wrapped first to keep their spans in the caller's trace.
+
+    Args:
+        fn: Function to run in a worker thread
+
+    Returns:
+        Wrapped function
+    """
+    parent = _current_span.get()
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        token = _current_span.set(parent)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _current_span.reset(token)
+
+    return wrapper
+
+
+def _otel_value(value: Any) -> Dict[str, Any]:
+    """Encode an attribute value as an OTLP/JSON AnyValue."""
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otel_attributes(attributes: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [{"key": key, "value": _otel_value(value)} for key, value in attributes.items() if value is not None]
+
+
+class Tracer:
+    """
+    Records spans and exports each trace once its root span finishes.
+
+    Spans are always timed, so callers can read durations even when tracing
+    is disabled; disabling only skips recording and export.
+    """
+
+    SCHEMA = [
+        """
+        CREATE TABLE IF NOT EXISTS trace_spans (
+            span_id TEXT PRIMARY KEY,
+            trace_id TEXT NOT NULL,
+            parent_id TEXT,
+            name TEXT NOT NULL,
+            start_time TEXT NOT NULL,
+            duration_ms REAL NOT NULL,
+            status TEXT NOT NULL,
+            error TEXT,
+            attributes TEXT
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_trace_spans_trace ON trace_spans(trace_id)",
+        "CREATE INDEX IF NOT EXISTS idx_trace_spans_name ON trace_spans(name, start_time)",
+    ]
+
+    def __init__(
+        self,
+        enabled: bool = True,
+        db_path: Optional[str] = None,
+        otel_json_path: Optional[str] = None,
+        service_name: str = "context-optimizer",
+        max_pending_spans: int = 100000
+    ):
+        """
+        Initialize the tracer.
+
+        Args:
+            enabled: Whether spans are recorded and exported
+            db_path: Feedback database receiving finished traces (None to skip)
+            otel_json_path: File receiving OTLP/JSON exports (None to skip)
+            service_name: `service.name` resource attribute in OTLP exports
+            max_pending_spans: Spans buffered per unfinished trace before the
+                oldest are dropped
+        """
+        self.enabled = enabled
+        self.db_path = db_path
+        self.otel_json_path = otel_json_path
+        self.service_name = service_name
+        self.max_pending_spans = max_pending_spans
+
+        self._pending: Dict[str, List[Span]] = {}
+        self._lock = threading.Lock()
+        self._schema_ready = set()
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "Tracer":
+        """
+        Create a tracer from the `tracing` section of the DSP configuration.
+
+        Args:
+            config: The full configuration dictionary
+
+        Returns:
+            Configured tracer
+        """
+        tracing_config = config.get("tracing", {}) or {}
+        db_path = None
+        if tracing_config.get("export_to_database", True):
+            db_path = tracing_config.get("database_path") or (config.get("paths", {}) or {}).get("database_path")
+
+        return cls(
+            enabled=tracing_config.get("enabled", True),
+            db_path=db_path,
+            otel_json_path=tracing_config.get("otel_json_path"),
+            service_name=tracing_config.get("service_name", "context-optimizer")
+        )
+
+    @contextmanager
+    def span(self, name: str, parent: Optional[Span] = None, **attributes) -> Iterator[Span]:
+        """
+        Time a block as a span nested in the current one.
+
+        Exceptions raised in the block mark the span as failed and propagate.
+
+        Args:
+            name: Operation name
+            parent: Explicit parent span (default: the current span)
+            **attributes: Initial span attributes
+
+        Yields:
+            The active span
+        """
+        parent = parent or _current_span.get()
+        trace_id = parent.trace_id if parent else secrets.token_hex(16)
+        span = Span(name, trace_id, parent.span_id if parent else None, attributes)
+        token = _current_span.set(span)
+
+        try:
+            yield span
+        except BaseException as e:
+            span.record_error(e)
+            raise
+        finally:
+            span.end()
+            _current_span.reset(token)
+            if self.enabled:
+                self._finish(span)
+
+    def _finish(self, span: Span) -> None:
+        """Buffer a finished span and export its trace when it is the root."""
+        with self._lock:
+            spans = self._pending.setdefault(span.trace_id, [])
+            spans.append(span)
+            if len(spans) > self.max_pending_spans:
+                del spans[0]
+            if span.parent_id is not None:
+                return
+            spans = self._pending.pop(span.trace_id)
+
+        self.export(spans)
+
+    def export(self, spans: List[Span]) -> None:
+        """
+        Export spans to the configured destinations.
+
+        Export failures are logged rather than raised, so tracing never fails
+        the operation being traced.
+
+        Args:
+            spans: Finished spans
+        """
+        if self.db_path:
+            try:
+                self.export_to_database(spans, self.db_path)
+            except Exception as e:
+                logger.warning(f"Failed to export {len(spans)} span(s) to {self.db_path}: {str(e)}")
+
+        if self.otel_json_path:
+            try:
+                self.export_otel_json(spans, self.otel_json_path)
+            except Exception as e:
+                logger.warning(f"Failed to export {len(spans)} span(s) to {self.otel_json_path}: {str(e)}")
+
+    def export_to_database(self, spans: List[Span], db_path: str) -> None:
+        """
+        Write spans to the `trace_spans` table in a single transaction.
+
+        Args:
+            spans: Finished spans
+            db_path: Path to the SQLite database
+        """
+        manager = get_connection_manager(db_path)
+        with manager.transaction() as conn:
+            if db_path not in self._schema_ready:
+                for statement in self.SCHEMA:
+                    conn.execute(statement)
+                self._schema_ready.add(db_path)
+
+            conn.executemany(
+                """
+                INSERT OR REPLACE INTO trace_spans
+                (span_id, trace_id, parent_id, name, start_time, duration_ms, status, error, attributes)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                [
+                    (s["span_id"], s["trace_id"], s["parent_id"], s["name"], s["start_time"],
+                     s["duration_ms"], s["status"], s["error"], json.dumps(s["attributes"], default=str))
+                    for s in (span.to_dict() for span in spans)
+                ]
+            )
+
+    def export_otel_json(self, spans: List[Span], path: str) -> None:
+        """
+        Append spans to a file as one OTLP/JSON `ExportTraceServiceRequest`.
+
+        Args:
+            spans: Finished spans
+            path: Output file, one export per line
+        """
+        otel_spans = []
+        for span in spans:
+            otel_span = {
+                "traceId": span.trace_id,
+                "spanId": span.span_id,
+                "name": span.name,
+                "kind": 1,
+                "startTimeUnixNano": str(span.start_ns),
+                "endTimeUnixNano": str(span.end_ns),
+                "attributes": _otel_attributes(span.attributes),
+                "status": {"code": 2, "message": span.error} if span.status == "error" else {"code": 1},
+            }
+            if span.parent_id:
+                otel_span["parentSpanId"] = span.parent_id
+            otel_spans.append(otel_span)
+
+        export = {
+            "resourceSpans": [{
+                "resource": {"attributes": _otel_attributes({"service.name": self.service_name})},
+                "scopeSpans": [{"scope": {"name": __name__}, "spans": otel_spans}],
+            }]
+        }
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._lock, open(path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(export, default=str) + "\n")
+
+
+def summarize_spans(spans: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """
+    Aggregate spans by name.
+
+    Args:
+        spans: Span dictionaries (as returned by Span.to_dict or read from
+            the `trace_spans` table with decoded attributes)
+
+    Returns:
+        Per-name count, total/average/max milliseconds, errors and totals of
+        numeric attributes
+    """
+    summary: Dict[str, Dict[str, Any]] = {}
+
+    for span in spans:
+        entry = summary.setdefault(span["name"], {
+            "count": 0, "total_ms": 0.0, "max_ms": 0.0, "errors": 0, "totals": {}
+        })
+        entry["count"] += 1
+        entry["total_ms"] += span["duration_ms"]
+        entry["max_ms"] = max(entry["max_ms"], span["duration_ms"])
+        if span["status"] == "error":
+            entry["errors"] += 1
+
+        for key, value in (span.get("attributes") or {}).items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                entry["totals"][key] = entry["totals"].get(key, 0) + value
+
+    for entry in summary.values():
+        entry["avg_ms"] = round(entry["total_ms"] / entry["count"], 3)
+        entry["total_ms"] = round(entry["total_ms"], 3)
+        entry["max_ms"] = round(entry["max_ms"], 3)
+
+    return summary
+
+
+def load_trace(db_path: str, trace_id: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Read the spans of a trace from the feedback database.
+
+    Args:
+        db_path: Path to the SQLite database
+        trace_id: Trace to read (default: the most recent trace)
+
+    Returns:
+        Span dictionaries ordered by start time
+    """
+    conn = get_connection_manager(db_path).connection()
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'trace_spans'"
+    ).fetchone()
+    if not exists:
+        return []
+
+    if trace_id is None:
+        row = conn.execute(
+            "SELECT trace_id FROM trace_spans WHERE parent_id IS NULL ORDER BY start_time DESC LIMIT 1"
+        ).fetchone()
+        if not row:
+            return []
+        trace_id = row[0]
+
+    cursor = conn.execute(
+        """
+        SELECT name, trace_id, span_id, parent_id, start_time, duration_ms, status, error, attributes
+        FROM trace_spans WHERE trace_id = ? ORDER BY start_time
+        """,
+        (trace_id,)
+    )
+    columns = [d[0] for d in cursor.description]
+    spans = []
+    for row in cursor.fetchall():
+        span = dict(zip(columns, row))
+        span["attributes"] = json.loads(span["attributes"] or "{}")
+        spans.append(span)
+    return spans
@@ -20,6 +20,8 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 # Import project modules
 from lib.dsp_client import DSPClient
+from lib.module_manifest import ModuleManifest
+from lib.module_registry import get_registry
 from dsp_implementation_plan import ContextOptimizer, ContextEvaluator
 
 def setup_logging(log_level: str = "INFO", log_file: Optional[str] = None) -> logging.Logger:
@@ -67,7 +69,10 @@ def get_modules_to_optimize(
     config: Dict[str, Any], 
     modules_dir: str,
     module_names: Optional[List[str]] = None,
-    priority_limit: Optional[int] = None
+    priority_limit: Optional[int] = None,
+    manifest: Optional[ModuleManifest] = None,
+    model_name: Optional[str] = None,
+    strategy_name: Optional[str] = None
 ) -> List[str]:
     """
     Get the list of module paths to optimize.
@@ -77,29 +82,36 @@ def get_modules_to_optimize(
         modules_dir: The directory containing context modules
         module_names: Optional list of specific module names to optimize
         priority_limit: Optional limit to the number of modules to optimize
+        manifest: Optional manifest used to skip modules that have not changed
+            since their last successful optimization
+        model_name: Model the optimization will use (compared against the manifest)
+        strategy_name: Strategy the optimization will use (compared against the manifest)
         
     Returns:
         List of module file paths to optimize
     """
     logger = logging.getLogger(__name__)
+    registry = get_registry(modules_dir, exclude_dirs=())
     
     if module_names:
         # Optimize specific modules
         modules = []
         for name in module_names:
-            module_path = os.path.join(modules_dir, f"{name}.md")
-            if os.path.exists(module_path):
-                modules.append(module_path)
+            module_path = registry.resolve(name)
+            if module_path:
+                modules.append(str(module_path))
             else:
                 logger.warning(f"Module not found: {name}")
+        if manifest:
+            modules = manifest.filter_changed(modules, model_name, strategy_name)
         return modules
     else:
         # Get all markdown files from the modules directory
-        all_modules = []
-        for root, _, files in os.walk(modules_dir):
-            for file in files:
-                if file.endswith(".md"):
-                    all_modules.append(os.path.join(root, file))
+        registry.refresh()
+        all_modules = [str(path) for path in registry.paths()]
+        
+        if manifest:
+            all_modules = manifest.filter_changed(all_modules, model_name, strategy_name)
         
         # If no priority limit, return all modules
         if not priority_limit:
@@ -123,7 +135,8 @@ def batch_optimize(
     priority_limit: Optional[int] = None,
     auto_apply: bool = False,
     evaluate: bool = False,
-    output_file: Optional[str] = None
+    output_file: Optional[str] = None,
+    changed_only: bool = False
 ) -> Dict[str, Any]:
     """
     Optimize multiple context modules in batch.
@@ -139,6 +152,8 @@ def batch_optimize(
         auto_apply: Whether to automatically apply optimizations
         evaluate: Whether to evaluate optimizations
         output_file: Path to save the optimization results
+        changed_only: Only optimize modules whose source changed since their
+            last successful optimization
         
     Returns:
         Dictionary containing optimization results
@@ -170,8 +185,16 @@ def batch_optimize(
         logger.info("Initializing context evaluator")
         context_evaluator = ContextEvaluator(config_path)
     
+    # Load the manifest of previously optimized module content
+    manifest = ModuleManifest.from_config(config) if changed_only else None
+    if manifest and not model_name:
+        model_name = config['general']['default_model']
+    
     # Get modules to optimize
-    modules = get_modules_to_optimize(config, modules_dir, module_names, priority_limit)
+    modules = get_modules_to_optimize(
+        config, modules_dir, module_names, priority_limit,
+        manifest, model_name, strategy_name
+    )
     
     if not modules:
         logger.warning("No modules found to optimize")
@@ -199,6 +222,10 @@ def batch_optimize(
         logger.info(f"Optimizing module: {module_name}")
         
         try:
+            # Hash the content being optimized, so an edit made while the
+            # model runs still marks the module as changed
+            content_hash = ModuleManifest.hash_file(module_path) if manifest else None
+            
             # Optimize the module
             optimization_result = context_optimizer.optimize_module(
                 module_path,
@@ -208,6 +235,9 @@ def batch_optimize(
             
             if optimization_result["success"]:
                 results["optimized_count"] += 1
+                if manifest:
+                    manifest.record_optimization(module_path, model_name, strategy_name,
+                                                 content_hash=content_hash)
                 
                 # Evaluate if requested
                 evaluation_result = None
@@ -257,6 +287,9 @@ def batch_optimize(
                 "error": str(e)
             })
     
+    if manifest and results["optimized_count"] > 0:
+        manifest.save()
+    
     # Save results to file if requested
     if output_file:
         os.makedirs(os.path.dirname(output_file), exist_ok=True)
@@ -293,6 +326,8 @@ def parse_arguments():
                         help="Automatically apply optimizations")
     parser.add_argument("--evaluate", action="store_true",
                         help="Evaluate optimizations")
+    parser.add_argument("--changed-only", action="store_true",
+                        help="Only optimize modules changed since their last successful optimization")
     parser.add_argument("--log-level", type=str, default="INFO",
                         choices=["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"],
                         help="Logging level")
@@ -318,7 +353,8 @@ if __name__ == "__main__":
         priority_limit=args.limit,
         auto_apply=args.auto_apply,
         evaluate=args.evaluate,
-        output_file=args.output
+        output_file=args.output,
+        changed_only=args.changed_only
     )
     
     # Output summary
@@ -19,6 +19,8 @@ from typing import List, Dict, Any, Optional, Tuple
 # Add the project root to the path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from lib.stream_export import StreamingExporter, detect_format
+
 def setup_logging(log_level: str = "INFO", log_file: Optional[str] = None) -> logging.Logger:
     """
     Set up logging for the feedback collection process.
@@ -502,20 +504,45 @@ def calculate_optimization_success_rate(
 def export_data(
     db_conn: sqlite3.Connection,
     output_file: str,
-    target_model: Optional[str] = None
+    target_model: Optional[str] = None,
+    since: Optional[str] = None,
+    output_format: Optional[str] = None
 ) -> bool:
     """
-    Export feedback and optimization data to a JSON file.
+    Export feedback and optimization data to a file.
+    
+    NDJSON (optionally gzipped) and Parquet exports are streamed from the
+    database in batches; the JSON format writes a single document with a summary.
     
     Args:
         db_conn: Database connection
-        output_file: Path to the output JSON file
+        output_file: Path to the output file
         target_model: Optional target model to filter by
+        since: Cursor printed by the previous export, or a timestamp (streaming formats)
+        output_format: json, ndjson or parquet (inferred from the file extension if omitted)
         
     Returns:
         True if successful, False otherwise
     """
+    logger = logging.getLogger(__name__)
+    output_format = output_format or detect_format(output_file)
+    
     try:
+        if output_format != "json":
+            model_filter = {"target_model": target_model}
+            result = StreamingExporter(db_conn).export(
+                output_file,
+                {"module_feedback": "timestamp", "optimization_results": "timestamp"},
+                since=since,
+                filters={"module_feedback": model_filter, "optimization_results": model_filter},
+                output_format=output_format
+            )
+            logger.info(f"Next incremental export cursor (--since): {result['cursor']}")
+            return True
+        
+        if since:
+            logger.warning("--since is only supported for ndjson and parquet exports; exporting all records")
+        
         # Get feedback and optimization data
         feedback_records = get_module_feedback(db_conn, target_model=target_model, limit=10000)
         optimization_results = get_optimization_results(db_conn, target_model=target_model, limit=10000)
@@ -544,7 +571,7 @@ def export_data(
         
         return True
     except Exception as e:
-        logging.getLogger(__name__).error(f"Error exporting data: {str(e)}")
+        logger.error(f"Error exporting data: {str(e)}")
         return False
 
 def parse_arguments():
@@ -611,6 +638,11 @@ def parse_arguments():
                              help="Path to save export file")
     export_parser.add_argument("--model", type=str,
                              help="Filter by target model")
+    export_parser.add_argument("--format", type=str, choices=["json", "ndjson", "parquet"],
+                             help="Export format (inferred from the output extension by default; "
+                                  "use .ndjson.gz for compressed NDJSON)")
+    export_parser.add_argument("--since", type=str,
+                             help="Cursor printed by the previous export, or a timestamp (ndjson/parquet)")
     
     # Common arguments
     parser.add_argument("--db", type=str,
@@ -726,7 +758,9 @@ if __name__ == "__main__":
         success = export_data(
             db_conn=db_conn,
             output_file=args.output,
-            target_model=args.model
+            target_model=args.model,
+            since=args.since,
+            output_format=args.format
         )
         
         if success:
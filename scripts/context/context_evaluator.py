@@ -21,19 +21,25 @@ logger = logging.getLogger('context_evaluator')
 class ContextEvaluator:
     """Evaluates performance of original vs optimized context modules"""
     
-    def __init__(self, context_dir, config_path=None):
+    def __init__(self, context_dir, config_path=None, backend=None, model_client=None):
         """
         Initialize with path to context modules directory
         
         Args:
             context_dir: Path to context modules directory
             config_path: Optional path to configuration file
+            backend: "promptfoo" (subprocess) or "native" (in-process); defaults
+                to the `evaluation_backend` config setting
+            model_client: Optional model client for the native backend
         """
         from dspy_bridge import ContextOptimizer
         
         self.context_dir = Path(context_dir)
         self.optimizer = ContextOptimizer(context_dir, config_path)
         self.config = self.optimizer.config
+        self.backend = backend or self.config.get("evaluation_backend", "promptfoo")
+        self.model_client = model_client
+        self._native_evaluator = None
         self.eval_temp_dir = Path(tempfile.mkdtemp())
         logger.info(f"Created temporary evaluation directory: {self.eval_temp_dir}")
         
@@ -262,7 +268,23 @@ class ContextEvaluator:
             with open(result_path, 'r') as f:
                 results = json.load(f)
                 
-            # Calculate scores
+            return self._score_results(results)
+            
+        except Exception as e:
+            logger.error(f"Error running evaluation: {e}")
+            return {"success": False, "error": str(e)}
+    
+    def _score_results(self, results):
+        """
+        Calculate original and optimized scores from evaluation results
+        
+        Args:
+            results: Results in PromptFoo's output format
+            
+        Returns:
+            Dictionary with evaluation results and scores
+        """
+        try:
             total_tests = len(results.get("results", []))
             if total_tests == 0:
                 return {"success": False, "error": "No test results found"}
@@ -300,7 +322,57 @@ class ContextEvaluator:
             }
             
         except Exception as e:
-            logger.error(f"Error running evaluation: {e}")
+            logger.error(f"Error scoring evaluation results: {e}")
+            return {"success": False, "error": str(e)}
+    
+    def _get_native_evaluator(self):
+        """
+        Get the in-process evaluator, creating its model client on first use
+        
+        Returns:
+            NativeEvaluator for the configured default model
+        """
+        from native_evaluator import NativeEvaluator, create_model_client
+        
+        if self._native_evaluator is None:
+            client = self.model_client
+            if client is None:
+                model_config = self.config.get("models", {}).get(self.config.get("default_model", "claude"), {})
+                client = create_model_client(
+                    model_config.get("provider", "anthropic"),
+                    model_config.get("name", "claude-3-opus-20240229"),
+                    model_config=model_config
+                )
+            self._native_evaluator = NativeEvaluator(client)
+            
+        return self._native_evaluator
+    
+    def run_native_evaluation(self, original_path, optimized_path, test_cases):
+        """
+        Run the evaluation in-process, without PromptFoo or a YAML config
+        
+        Args:
+            original_path: Path to original module
+            optimized_path: Path to optimized module
+            test_cases: List of test cases for evaluation
+            
+        Returns:
+            Dictionary with evaluation results and scores
+        """
+        try:
+            logger.info(f"Running native evaluation for {original_path}")
+            results = self._get_native_evaluator().evaluate(
+                {
+                    "Original": self.optimizer.load_context_module(original_path),
+                    "Optimized": self.optimizer.load_context_module(optimized_path)
+                },
+                test_cases,
+                system="You are a helpful AI assistant."
+            )
+            return self._score_results(results)
+            
+        except Exception as e:
+            logger.error(f"Error running native evaluation: {e}")
             return {"success": False, "error": str(e)}
             
     def evaluate_module(self, module_name, target_model="claude"):
@@ -316,12 +388,7 @@ class ContextEvaluator:
         """
         try:
             # Find module paths
-            original_path = None
-            for path in self.context_dir.glob(f"**/{module_name}.md"):
-                if "_optimized" not in str(path) and "_backups" not in str(path):
-                    original_path = path
-                    break
-                    
+            original_path = self.optimizer.modules.resolve(module_name)
             if not original_path:
                 logger.error(f"Original module not found: {module_name}")
                 return {"success": False, "error": f"Original module not found: {module_name}"}
@@ -337,11 +404,12 @@ class ContextEvaluator:
             # Generate test cases
             test_cases = self.generate_test_cases(original_content)
             
-            # Create evaluation config
-            config_path = self.create_evaluation_config(original_path, optimized_path, test_cases)
-            
             # Run evaluation
-            evaluation = self.run_evaluation(config_path)
+            if self.backend == "native":
+                evaluation = self.run_native_evaluation(original_path, optimized_path, test_cases)
+            else:
+                config_path = self.create_evaluation_config(original_path, optimized_path, test_cases)
+                evaluation = self.run_evaluation(config_path)
             
             # Add module info to results
             evaluation["module_name"] = module_name
@@ -378,14 +446,13 @@ class ContextEvaluator:
             Dictionary with batch evaluation results
         """
         if module_names is None or module_names == ["all"]:
-            # Get all modules that have optimized versions
-            optimized_modules = []
-            for path in self.context_dir.glob("_optimized/**/*.md"):
-                rel_path = path.relative_to(self.context_dir / "_optimized")
-                module_name = str(rel_path.with_suffix(''))
-                optimized_modules.append(module_name)
-                
-            module_names = optimized_modules
+            from lib.module_registry import get_registry
+            
+            # Get all modules that have optimized versions, including ones
+            # written since the shared registry last scanned the directory
+            registry = get_registry(self.context_dir / "_optimized", exclude_dirs=())
+            registry.refresh()
+            module_names = registry.names()
             
         logger.info(f"Starting batch evaluation of {len(module_names)} modules")
         
@@ -459,6 +526,8 @@ if __name__ == "__main__":
     parser.add_argument("module", help="Module name to evaluate or 'all' for batch mode")
     parser.add_argument("--target", "-t", default="claude", help="Target model (claude, gpt)")
     parser.add_argument("--config", "-c", help="Path to configuration file")
+    parser.add_argument("--backend", "-b", choices=["promptfoo", "native"],
+                        help="Evaluation backend (default: evaluation_backend from config, else promptfoo)")
     parser.add_argument("--output", "-o", help="Path to save evaluation results")
     parser.add_argument("--verbose", "-v", action="store_true", help="Verbose output")
     
@@ -468,7 +537,7 @@ if __name__ == "__main__":
     if args.verbose:
         logger.setLevel(logging.DEBUG)
     
-    evaluator = ContextEvaluator(args.context_dir, args.config)
+    evaluator = ContextEvaluator(args.context_dir, args.config, backend=args.backend)
     
     if args.module.lower() == "all":
         # Batch mode
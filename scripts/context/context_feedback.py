@@ -1,12 +1,19 @@
 import os
+import sys
 import json
 import sqlite3
 import logging
 from pathlib import Path
-from datetime import datetime
+from datetime import datetime, timedelta
 import pandas as pd
 import uuid
 
+# Add the project root to the path
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+
+from lib.db import get_connection_manager, ensure_rollup_table
+from lib.stream_export import StreamingExporter, detect_format
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -31,6 +38,8 @@ class ContextFeedback:
             db_path = script_dir / "context_optimization.db"
             
         self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = get_connection_manager(str(self.db_path))
         self._init_database()
         logger.info(f"Initialized context feedback system with database at {self.db_path}")
         
@@ -41,7 +50,7 @@ class ContextFeedback:
             self.db_path.parent.mkdir(parents=True, exist_ok=True)
             
             # Connect to database and create tables if they don't exist
-            conn = sqlite3.connect(self.db_path)
+            conn = self._db.connection()
             cursor = conn.cursor()
             
             # Create feedback table
@@ -73,8 +82,31 @@ class ContextFeedback:
             )
             ''')
             
+            # Covering indexes for per-module aggregation and latest-optimization lookups
+            cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_feedback_module_model_score
+            ON feedback (module_name, target_model, score)
+            ''')
+            cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_optimization_results_module_model_timestamp
+            ON optimization_results (module_name, target_model, timestamp, improvement)
+            ''')
+            
+            # Per-module, per-model score totals maintained by triggers
+            # (scores of 7+ count as positive, 4 or below as negative)
+            ensure_rollup_table(
+                conn, "feedback_rollup", "feedback",
+                key_columns={"module_name": "{row}.module_name", "target_model": "{row}.target_model"},
+                sum_columns={
+                    "feedback_count": "1",
+                    "score_sum": "{row}.score",
+                    "positive_count": "CASE WHEN {row}.score >= 7 THEN 1 ELSE 0 END",
+                    "negative_count": "CASE WHEN {row}.score <= 4 THEN 1 ELSE 0 END"
+                },
+                max_columns={"last_feedback_at": "{row}.timestamp"}
+            )
+            
             conn.commit()
-            conn.close()
             
         except Exception as e:
             logger.error(f"Error initializing database: {e}")
@@ -103,7 +135,7 @@ class ContextFeedback:
                 return {"success": False, "error": "Score must be an integer between 1 and 10"}
                 
             # Connect to database
-            conn = sqlite3.connect(self.db_path)
+            conn = self._db.connection()
             cursor = conn.cursor()
             
             # Generate UUID for feedback
@@ -121,7 +153,6 @@ class ContextFeedback:
             )
             
             conn.commit()
-            conn.close()
             
             logger.info(f"Added feedback for module {module_name}: score {score}")
             
@@ -162,7 +193,7 @@ class ContextFeedback:
                 return {"success": False, "error": "Evaluation result must be a dictionary"}
                 
             # Connect to database
-            conn = sqlite3.connect(self.db_path)
+            conn = self._db.connection()
             cursor = conn.cursor()
             
             # Generate UUID for result
@@ -195,7 +226,6 @@ class ContextFeedback:
             )
             
             conn.commit()
-            conn.close()
             
             logger.info(f"Added optimization result for module {module_name}: improvement {improvement}, applied: {applied}")
             
@@ -231,7 +261,7 @@ class ContextFeedback:
         """
         try:
             # Connect to database
-            conn = sqlite3.connect(self.db_path)
+            conn = self._db.connection()
             cursor = conn.cursor()
             
             # Build query
@@ -268,7 +298,6 @@ class ContextFeedback:
                 result = dict(zip(column_names, row))
                 results.append(result)
                 
-            conn.close()
             
             return {"success": True, "feedback": results}
             
@@ -290,7 +319,7 @@ class ContextFeedback:
         """
         try:
             # Connect to database
-            conn = sqlite3.connect(self.db_path)
+            conn = self._db.connection()
             cursor = conn.cursor()
             
             # Build query
@@ -327,7 +356,6 @@ class ContextFeedback:
                 result = dict(zip(column_names, row))
                 results.append(result)
                 
-            conn.close()
             
             return {"success": True, "results": results}
             
@@ -348,20 +376,19 @@ class ContextFeedback:
         """
         try:
             # Connect to database
-            conn = sqlite3.connect(self.db_path)
+            conn = self._db.connection()
             
-            # Query to get feedback
-            query = "SELECT * FROM feedback WHERE module_name = ?"
+            # Read feedback totals from the rollup
+            query = "SELECT SUM(feedback_count), SUM(score_sum) FROM feedback_rollup WHERE module_name = ?"
             params = [module_name]
             
             if target_model:
                 query += " AND target_model = ?"
                 params.append(target_model)
                 
-            # Load into dataframe
-            df = pd.read_sql_query(query, conn, params=params)
+            feedback_count, score_sum = conn.execute(query, params).fetchone()
             
-            if df.empty:
+            if not feedback_count:
                 return {
                     "success": True,
                     "module_name": module_name,
@@ -373,8 +400,8 @@ class ContextFeedback:
                 }
             
             # Calculate metrics
-            feedback_count = len(df)
-            avg_score = df['score'].mean()
+            feedback_count = int(feedback_count)
+            avg_score = score_sum / feedback_count
             
             # Effectiveness is normalized to 0-100%
             effectiveness = (avg_score - 1) / 9 * 100
@@ -414,7 +441,6 @@ class ContextFeedback:
                     feedback_count >= 3
                 )
             
-            conn.close()
             
             return {
                 "success": True,
@@ -445,88 +471,64 @@ class ContextFeedback:
         """
         try:
             # Connect to database
-            conn = sqlite3.connect(self.db_path)
+            conn = self._db.connection()
+            cursor = conn.cursor()
             
-            # First, get all modules with enough feedback
-            query = """
-            SELECT module_name, COUNT(*) as feedback_count, AVG(score) as avg_score
-            FROM feedback
+            # Modules are due for optimization if they were never optimized or
+            # their latest optimization is more than 30 days old
+            cutoff = (datetime.now() - timedelta(days=31)).isoformat()
+            model_filter = " AND target_model = ?" if target_model else ""
+            
+            # Aggregate scores and join each candidate's latest optimization
+            # (an index seek per candidate) in a single query
+            query = f"""
+            WITH candidates AS (
+                SELECT module_name,
+                       SUM(feedback_count) AS feedback_count,
+                       SUM(score_sum) * 1.0 / SUM(feedback_count) AS avg_score,
+                       (SUM(score_sum) * 1.0 / SUM(feedback_count) - 1) / 9.0 * 100 AS effectiveness
+                FROM feedback_rollup
+                WHERE 1 = 1{model_filter}
+                GROUP BY module_name
+                HAVING SUM(feedback_count) >= ?
+                   AND (SUM(score_sum) * 1.0 / SUM(feedback_count) - 1) / 9.0 * 100 <= ?
+            )
+            SELECT c.module_name, c.feedback_count, c.avg_score, c.effectiveness,
+                   o.timestamp AS last_optimization, o.improvement AS last_improvement
+            FROM candidates c
+            LEFT JOIN optimization_results o ON o.rowid = (
+                SELECT rowid
+                FROM optimization_results
+                WHERE module_name = c.module_name{model_filter}
+                ORDER BY timestamp DESC
+                LIMIT 1
+            )
+            WHERE o.timestamp IS NULL OR o.timestamp <= ?
+            ORDER BY c.effectiveness ASC
             """
             
             params = []
             if target_model:
-                query += " WHERE target_model = ?"
                 params.append(target_model)
-                
-            query += " GROUP BY module_name HAVING COUNT(*) >= ?"
-            params.append(min_feedback)
-            
-            # Load into dataframe
-            df = pd.read_sql_query(query, conn, params=params)
-            
-            if df.empty:
-                return {
-                    "success": True,
-                    "modules_to_improve": [],
-                    "target_model": target_model
-                }
-            
-            # Calculate effectiveness for each module
-            df['effectiveness'] = (df['avg_score'] - 1) / 9 * 100
+            params.extend([min_feedback, max_effectiveness])
+            if target_model:
+                params.append(target_model)
+            params.append(cutoff)
             
-            # Filter by effectiveness threshold
-            low_effectiveness = df[df['effectiveness'] <= max_effectiveness]
+            cursor.execute(query, params)
             
-            # Get list of modules that haven't been optimized recently
             modules_to_improve = []
-            
-            for _, row in low_effectiveness.iterrows():
-                module_name = row['module_name']
-                
-                # Check if module was optimized recently
-                query = """
-                SELECT *
-                FROM optimization_results
-                WHERE module_name = ?
-                """
-                
-                opt_params = [module_name]
-                if target_model:
-                    query += " AND target_model = ?"
-                    opt_params.append(target_model)
-                    
-                query += " ORDER BY timestamp DESC LIMIT 1"
-                
-                opt_df = pd.read_sql_query(query, conn, params=opt_params)
-                
-                if opt_df.empty:
-                    # No previous optimization, add to list
-                    modules_to_improve.append({
-                        "module_name": module_name,
-                        "feedback_count": int(row['feedback_count']),
-                        "avg_score": round(float(row['avg_score']), 2),
-                        "effectiveness": round(float(row['effectiveness']), 2),
-                        "last_optimization": None
-                    })
-                else:
-                    # Check if last optimization was more than 30 days ago
-                    last_opt = opt_df.iloc[0]
-                    last_timestamp = datetime.fromisoformat(last_opt['timestamp'])
-                    
-                    if (datetime.now() - last_timestamp).days > 30:
-                        modules_to_improve.append({
-                            "module_name": module_name,
-                            "feedback_count": int(row['feedback_count']),
-                            "avg_score": round(float(row['avg_score']), 2),
-                            "effectiveness": round(float(row['effectiveness']), 2),
-                            "last_optimization": last_timestamp.isoformat(),
-                            "last_improvement": float(last_opt['improvement']) if last_opt['improvement'] else None
-                        })
-            
-            conn.close()
-            
-            # Sort by effectiveness (ascending)
-            modules_to_improve.sort(key=lambda x: x["effectiveness"])
+            for module_name, feedback_count, avg_score, effectiveness, last_optimization, last_improvement in cursor:
+                module = {
+                    "module_name": module_name,
+                    "feedback_count": int(feedback_count),
+                    "avg_score": round(float(avg_score), 2),
+                    "effectiveness": round(float(effectiveness), 2),
+                    "last_optimization": last_optimization
+                }
+                if last_optimization is not None:
+                    module["last_improvement"] = float(last_improvement) if last_improvement else None
+                modules_to_improve.append(module)
             
             return {
                 "success": True,
@@ -551,7 +553,7 @@ class ContextFeedback:
         """
         try:
             # Connect to database
-            conn = sqlite3.connect(self.db_path)
+            conn = self._db.connection()
             
             # Build query for successful optimizations
             query = """
@@ -582,7 +584,6 @@ class ContextFeedback:
             success_rate = (successful / total * 100) if total > 0 else 0
             improvement_rate = (improved / successful * 100) if successful > 0 else 0
             
-            conn.close()
             
             return {
                 "success": True,
@@ -599,12 +600,17 @@ class ContextFeedback:
             logger.error(f"Error calculating optimization success rate: {e}")
             return {"success": False, "error": str(e)}
             
-    def export_data(self, output_path=None):
+    def export_data(self, output_path=None, since=None, output_format=None):
         """
-        Export feedback and optimization data to JSON file
+        Export feedback and optimization data to a file
+        
+        NDJSON (optionally gzipped) and Parquet exports are streamed in batches
+        with constant memory; JSON exports write a single document with a summary.
         
         Args:
             output_path: Optional path for output file
+            since: Cursor printed by the previous export, or a timestamp (streaming formats)
+            output_format: json, ndjson or parquet (inferred from the extension if omitted)
             
         Returns:
             Dictionary with export details
@@ -616,9 +622,28 @@ class ContextFeedback:
                 output_path = f"context_data_export_{timestamp}.json"
                 
             output_path = Path(output_path)
+            output_format = output_format or detect_format(str(output_path))
             
             # Connect to database
-            conn = sqlite3.connect(self.db_path)
+            conn = self._db.connection()
+            
+            if output_format != "json":
+                result = StreamingExporter(conn).export(
+                    str(output_path),
+                    {"feedback": "timestamp", "optimization_results": "timestamp"},
+                    since=since,
+                    output_format=output_format
+                )
+                logger.info(f"Exported data to {', '.join(result['output_paths'])}")
+                
+                return {
+                    "success": True,
+                    "output_path": str(output_path),
+                    "output_paths": result["output_paths"],
+                    "total_feedback": result["rows"]["feedback"],
+                    "total_optimizations": result["rows"]["optimization_results"],
+                    "cursor": result["cursor"]
+                }
             
             # Get all feedback
             feedback_df = pd.read_sql_query("SELECT * FROM feedback ORDER BY timestamp DESC", conn)
@@ -649,7 +674,6 @@ class ContextFeedback:
             with open(output_path, 'w') as f:
                 json.dump(export_data, f, indent=2)
                 
-            conn.close()
             
             logger.info(f"Exported data to {output_path}")
             
@@ -693,7 +717,8 @@ if __name__ == "__main__":
     
     # Export command
     export_parser = subparsers.add_parser("export", help="Export feedback data")
-    export_parser.add_argument("--output", "-o", help="Output file path")
+    export_parser.add_argument("--output", "-o", help="Output file path (.json, .ndjson[.gz] or .parquet)")
+    export_parser.add_argument("--since", help="Cursor printed by the previous export, or a timestamp (ndjson/parquet)")
     
     # Stats command
     stats_parser = subparsers.add_parser("stats", help="Show optimization statistics")
@@ -766,11 +791,13 @@ if __name__ == "__main__":
             
     elif args.command == "export":
         # Export data
-        result = feedback_system.export_data(args.output)
+        result = feedback_system.export_data(args.output, args.since)
         
         if result["success"]:
             print(f"Exported {result['total_feedback']} feedback items and {result['total_optimizations']} optimization results")
             print(f"Output saved to: {result['output_path']}")
+            if result.get("cursor"):
+                print(f"Next incremental export: --since {result['cursor']}")
         else:
             print(f"Error: {result['error']}")
             
@@ -9,6 +9,12 @@ from pathlib import Path
 from datetime import datetime
 import logging
 
+# Add the project root to the path for the shared lib package
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+
+from lib.fake_provider import FakeLM
+from lib.module_registry import get_registry
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -25,6 +31,7 @@ class ContextOptimizer:
         self.context_dir = Path(context_dir)
         self.optimized_dir = self.context_dir / "_optimized"
         self._ensure_dirs_exist()
+        self.modules = get_registry(self.context_dir)
         self.config = self._load_config(config_path)
         
         # Configure DSPy with model from config
@@ -37,6 +44,8 @@ class ContextOptimizer:
             dspy.settings.configure(lm=dspy.OpenAI(model=model_config["name"], temperature=0.2))
         elif model_config["provider"] == "anthropic":
             dspy.settings.configure(lm=dspy.Anthropic(model=model_config["name"], temperature=0.2))
+        elif model_config["provider"] == "fake":
+            dspy.settings.configure(lm=FakeLM.from_config(model_config))
         else:
             logger.warning(f"Unknown provider: {model_config['provider']}, defaulting to OpenAI")
             dspy.settings.configure(lm=dspy.OpenAI(model="gpt-4", temperature=0.2))
@@ -83,14 +92,9 @@ class ContextOptimizer:
 
     def list_available_modules(self):
         """List all available context modules"""
-        modules = []
-        for path in Path(self.context_dir).glob("**/*.md"):
-            if "_optimized" in str(path):
-                continue
-            rel_path = path.relative_to(self.context_dir)
-            module_name = str(rel_path.with_suffix(''))
-            modules.append(module_name)
-        return modules
+        # The registry is shared, so pick up modules added since it last scanned
+        self.modules.refresh()
+        return self.modules.names()
 
     def load_context_module(self, module_path):
         """Load a context module file"""
@@ -169,16 +173,8 @@ class ContextOptimizer:
             if "/" in module_name or "\\" in module_name:
                 module_path = self.context_dir / f"{module_name}.md"
             else:
-                # Search for the module in any subdirectory
-                found = False
-                for path in self.context_dir.glob(f"**/{module_name}.md"):
-                    if "_optimized" not in str(path) and "_backups" not in str(path):
-                        module_path = path
-                        found = True
-                        break
-                
-                if not found:
-                    module_path = self.context_dir / f"{module_name}.md"
+                # Look the module up in any subdirectory
+                module_path = self.modules.resolve(module_name) or self.context_dir / f"{module_name}.md"
             
             if not module_path.exists():
                 logger.error(f"Module not found: {module_path}")
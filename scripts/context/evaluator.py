@@ -2,12 +2,14 @@ import os
 import json
 import yaml
 import shutil
+import signal
+import asyncio
 import logging
 import tempfile
 import subprocess
 import re
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple, Union, Any
+from typing import AsyncIterator, Callable, Dict, List, Optional, Tuple, Union, Any
 
 from .utils import (
     setup_logger, 
@@ -17,19 +19,30 @@ from .utils import (
     write_json,
     read_json
 )
+from .native_evaluator import NativeEvaluator, ModelClient, create_model_client, DEFAULT_WORD_OVERLAP_THRESHOLD
 
 class ContextEvaluator:
     """
     A class to evaluate the effectiveness of AI context modules.
     Uses PromptFoo for evaluation.
+    
+    Batch evaluations run several PromptFoo processes concurrently on an
+    asyncio scheduler, capped by `evaluation.promptfoo.max_concurrent`.
+    Setting `evaluation.backend` to "native" runs the same test cases
+    in-process instead, without spawning PromptFoo.
     """
     
-    def __init__(self, config_path: str):
+    DEFAULT_TIMEOUT = 60
+    DEFAULT_MAX_CONCURRENT = 4
+    
+    def __init__(self, config_path: str, model_client: Optional[ModelClient] = None):
         """
         Initialize the ContextEvaluator.
         
         Args:
             config_path: Path to the configuration file
+            model_client: Optional model client for the native backend
+                (default: built from `evaluation.native` or `dspy.model`)
         """
         self.logger = setup_logger('context_evaluator')
         
@@ -41,6 +54,20 @@ class ContextEvaluator:
         from .optimizer import ContextOptimizer
         self.optimizer = ContextOptimizer(config_path)
         
+        # The optimizer puts the project root on the path for the shared lib package
+        from lib.tracing import Tracer
+        self.tracer = Tracer.from_config(self.optimizer.config)
+        
+        evaluation_config = self.optimizer.config.get('evaluation', {}) or {}
+        promptfoo_config = evaluation_config.get('promptfoo', {}) or {}
+        self.timeout = promptfoo_config.get('timeout', self.DEFAULT_TIMEOUT)
+        self.max_concurrent = promptfoo_config.get('max_concurrent', self.DEFAULT_MAX_CONCURRENT)
+        
+        self.backend = evaluation_config.get('backend', 'promptfoo')
+        self.native_config = evaluation_config.get('native', {}) or {}
+        self._model_client = model_client
+        self._native_evaluator = None
+        
         self.logger.info("ContextEvaluator initialized")
         
     def __del__(self):
@@ -68,13 +95,16 @@ class ContextEvaluator:
             original_path: Path to the original module
             optimized_path: Path to the optimized module
             test_cases: List of test case dictionaries
-            output_path: Path to save the output (default: a temporary file)
+            output_path: Path to save the output (default: a unique temporary file,
+                so concurrent evaluations never share a config)
             
         Returns:
             str: Path to the created configuration file
         """
         if not output_path:
-            output_path = os.path.join(self.temp_dir, "eval_config.yaml")
+            prefix = f"eval_config_{extract_module_name(original_path)}_"
+            fd, output_path = tempfile.mkstemp(prefix=prefix, suffix=".yaml", dir=self.temp_dir)
+            os.close(fd)
         
         # Basic PromptFoo configuration
         config = {
@@ -298,6 +328,98 @@ class ContextEvaluator:
             self.logger.error(f"Error extracting key terms: {str(e)}")
             return []
     
+    def _evaluation_command(self, config_path: str) -> List[str]:
+        """
+        Build the PromptFoo command for an evaluation configuration.
+        
+        Args:
+            config_path: Path to the evaluation configuration file
+            
+        Returns:
+            list: Command arguments
+        """
+        return [
+            "npx", "promptfoo", "eval",
+            "--config", config_path,
+            "--output", "json",
+            "--no-table"
+        ]
+    
+    def _parse_evaluation_output(self, stdout: str) -> Dict:
+        """
+        Score the JSON output of a PromptFoo run.
+        
+        Args:
+            stdout: Standard output of the PromptFoo process
+            
+        Returns:
+            dict: Evaluation results with scores
+        """
+        try:
+            output = json.loads(stdout)
+        except json.JSONDecodeError as e:
+            error_msg = f"Error parsing evaluation output: {str(e)}"
+            self.logger.error(error_msg)
+            self.logger.debug(f"Evaluation stdout: {stdout}")
+            return {"success": False, "error": error_msg}
+        
+        return self._score_results(output)
+    
+    def _score_results(self, output: Dict) -> Dict:
+        """
+        Score evaluation results in PromptFoo's output format.
+        
+        Args:
+            output: Parsed PromptFoo output (or native evaluator output)
+            
+        Returns:
+            dict: Evaluation results with scores
+        """
+        # Calculate scores for original and optimized versions
+        scores = {
+            "original": {
+                "total": 0,
+                "passed": 0,
+                "score": 0.0
+            },
+            "optimized": {
+                "total": 0,
+                "passed": 0,
+                "score": 0.0
+            }
+        }
+        
+        # Process evaluation results
+        if "results" in output:
+            for test_result in output["results"]:
+                for prompt_result in test_result.get("promptResults", []):
+                    prompt_name = prompt_result.get("prompt", {}).get("name", "")
+                    
+                    if prompt_name in ["original", "optimized"]:
+                        scores[prompt_name]["total"] += 1
+                        
+                        # Check if assertion passed
+                        if prompt_result.get("success", False):
+                            scores[prompt_name]["passed"] += 1
+        
+        # Calculate percentage scores
+        for version in ["original", "optimized"]:
+            if scores[version]["total"] > 0:
+                scores[version]["score"] = (scores[version]["passed"] / scores[version]["total"]) * 100
+        
+        # Calculate improvement
+        improvement = 0
+        if scores["original"]["score"] > 0:
+            improvement = ((scores["optimized"]["score"] - scores["original"]["score"]) 
+                          / scores["original"]["score"]) * 100
+        
+        return {
+            "success": True,
+            "scores": scores,
+            "improvement": improvement,
+            "raw_results": output
+        }
+    
     def run_evaluation(self, config_path: str) -> Dict:
         """
         Run the evaluation using PromptFoo.
@@ -310,12 +432,7 @@ class ContextEvaluator:
         """
         try:
             # Command to run PromptFoo evaluation
-            cmd = [
-                "npx", "promptfoo", "eval",
-                "--config", config_path,
-                "--output", "json",
-                "--no-table"
-            ]
+            cmd = self._evaluation_command(config_path)
             
             self.logger.info(f"Running evaluation command: {' '.join(cmd)}")
             
@@ -324,64 +441,17 @@ class ContextEvaluator:
                 cmd,
                 capture_output=True,
                 text=True,
-                check=True
+                check=True,
+                timeout=self.timeout
             )
             
-            # Parse the output
-            try:
-                output = json.loads(result.stdout)
-                
-                # Calculate scores for original and optimized versions
-                scores = {
-                    "original": {
-                        "total": 0,
-                        "passed": 0,
-                        "score": 0.0
-                    },
-                    "optimized": {
-                        "total": 0,
-                        "passed": 0,
-                        "score": 0.0
-                    }
-                }
-                
-                # Process evaluation results
-                if "results" in output:
-                    for test_result in output["results"]:
-                        for prompt_result in test_result.get("promptResults", []):
-                            prompt_name = prompt_result.get("prompt", {}).get("name", "")
-                            
-                            if prompt_name in ["original", "optimized"]:
-                                scores[prompt_name]["total"] += 1
-                                
-                                # Check if assertion passed
-                                if prompt_result.get("success", False):
-                                    scores[prompt_name]["passed"] += 1
-                
-                # Calculate percentage scores
-                for version in ["original", "optimized"]:
-                    if scores[version]["total"] > 0:
-                        scores[version]["score"] = (scores[version]["passed"] / scores[version]["total"]) * 100
-                
-                # Calculate improvement
-                improvement = 0
-                if scores["original"]["score"] > 0:
-                    improvement = ((scores["optimized"]["score"] - scores["original"]["score"]) 
-                                  / scores["original"]["score"]) * 100
-                
-                return {
-                    "success": True,
-                    "scores": scores,
-                    "improvement": improvement,
-                    "raw_results": output
-                }
-                
-            except json.JSONDecodeError as e:
-                error_msg = f"Error parsing evaluation output: {str(e)}"
-                self.logger.error(error_msg)
-                self.logger.debug(f"Evaluation stdout: {result.stdout}")
-                return {"success": False, "error": error_msg}
+            return self._parse_evaluation_output(result.stdout)
                 
+        except subprocess.TimeoutExpired:
+            error_msg = f"Evaluation timed out after {self.timeout} seconds"
+            self.logger.error(error_msg)
+            return {"success": False, "error": error_msg}
+            
         except subprocess.CalledProcessError as e:
             error_msg = f"Evaluation process failed: {str(e)}"
             self.logger.error(error_msg)
@@ -394,95 +464,337 @@ class ContextEvaluator:
             self.logger.error(error_msg)
             return {"success": False, "error": error_msg}
     
-    def evaluate_module(self, original_path: str, optimized_path: Optional[str] = None) -> Dict:
+    def _get_native_evaluator(self) -> NativeEvaluator:
         """
-        Evaluate a module by comparing original and optimized versions.
+        Get the in-process evaluator, creating its model client on first use.
+        
+        Returns:
+            NativeEvaluator: Evaluator for the native backend
+        """
+        if self._native_evaluator is None:
+            client = self._model_client
+            if client is None:
+                dspy_config = self.optimizer.config.get('dspy', {})
+                model_name = self.native_config.get('model', dspy_config.get('model', 'gpt-3.5-turbo'))
+                provider = self.native_config.get(
+                    'provider', 
+                    dspy_config.get('provider') or ('anthropic' if 'claude' in model_name.lower() else 'openai')
+                )
+                model_config = next(
+                    (option for option in self.optimizer.config.get('models', {}).get('options', []) or []
+                     if option.get('name') == model_name),
+                    dspy_config
+                )
+                client = create_model_client(provider, model_name, model_config=model_config)
+            
+            self._native_evaluator = NativeEvaluator(
+                client, 
+                max_workers=self.native_config.get('max_workers', self.max_concurrent),
+                similarity_threshold=self.native_config.get('similarity_threshold', DEFAULT_WORD_OVERLAP_THRESHOLD)
+            )
+        
+        return self._native_evaluator
+    
+    def run_native_evaluation(self, original_path: str, optimized_path: str, test_cases: List[Dict]) -> Dict:
+        """
+        Run the evaluation in-process with the native evaluator.
         
         Args:
             original_path: Path to the original module
-            optimized_path: Path to the optimized module (if None, will look in default location)
+            optimized_path: Path to the optimized module
+            test_cases: List of test case dictionaries
             
         Returns:
-            dict: Evaluation results
+            dict: Evaluation results with scores
         """
         try:
-            # Check if original module exists
-            original_path = Path(original_path)
-            if not original_path.exists():
-                error_msg = f"Original module not found: {original_path}"
-                self.logger.error(error_msg)
-                return {"success": False, "error": error_msg}
+            self.logger.info(f"Running native evaluation of {original_path}")
             
-            # Resolve optimized path if not provided
-            if not optimized_path:
-                optimized_dir = self.optimizer.config.get('optimized_dir', 'optimized')
-                optimized_path = Path(optimized_dir) / original_path.name
-            else:
-                optimized_path = Path(optimized_path)
+            output = self._get_native_evaluator().evaluate(
+                {
+                    "original": read_file_content(original_path),
+                    "optimized": read_file_content(optimized_path)
+                },
+                test_cases
+            )
+            
+            return self._score_results(output)
             
-            # Check if optimized module exists
-            if not optimized_path.exists():
-                error_msg = f"Optimized module not found: {optimized_path}"
+        except Exception as e:
+            error_msg = f"Error running native evaluation: {str(e)}"
+            self.logger.error(error_msg)
+            return {"success": False, "error": error_msg}
+    
+    async def run_evaluation_async(self, config_path: str) -> Dict:
+        """
+        Run the evaluation using PromptFoo without blocking the event loop.
+        
+        The process output is collected through pipes; the process is killed
+        if it runs longer than the configured timeout.
+        
+        Args:
+            config_path: Path to the evaluation configuration file
+            
+        Returns:
+            dict: Evaluation results with scores
+        """
+        process = None
+        try:
+            cmd = self._evaluation_command(config_path)
+            self.logger.info(f"Running evaluation command: {' '.join(cmd)}")
+            
+            # Own process group, so a timeout also stops the node processes npx spawns
+            process = await asyncio.create_subprocess_exec(
+                *cmd,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                start_new_session=(os.name == "posix")
+            )
+            stdout, stderr = await asyncio.wait_for(process.communicate(), timeout=self.timeout)
+            stdout = stdout.decode('utf-8', errors='replace')
+            
+            if process.returncode != 0:
+                error_msg = f"Evaluation process failed with exit code {process.returncode}"
                 self.logger.error(error_msg)
+                self.logger.debug(f"Evaluation stdout: {stdout}")
+                self.logger.debug(f"Evaluation stderr: {stderr.decode('utf-8', errors='replace')}")
                 return {"success": False, "error": error_msg}
             
-            # Read module content
-            original_content = read_file_content(original_path)
+            return self._parse_evaluation_output(stdout)
+            
+        except asyncio.TimeoutError:
+            error_msg = f"Evaluation timed out after {self.timeout} seconds"
+            self.logger.error(error_msg)
+            return {"success": False, "error": error_msg}
+            
+        except Exception as e:
+            error_msg = f"Error running evaluation: {str(e)}"
+            self.logger.error(error_msg)
+            return {"success": False, "error": error_msg}
             
-            # Generate test cases
-            test_cases = self.generate_test_cases(original_content)
+        finally:
+            # Don't leave a timed-out or cancelled PromptFoo process running
+            if process is not None and process.returncode is None:
+                if os.name == "posix":
+                    os.killpg(process.pid, signal.SIGKILL)
+                else:
+                    process.kill()
+                await process.wait()
+    
+    def _prepare_evaluation(self, original_path: str, optimized_path: Optional[str] = None) -> Dict:
+        """
+        Resolve module paths, generate test cases and write the PromptFoo config.
+        
+        Args:
+            original_path: Path to the original module
+            optimized_path: Path to the optimized module (if None, will look in default location)
             
-            # Create evaluation configuration
+        Returns:
+            dict: Resolved paths and config path, or an error result
+        """
+        # Check if original module exists
+        original_path = Path(original_path)
+        if not original_path.exists():
+            error_msg = f"Original module not found: {original_path}"
+            self.logger.error(error_msg)
+            return {"success": False, "error": error_msg}
+        
+        # Resolve optimized path if not provided
+        if not optimized_path:
+            optimized_dir = self.optimizer.config.get('optimized_dir', 'optimized')
+            optimized_path = Path(optimized_dir) / original_path.name
+        else:
+            optimized_path = Path(optimized_path)
+        
+        # Check if optimized module exists
+        if not optimized_path.exists():
+            error_msg = f"Optimized module not found: {optimized_path}"
+            self.logger.error(error_msg)
+            return {"success": False, "error": error_msg}
+        
+        # Read module content
+        original_content = read_file_content(original_path)
+        
+        # Generate test cases
+        test_cases = self.generate_test_cases(original_content)
+        
+        # Create evaluation configuration (the native backend doesn't need one)
+        config_path = None
+        if self.backend != "native":
             config_path = self.create_evaluation_config(
                 str(original_path),
                 str(optimized_path),
                 test_cases
             )
+        
+        return {
+            "success": True,
+            "original_path": original_path,
+            "optimized_path": optimized_path,
+            "test_cases": test_cases,
+            "config_path": config_path
+        }
+    
+    def _summarize_evaluation(self, prepared: Dict, eval_results: Dict) -> Dict:
+        """
+        Build the final module result and recommendation from a PromptFoo run.
+        
+        Args:
+            prepared: Output of _prepare_evaluation
+            eval_results: Output of run_evaluation
             
-            # Run the evaluation
-            eval_results = self.run_evaluation(config_path)
-            
-            if not eval_results.get("success", False):
-                return eval_results
-            
-            # Extract module name for reporting
-            module_name = extract_module_name(original_path)
+        Returns:
+            dict: Evaluation results
+        """
+        if not eval_results.get("success", False):
+            return eval_results
+        
+        # Extract module name for reporting
+        module_name = extract_module_name(prepared["original_path"])
+        
+        # Prepare the final results
+        results = {
+            "success": True,
+            "module_name": module_name,
+            "original_path": str(prepared["original_path"]),
+            "optimized_path": str(prepared["optimized_path"]),
+            "scores": eval_results.get("scores", {}),
+            "improvement": eval_results.get("improvement", 0),
+            "recommendation": "neutral"
+        }
+        
+        # Add recommendation based on improvement
+        if results["improvement"] > 10:
+            results["recommendation"] = "apply"
+            self.logger.info(f"Module '{module_name}' shows significant improvement: {results['improvement']:.2f}%")
+        elif results["improvement"] < -5:
+            results["recommendation"] = "reject"
+            self.logger.info(f"Module '{module_name}' shows regression: {results['improvement']:.2f}%")
+        else:
+            self.logger.info(f"Module '{module_name}' shows neutral results: {results['improvement']:.2f}%")
+        
+        return results
+    
+    def evaluate_module(self, original_path: str, optimized_path: Optional[str] = None) -> Dict:
+        """
+        Evaluate a module by comparing original and optimized versions.
+        
+        Args:
+            original_path: Path to the original module
+            optimized_path: Path to the optimized module (if None, will look in default location)
             
-            # Prepare the final results
-            results = {
-                "success": True,
-                "module_name": module_name,
-                "original_path": str(original_path),
-                "optimized_path": str(optimized_path),
-                "scores": eval_results.get("scores", {}),
-                "improvement": eval_results.get("improvement", 0),
-                "recommendation": "neutral"
-            }
+        Returns:
+            dict: Evaluation results
+        """
+        try:
+            with self.tracer.span("evaluate_module", module=original_path, backend=self.backend) as module_span:
+                with self.tracer.span("prepare_evaluation"):
+                    prepared = self._prepare_evaluation(original_path, optimized_path)
+                if not prepared.get("success", False):
+                    return prepared
+                
+                # Run the evaluation
+                with self.tracer.span("evaluation", test_cases=len(prepared["test_cases"])):
+                    if self.backend == "native":
+                        eval_results = self.run_native_evaluation(
+                            prepared["original_path"], prepared["optimized_path"], prepared["test_cases"]
+                        )
+                    else:
+                        eval_results = self.run_evaluation(prepared["config_path"])
+                
+                result = self._summarize_evaluation(prepared, eval_results)
+                module_span.set_attribute("success", result.get("success", False))
+                return result
             
-            # Add recommendation based on improvement
-            if results["improvement"] > 10:
-                results["recommendation"] = "apply"
-                self.logger.info(f"Module '{module_name}' shows significant improvement: {results['improvement']:.2f}%")
-            elif results["improvement"] < -5:
-                results["recommendation"] = "reject"
-                self.logger.info(f"Module '{module_name}' shows regression: {results['improvement']:.2f}%")
-            else:
-                self.logger.info(f"Module '{module_name}' shows neutral results: {results['improvement']:.2f}%")
+        except Exception as e:
+            error_msg = f"Error evaluating module: {str(e)}"
+            self.logger.error(error_msg)
+            return {"success": False, "error": error_msg}
+    
+    async def evaluate_module_async(self, original_path: str, optimized_path: Optional[str] = None) -> Dict:
+        """
+        Evaluate a module without blocking the event loop.
+        
+        Args:
+            original_path: Path to the original module
+            optimized_path: Path to the optimized module (if None, will look in default location)
             
-            return results
+        Returns:
+            dict: Evaluation results
+        """
+        try:
+            with self.tracer.span("evaluate_module", module=original_path, backend=self.backend) as module_span:
+                with self.tracer.span("prepare_evaluation"):
+                    prepared = self._prepare_evaluation(original_path, optimized_path)
+                if not prepared.get("success", False):
+                    return prepared
+                
+                with self.tracer.span("evaluation", test_cases=len(prepared["test_cases"])):
+                    if self.backend == "native":
+                        eval_results = await asyncio.to_thread(
+                            self.run_native_evaluation,
+                            prepared["original_path"], prepared["optimized_path"], prepared["test_cases"]
+                        )
+                    else:
+                        eval_results = await self.run_evaluation_async(prepared["config_path"])
+                
+                result = self._summarize_evaluation(prepared, eval_results)
+                module_span.set_attribute("success", result.get("success", False))
+                return result
             
         except Exception as e:
             error_msg = f"Error evaluating module: {str(e)}"
             self.logger.error(error_msg)
             return {"success": False, "error": error_msg}
     
-    def batch_evaluate(self, module_paths: Optional[List[str]] = None, output_path: Optional[str] = None) -> Dict:
+    async def iter_evaluations(
+        self, 
+        module_paths: List[str], 
+        max_concurrent: Optional[int] = None
+    ) -> AsyncIterator[Tuple[str, Dict]]:
         """
-        Evaluate multiple modules and summarize results.
+        Evaluate modules concurrently, yielding each result as soon as it finishes.
+        
+        Args:
+            module_paths: List of module paths to evaluate
+            max_concurrent: Maximum PromptFoo processes running at once
+                (default: `evaluation.promptfoo.max_concurrent`)
+            
+        Yields:
+            tuple: (module_path, evaluation result) in completion order
+        """
+        semaphore = asyncio.Semaphore(max(1, max_concurrent or self.max_concurrent))
+        
+        async def evaluate(module_path: str) -> Tuple[str, Dict]:
+            async with semaphore:
+                self.logger.info(f"Evaluating module: {module_path}")
+                return module_path, await self.evaluate_module_async(module_path)
+        
+        tasks = [asyncio.ensure_future(evaluate(module_path)) for module_path in module_paths]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            for task in tasks:
+                task.cancel()
+    
+    def batch_evaluate(
+        self, 
+        module_paths: Optional[List[str]] = None, 
+        output_path: Optional[str] = None,
+        max_concurrent: Optional[int] = None,
+        on_result: Optional[Callable[[str, Dict], None]] = None
+    ) -> Dict:
+        """
+        Evaluate multiple modules concurrently and summarize results.
         
         Args:
             module_paths: List of module paths to evaluate (None for all modules)
             output_path: Path to save the evaluation results
+            max_concurrent: Maximum PromptFoo processes running at once
+                (default: `evaluation.promptfoo.max_concurrent`)
+            on_result: Optional callback invoked with (module_path, result) as
+                each module finishes
             
         Returns:
             dict: Batch evaluation results
@@ -510,10 +822,22 @@ class ContextEvaluator:
         
         total_improvement = 0.0
         
+        async def collect() -> List[Tuple[str, Dict]]:
+            finished = []
+            async for module_path, eval_result in self.iter_evaluations(module_paths, max_concurrent):
+                if on_result:
+                    on_result(module_path, eval_result)
+                finished.append((module_path, eval_result))
+            return finished
+        
+        # Report modules in their input order regardless of completion order
+        with self.tracer.span("batch_evaluate", modules=len(module_paths), backend=self.backend) as batch_span:
+            finished = dict(asyncio.run(collect()))
+        results["trace_id"] = batch_span.trace_id
+        results["seconds"] = round(batch_span.elapsed, 4)
+        
         for module_path in module_paths:
-            self.logger.info(f"Evaluating module: {module_path}")
-            
-            eval_result = self.evaluate_module(module_path)
+            eval_result = finished[module_path]
             results["modules"].append(eval_result)
             
             if eval_result.get("success", False):
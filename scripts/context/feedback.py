@@ -1,5 +1,6 @@
 import os
 import re
+import sys
 import json
 import sqlite3
 import logging
@@ -7,6 +8,11 @@ from datetime import datetime
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple, Union, Any
 
+# Add the project root to the path
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+
+from lib.db import get_connection_manager, ensure_rollup_table
+
 from .utils import (
     setup_logger, 
     ensure_dir, 
@@ -40,6 +46,7 @@ class ContextFeedback:
         db_path = self.config.get('feedback_db', 'data/feedback.db')
         ensure_dir(os.path.dirname(db_path))
         self.db_path = db_path
+        self._db = get_connection_manager(db_path)
         
         self._init_database()
         self.logger.info(f"ContextFeedback initialized with database: {db_path}")
@@ -49,7 +56,7 @@ class ContextFeedback:
         Initialize the SQLite database with required tables.
         """
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._db.transaction() as conn:
                 cursor = conn.cursor()
                 
                 # Create feedback table
@@ -80,6 +87,21 @@ class ContextFeedback:
                 )
                 ''')
                 
+                # Per-module, per-model feedback totals maintained by triggers
+                ensure_rollup_table(
+                    conn, "module_feedback_rollup", "module_feedback",
+                    key_columns={"module_name": "{row}.module_name", "target_model": "{row}.target_model"},
+                    sum_columns={
+                        "feedback_count": "1",
+                        "effectiveness_sum": "{row}.effectiveness",
+                        "effectiveness_count": "CASE WHEN {row}.effectiveness IS NOT NULL THEN 1 ELSE 0 END",
+                        "effective_count": "CASE WHEN {row}.feedback_type = 'effective' THEN 1 ELSE 0 END",
+                        "ineffective_count": "CASE WHEN {row}.feedback_type = 'ineffective' THEN 1 ELSE 0 END",
+                        "error_count": "CASE WHEN {row}.feedback_type = 'error' THEN 1 ELSE 0 END"
+                    },
+                    max_columns={"last_feedback_at": "{row}.timestamp"}
+                )
+                
                 conn.commit()
                 self.logger.info("Database tables initialized")
                 
@@ -113,7 +135,7 @@ class ContextFeedback:
         try:
             timestamp = datetime.now().isoformat()
             
-            with sqlite3.connect(self.db_path) as conn:
+            with self._db.transaction() as conn:
                 cursor = conn.cursor()
                 cursor.execute(
                     '''
@@ -165,7 +187,7 @@ class ContextFeedback:
         try:
             timestamp = datetime.now().isoformat()
             
-            with sqlite3.connect(self.db_path) as conn:
+            with self._db.transaction() as conn:
                 cursor = conn.cursor()
                 cursor.execute(
                     '''
@@ -203,9 +225,9 @@ class ContextFeedback:
             dict: Feedback records
         """
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                conn.row_factory = sqlite3.Row
+            with self._db.transaction() as conn:
                 cursor = conn.cursor()
+                cursor.row_factory = sqlite3.Row
                 
                 if module_name:
                     query = "SELECT * FROM module_feedback WHERE module_name = ? ORDER BY timestamp DESC LIMIT ?"
@@ -240,9 +262,9 @@ class ContextFeedback:
             dict: Optimization history records
         """
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                conn.row_factory = sqlite3.Row
+            with self._db.transaction() as conn:
                 cursor = conn.cursor()
+                cursor.row_factory = sqlite3.Row
                 
                 if module_name:
                     query = "SELECT * FROM optimization_history WHERE module_name = ? ORDER BY timestamp DESC LIMIT ?"
@@ -277,20 +299,20 @@ class ContextFeedback:
             dict: Module effectiveness data
         """
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                conn.row_factory = sqlite3.Row
+            with self._db.transaction() as conn:
                 cursor = conn.cursor()
+                cursor.row_factory = sqlite3.Row
                 
                 # Construct the query based on parameters
                 query = """
                 SELECT 
                     module_name,
-                    COUNT(*) as feedback_count,
-                    AVG(effectiveness) as avg_effectiveness,
-                    SUM(CASE WHEN feedback_type = 'effective' THEN 1 ELSE 0 END) as effective_count,
-                    SUM(CASE WHEN feedback_type = 'ineffective' THEN 1 ELSE 0 END) as ineffective_count,
-                    SUM(CASE WHEN feedback_type = 'error' THEN 1 ELSE 0 END) as error_count
-                FROM module_feedback
+                    SUM(feedback_count) as feedback_count,
+                    SUM(effectiveness_sum) * 1.0 / NULLIF(SUM(effectiveness_count), 0) as avg_effectiveness,
+                    SUM(effective_count) as effective_count,
+                    SUM(ineffective_count) as ineffective_count,
+                    SUM(error_count) as error_count
+                FROM module_feedback_rollup
                 """
                 
                 params = []
@@ -395,9 +417,9 @@ class ContextFeedback:
             dict: Optimization success statistics
         """
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                conn.row_factory = sqlite3.Row
+            with self._db.transaction() as conn:
                 cursor = conn.cursor()
+                cursor.row_factory = sqlite3.Row
                 
                 # Get total optimization attempts
                 cursor.execute("SELECT COUNT(*) as total FROM optimization_history WHERE success = 1")
@@ -0,0 +1,345 @@
+"""
+Native Evaluation Engine
+
+This module evaluates original and optimized context modules in-process, as an
+alternative to spawning PromptFoo. It runs the assertion types the evaluators
+generate against a pluggable model client and reports results in the same
+shape as PromptFoo's JSON output, so the existing scoring code can be reused
+unchanged.
+
+The `similar` assertion is scored differently from PromptFoo: PromptFoo
+compares embeddings, while the native backend compares word frequencies
+(`word_overlap_similarity`) against its own threshold, since it has no
+embedding model. Its scores and pass rates are not interchangeable with
+PromptFoo's.
+"""
+
+import re
+import abc
+import json
+import math
+import logging
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger('native_evaluator')
+
+# Word overlap score `similar` assertions must reach. Assertion thresholds are
+# tuned for PromptFoo's embedding similarity and are not used.
+DEFAULT_WORD_OVERLAP_THRESHOLD = 0.5
+
+# Length checks supported from `javascript` assertions, e.g. "output.length > 50"
+LENGTH_CHECK_PATTERN = re.compile(
+    r'^\(?\s*(?:output|outputs\[0\])\.length\s*(===|!==|==|!=|>=|<=|>|<)\s*(\d+)\s*\)?$'
+)
+
+LENGTH_OPERATORS = {
+    ">": lambda a, b: a > b,
+    "<": lambda a, b: a < b,
+    ">=": lambda a, b: a >= b,
+    "<=": lambda a, b: a <= b,
+    "==": lambda a, b: a == b,
+    "===": lambda a, b: a == b,
+    "!=": lambda a, b: a != b,
+    "!==": lambda a, b: a != b,
+}
+
+
+class ModelClient(abc.ABC):
+    """
+    Interface for the model used by the native evaluator.
+
+    Subclasses only need to implement complete(); clients must be safe to call
+    from several threads at once.
+    """
+
+    @abc.abstractmethod
+    def complete(self, prompt: str, system: Optional[str] = None) -> str:
+        """
+        Generate a response for a prompt.
+
+        Args:
+            prompt: User prompt
+            system: Optional system prompt
+
+        Returns:
+            Model response text
+        """
+
+
+class CallableModelClient(ModelClient):
+    """Adapts a plain function `fn(prompt, system) -> str` into a model client."""
+
+    def __init__(self, fn: Callable[[str, Optional[str]], str]):
+        self.fn = fn
+
+    def complete(self, prompt: str, system: Optional[str] = None) -> str:
+        return self.fn(prompt, system)
+
+
+class DSPyModelClient(ModelClient):
+    """Model client backed by a DSPy language model."""
+
+    def __init__(self, lm: Any):
+        """
+        Initialize the client.
+
+        Args:
+            lm: DSPy language model instance
+        """
+        self.lm = lm
+
+    def complete(self, prompt: str, system: Optional[str] = None) -> str:
+        if system:
+            prompt = f"{system}\n\n{prompt}"
+
+        completions = self.lm(prompt)
+        if isinstance(completions, (list, tuple)):
+            return completions[0] if completions else ""
+        return str(completions)
+
+
+def create_model_client(
+    provider: str,
+    model_name: str,
+    temperature: float = 0.2,
+    max_tokens: Optional[int] = None,
+    model_config: Optional[Dict[str, Any]] = None
+) -> ModelClient:
+    """
+    Create a DSPy-backed model client for a provider.
+
+    Args:
+        provider: Provider name (openai, anthropic or fake)
+        model_name: Name of the model
+        temperature: Sampling temperature
+        max_tokens: Optional maximum response length
+        model_config: Optional `models.options` entry of the model; the fake
+            provider reads its latency, jitter and error settings from it
+
+    Returns:
+        Model client
+    """
+    if provider == "fake":
+        from lib.fake_provider import FakeLM
+        return DSPyModelClient(FakeLM.from_config(
+            {"temperature": temperature, **(model_config or {}), "name": model_name}
+        ))
+
+    import dspy
+
+    kwargs = {"model": model_name, "temperature": temperature}
+    if max_tokens:
+        kwargs["max_tokens"] = max_tokens
+
+    if provider == "openai":
+        return DSPyModelClient(dspy.OpenAI(**kwargs))
+    if provider == "anthropic":
+        return DSPyModelClient(dspy.Anthropic(**kwargs))
+
+    raise ValueError(f"Unsupported provider for native evaluation: {provider}")
+
+
+def _tokens(text: str) -> Counter:
+    return Counter(re.findall(r'\w+', text.lower()))
+
+
+def word_overlap_similarity(a: str, b: str) -> float:
+    """
+    Cosine similarity of the word frequency vectors of two texts.
+
+    This measures shared vocabulary, not meaning, so it scores lower than
+    PromptFoo's embedding similarity for paraphrases.
+
+    Args:
+        a: First text
+        b: Second text
+
+    Returns:
+        Similarity between 0 and 1
+    """
+    tokens_a, tokens_b = _tokens(a), _tokens(b)
+    if not tokens_a or not tokens_b:
+        return 0.0
+
+    dot = sum(count * tokens_b[token] for token, count in tokens_a.items())
+    norm = math.sqrt(sum(c * c for c in tokens_a.values())) * math.sqrt(sum(c * c for c in tokens_b.values()))
+    return dot / norm
+
+
+def _find_json(text: str) -> Optional[Any]:
+    """Return the first JSON object or array embedded in a text, if any."""
+    decoder = json.JSONDecoder()
+    for match in re.finditer(r'[\[{]', text):
+        try:
+            value, _ = decoder.raw_decode(text, match.start())
+            return value
+        except ValueError:
+            continue
+    return None
+
+
+def _check_length_expression(expression: str, output: str) -> Optional[bool]:
+    """
+    Evaluate a JavaScript length check such as
+    "outputs[0].length > 50 && outputs[0].length < 3000".
+
+    Returns:
+        Result of the check, or None if the expression is not a length check
+    """
+    any_passed = False
+    for alternative in expression.split("||"):
+        all_passed = True
+        for term in alternative.split("&&"):
+            match = LENGTH_CHECK_PATTERN.match(term.strip())
+            if not match:
+                return None
+            operator, value = match.groups()
+            all_passed = all_passed and LENGTH_OPERATORS[operator](len(output), int(value))
+        any_passed = any_passed or all_passed
+    return any_passed
+
+
+class NativeEvaluator:
+    """
+    Runs evaluation test cases in-process.
+
+    Supported assertion types are contains, icontains, contains-any,
+    not-contains, not-contains-any, javascript (length checks only), similar
+    (word overlap, see the module docstring) and contains-json. Unsupported
+    assertions are skipped and reported, not counted as failures.
+    """
+
+    def __init__(
+        self,
+        client: ModelClient,
+        max_workers: int = 4,
+        similarity: Callable[[str, str], float] = word_overlap_similarity,
+        similarity_threshold: float = DEFAULT_WORD_OVERLAP_THRESHOLD
+    ):
+        """
+        Initialize the evaluator.
+
+        Args:
+            client: Model client used to generate responses
+            max_workers: Maximum model calls in flight at once
+            similarity: Function scoring the similarity of two texts (0-1)
+                for `similar` assertions
+            similarity_threshold: Score `similar` assertions must reach,
+                on the scale of `similarity`
+        """
+        self.client = client
+        self.max_workers = max_workers
+        self.similarity = similarity
+        self.similarity_threshold = similarity_threshold
+
+    def check_assertion(self, assertion: Dict[str, Any], output: str) -> Dict[str, Any]:
+        """
+        Check a single assertion against a model response.
+
+        Args:
+            assertion: Assertion dictionary with `type` and `value`
+            output: Model response
+
+        Returns:
+            Dictionary with `passed`, `reason` and, for unsupported assertions, `skipped`
+        """
+        assertion_type = assertion.get("type", "")
+        value = assertion.get("value")
+        passed = None
+        reason = ""
+
+        if assertion_type == "contains":
+            passed = str(value) in output
+        elif assertion_type == "icontains":
+            passed = str(value).lower() in output.lower()
+        elif assertion_type == "contains-any":
+            passed = any(str(v) in output for v in (value or []))
+        elif assertion_type == "not-contains":
+            passed = str(value) not in output
+        elif assertion_type == "not-contains-any":
+            passed = not any(str(v) in output for v in (value or []))
+        elif assertion_type == "javascript":
+            passed = _check_length_expression(str(value), output)
+            if passed is None:
+                reason = f"Unsupported javascript assertion: {value}"
+        elif assertion_type == "similar":
+            score = self.similarity(output, str(value or ""))
+            passed = score >= self.similarity_threshold
+            reason = f"Word overlap {score:.2f} (threshold {self.similarity_threshold})"
+        elif assertion_type == "contains-json":
+            passed = _find_json(output) is not None
+        else:
+            reason = f"Unsupported assertion type: {assertion_type}"
+
+        if passed is None:
+            return {"type": assertion_type, "passed": False, "skipped": True, "reason": reason}
+
+        return {"type": assertion_type, "passed": passed, "reason": reason}
+
+    def _run_prompt(self, name: str, content: str, test_case: Dict[str, Any],
+                    system: Optional[str]) -> Dict[str, Any]:
+        """Generate a response for one variant and test case, then check its assertions."""
+        query = "\n".join(str(v) for v in test_case.get("vars", {}).values())
+
+        try:
+            output = self.client.complete(f"{content}\n\n{query}" if query else content, system=system)
+        except Exception as e:
+            logger.error(f"Model call failed for prompt '{name}': {str(e)}")
+            return {"prompt": {"name": name}, "success": False, "error": str(e), "assertion": []}
+
+        checks = [self.check_assertion(a, output) for a in test_case.get("assert", [])]
+        counted = [c for c in checks if not c.get("skipped")]
+
+        return {
+            "prompt": {"name": name},
+            "output": output,
+            "success": all(c["passed"] for c in counted),
+            "score": (sum(c["passed"] for c in counted) / len(counted)) if counted else 1.0,
+            "assertion": counted,
+            "skipped": [c for c in checks if c.get("skipped")]
+        }
+
+    def evaluate(
+        self,
+        variants: Dict[str, str],
+        test_cases: List[Dict[str, Any]],
+        system: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Run every test case against every variant of a module.
+
+        Each variant's content is sent with the test case's vars appended,
+        mirroring how the PromptFoo configs include the module file ahead of
+        the user prompt.
+
+        Args:
+            variants: Prompt name -> module content (e.g. original/optimized)
+            test_cases: Test cases in PromptFoo format (`vars` and `assert`)
+            system: Optional system prompt
+
+        Returns:
+            Dictionary shaped like PromptFoo's JSON output, with a `results`
+            list holding each test case's `promptResults`
+        """
+        jobs = [
+            (name, content, test_case)
+            for test_case in test_cases
+            for name, content in variants.items()
+        ]
+
+        with ThreadPoolExecutor(max_workers=max(1, self.max_workers)) as executor:
+            prompt_results = list(executor.map(
+                lambda job: self._run_prompt(job[0], job[1], job[2], system), jobs
+            ))
+
+        results = []
+        per_test = len(variants)
+        for index, test_case in enumerate(test_cases):
+            results.append({
+                "vars": test_case.get("vars", {}),
+                "promptResults": prompt_results[index * per_test:(index + 1) * per_test]
+            })
+
+        return {"results": results}
@@ -1,13 +1,25 @@
 import os
+import sys
 import json
+import time
 import tempfile
 import logging
 import difflib
+import threading
 import subprocess
+import multiprocessing
 from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from typing import Dict, List, Optional, Tuple, Union, Any
 
 import dspy
+
+# Add the project root to the path for the shared lib package
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+
+from lib.fake_provider import FakeLM
+from lib.module_registry import get_registry
 from .utils import (
     setup_logger, 
     load_yaml_config, 
@@ -18,9 +30,116 @@ from .utils import (
     write_file_content
 )
 
+DEFAULT_OPTIMIZATION_GOALS = [
+    "Clarity and readability",
+    "Compatibility with MCP format",
+    "Efficiency in retrieval",
+    "Accuracy of context"
+]
+
+# Ways to run the DSPy program, set with `dspy.execution` in the configuration:
+# in this process, in a pool of worker processes, or one `dspy_script`
+# process per module (the original handoff through a temporary file)
+EXECUTION_MODES = ("in_process", "pool", "subprocess")
+
+class OptimizeModuleContent(dspy.Signature):
+    """Optimize a context module for AI assistants while preserving its meaning."""
+    
+    original_content = dspy.InputField(desc="The original context module content")
+    optimization_goals = dspy.InputField(desc="Goals the optimized content should meet")
+    optimized_content = dspy.OutputField(desc="The optimized context module content")
+
+def configure_dspy(dspy_config: Dict, logger: logging.Logger) -> None:
+    """
+    Configure DSPy with the model from the `dspy` section of the configuration.
+    
+    Args:
+        dspy_config: The `dspy` configuration section
+        logger: Logger for status messages
+    """
+    model_name = dspy_config.get('model', 'gpt-3.5-turbo')
+    
+    if dspy_config.get('provider') == 'fake':
+        dspy.configure(lm=FakeLM.from_config({"name": model_name, **dspy_config}))
+        logger.info(f"DSPy configured with fake model: {model_name}")
+    
+    elif 'openai' in model_name.lower():
+        api_key = os.environ.get('OPENAI_API_KEY')
+        if not api_key:
+            logger.warning("OpenAI API key not found in environment variables")
+        
+        dspy.configure(lm=model_name)
+        logger.info(f"DSPy configured with OpenAI model: {model_name}")
+    
+    elif 'claude' in model_name.lower():
+        api_key = os.environ.get('ANTHROPIC_API_KEY')
+        if not api_key:
+            logger.warning("Anthropic API key not found in environment variables")
+        
+        dspy.configure(lm=model_name)
+        logger.info(f"DSPy configured with Anthropic model: {model_name}")
+    
+    else:
+        # Default configuration
+        dspy.configure(lm=model_name)
+        logger.info(f"DSPy configured with model: {model_name}")
+
+def create_optimization_program() -> dspy.Module:
+    """
+    Create the DSPy program that optimizes module content.
+    
+    Returns:
+        dspy.Module: Program taking original_content and optimization_goals
+    """
+    return dspy.ChainOfThought(OptimizeModuleContent)
+
+def run_optimization_program(program: dspy.Module, content: str, optimization_goals: List[str]) -> Dict:
+    """
+    Run the optimization program on module content.
+    
+    Args:
+        program: Program from create_optimization_program
+        content: Module content to optimize
+        optimization_goals: Goals the optimized content should meet
+        
+    Returns:
+        dict: Optimized content and metadata
+    """
+    start = time.perf_counter()
+    prediction = program(
+        original_content=content,
+        optimization_goals="\n".join(f"- {goal}" for goal in optimization_goals)
+    )
+    
+    return {
+        "success": True,
+        "optimized_content": prediction.optimized_content,
+        "metadata": {"seconds": round(time.perf_counter() - start, 3)}
+    }
+
+# Program of a pool worker process, created once by _init_pool_worker
+_worker_program = None
+
+def _init_pool_worker(dspy_config: Dict) -> None:
+    """Configure DSPy and create the program once per worker process."""
+    global _worker_program
+    configure_dspy(dspy_config, setup_logger('context_optimizer_worker'))
+    _worker_program = create_optimization_program()
+
+def _optimize_in_pool_worker(content: str, optimization_goals: List[str]) -> Dict:
+    """Optimize module content in a pool worker process."""
+    return run_optimization_program(_worker_program, content, optimization_goals)
+
 class ContextOptimizer:
     """
     A class to optimize AI context modules using DSPy.
+    
+    By default the DSPy program runs in this process on the module content in
+    memory. Set `dspy.execution` to `pool` to run it in a pool of
+    `dspy.pool_workers` worker processes instead, isolating DSPy and the
+    provider clients from the caller, or to `subprocess` to hand each module
+    to the external `dspy_script`. Pool workers are spawned, so scripts using
+    the pool need an `if __name__ == "__main__":` guard.
     """
     
     def __init__(self, config_path: str):
@@ -41,7 +160,17 @@ class ContextOptimizer:
         # Configure DSPy
         self._configure_dspy()
         
-        self.logger.info("ContextOptimizer initialized")
+        dspy_config = self.config.get('dspy', {})
+        self.execution = dspy_config.get('execution', 'in_process')
+        if self.execution not in EXECUTION_MODES:
+            raise ValueError(f"Unknown DSPy execution mode: {self.execution}")
+        
+        self.pool_workers = dspy_config.get('pool_workers', min(4, os.cpu_count() or 1))
+        self._program = None
+        self._pool = None
+        self._lock = threading.Lock()
+        
+        self.logger.info(f"ContextOptimizer initialized ({self.execution} execution)")
     
     def _load_config(self, config_path: str) -> Dict:
         """
@@ -66,30 +195,8 @@ class ContextOptimizer:
         Configure DSPy with the appropriate model based on configuration.
         """
         try:
-            model_config = self.config.get('dspy', {})
-            model_name = model_config.get('model', 'gpt-3.5-turbo')
-            
-            if 'openai' in model_name.lower():
-                api_key = os.environ.get('OPENAI_API_KEY')
-                if not api_key:
-                    self.logger.warning("OpenAI API key not found in environment variables")
-                
-                dspy.configure(lm=model_name)
-                self.logger.info(f"DSPy configured with OpenAI model: {model_name}")
+            configure_dspy(self.config.get('dspy', {}), self.logger)
             
-            elif 'claude' in model_name.lower():
-                api_key = os.environ.get('ANTHROPIC_API_KEY')
-                if not api_key:
-                    self.logger.warning("Anthropic API key not found in environment variables")
-                
-                dspy.configure(lm=model_name)
-                self.logger.info(f"DSPy configured with Anthropic model: {model_name}")
-            
-            else:
-                # Default configuration
-                dspy.configure(lm=model_name)
-                self.logger.info(f"DSPy configured with model: {model_name}")
-                
         except Exception as e:
             self.logger.error(f"Error configuring DSPy: {str(e)}")
             raise
@@ -112,8 +219,11 @@ class ContextOptimizer:
             self.logger.error(f"Module directory does not exist: {module_dir}")
             return []
         
-        # Find all markdown files recursively
-        modules = list(module_dir.glob('**/*.md'))
+        # Find all markdown files recursively, including ones added since the
+        # shared registry last scanned the directory
+        registry = get_registry(module_dir, exclude_dirs=())
+        registry.refresh()
+        modules = registry.paths()
         self.logger.info(f"Found {len(modules)} modules in {module_dir}")
         
         return [str(module) for module in modules]
@@ -172,12 +282,12 @@ class ContextOptimizer:
             
             # Save the optimized content
             ensure_dir(output_dir)
-            write_file_content(optimized_content, output_path)
+            write_file_content(output_path, optimized_content)
             
             # Generate diff
             diff = self._generate_diff(content, optimized_content, module_name)
             diff_path = output_dir / f"{module_path.stem}_diff.txt"
-            write_file_content(diff, diff_path)
+            write_file_content(diff_path, diff)
             
             self.logger.info(f"Optimization complete: {module_name}")
             return {
@@ -201,6 +311,134 @@ class ContextOptimizer:
             content: Module content to optimize
             module_name: Name of the module for logging
             
+        Returns:
+            dict: Results of the optimization process
+        """
+        optimization_goals = self.config.get("optimization_goals", DEFAULT_OPTIMIZATION_GOALS)
+        model = self.config.get("dspy", {}).get("model", "gpt-3.5-turbo")
+        
+        if self.execution == "subprocess":
+            return self._run_dspy_script(content, module_name, optimization_goals, model)
+        
+        try:
+            if self.execution == "pool":
+                result = self._run_in_pool(content, optimization_goals, module_name)
+            else:
+                result = run_optimization_program(self._get_program(), content, optimization_goals)
+            
+            result["metadata"].update({"model": model, "execution": self.execution})
+            self.logger.debug(f"DSPy optimization of {module_name} took {result['metadata']['seconds']}s")
+            return result
+            
+        except BrokenProcessPool as e:
+            error_msg = f"DSPy worker process failed: {str(e)}"
+            self.logger.error(error_msg)
+            return {"success": False, "error": error_msg}
+            
+        except Exception as e:
+            error_msg = f"Error during DSPy optimization: {str(e)}"
+            self.logger.error(error_msg)
+            return {"success": False, "error": error_msg}
+    
+    def _get_program(self) -> dspy.Module:
+        """
+        Get the in-process optimization program, creating it on first use.
+        
+        Returns:
+            dspy.Module: The optimization program
+        """
+        with self._lock:
+            if self._program is None:
+                self._program = create_optimization_program()
+            return self._program
+    
+    def _get_pool(self) -> ProcessPoolExecutor:
+        """
+        Get the worker pool, starting it on first use.
+        
+        Workers are spawned rather than forked, so they don't inherit the
+        caller's threads or open provider connections, and each configures
+        DSPy once when it starts.
+        
+        Returns:
+            ProcessPoolExecutor: The worker pool
+        """
+        with self._lock:
+            if self._pool is None:
+                self.logger.info(f"Starting {self.pool_workers} DSPy worker processes")
+                self._pool = self._create_pool(self.pool_workers)
+            return self._pool
+    
+    def _create_pool(self, workers: int) -> ProcessPoolExecutor:
+        """Create a pool of spawned workers that configure DSPy when they start."""
+        return ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_pool_worker,
+            initargs=(self.config.get('dspy', {}),)
+        )
+    
+    def _run_in_pool(self, content: str, optimization_goals: List[str], module_name: str) -> Dict:
+        """
+        Run the optimization program in a pool worker.
+        
+        When a worker dies, every module queued on or running in the pool fails
+        with it, not only the one that crashed it. Such a module is retried
+        alone in a worker of its own, so it is reported as failed only if it
+        crashes that worker too.
+        
+        Args:
+            content: Module content to optimize
+            optimization_goals: Goals the optimized content should meet
+            module_name: Name of the module for logging
+            
+        Returns:
+            dict: Results of the optimization program
+        """
+        pool = self._get_pool()
+        try:
+            return pool.submit(_optimize_in_pool_worker, content, optimization_goals).result()
+        except BrokenProcessPool as e:
+            self._reset_pool(pool)
+            self.logger.warning(f"DSPy worker pool failed while optimizing {module_name} ({str(e)}); "
+                                f"retrying it in its own worker")
+        
+        with self._create_pool(1) as own_pool:
+            return own_pool.submit(_optimize_in_pool_worker, content, optimization_goals).result()
+    
+    def _reset_pool(self, failed_pool: Optional[ProcessPoolExecutor] = None) -> None:
+        """
+        Shut down the worker pool, if any; the next call starts a new one.
+        
+        Args:
+            failed_pool: Pool that failed. The current pool is only shut down
+                if it is still this one, since modules that failed together
+                all report it and the first of them may already have replaced it.
+        """
+        with self._lock:
+            if failed_pool is not None and self._pool is not failed_pool:
+                return
+            pool, self._pool = self._pool, None
+        
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+    
+    def close(self) -> None:
+        """
+        Shut down the worker pool, if one was started.
+        """
+        self._reset_pool()
+    
+    def _run_dspy_script(self, content: str, module_name: str, optimization_goals: List[str], model: str) -> Dict:
+        """
+        Run DSPy optimization in a separate `dspy_script` process.
+        
+        Args:
+            content: Module content to optimize
+            module_name: Name of the module for logging
+            optimization_goals: Goals the optimized content should meet
+            model: Model name passed to the script
+            
         Returns:
             dict: Results of the optimization process
         """
@@ -213,13 +451,8 @@ class ContextOptimizer:
                 optimization_input = {
                     "module_name": module_name,
                     "content": content,
-                    "optimization_goals": self.config.get("optimization_goals", [
-                        "Clarity and readability",
-                        "Compatibility with MCP format",
-                        "Efficiency in retrieval",
-                        "Accuracy of context"
-                    ]),
-                    "model": self.config.get("dspy", {}).get("model", "gpt-3.5-turbo")
+                    "optimization_goals": optimization_goals,
+                    "model": model
                 }
                 
                 # Write the input to the temporary file
@@ -330,10 +563,19 @@ class ContextOptimizer:
             "modules": []
         }
         
-        for module_path in module_paths:
+        def optimize(module_path: str) -> Dict:
             self.logger.info(f"Processing module: {module_path}")
-            result = self.optimize_module(module_path, output_dir)
-            
+            return self.optimize_module(module_path, output_dir)
+        
+        # Pool workers run DSPy in parallel, so keep each of them busy
+        workers = self.pool_workers if self.execution == "pool" else 1
+        if workers > 1:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                module_results = list(executor.map(optimize, module_paths))
+        else:
+            module_results = [optimize(module_path) for module_path in module_paths]
+        
+        for result in module_results:
             if result.get("success", False):
                 results["succeeded"] += 1
             else:
@@ -388,7 +630,7 @@ class ContextOptimizer:
             optimized_content = read_file_content(optimized_path)
             
             # Write to original path
-            write_file_content(optimized_content, original_path)
+            write_file_content(original_path, optimized_content)
             
             module_name = extract_module_name(original_path)
             self.logger.info(f"Applied optimization to {module_name}")
@@ -1,25 +1,216 @@
 #!/usr/bin/env python3
 
+import os
 import sys
+import csv
+import json
+import hashlib
+import argparse
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
-def count_tokens(file_path):
+# Add the project root to the path
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+
+from lib.token_counter import get_counter, encoding_for_model, DEFAULT_ENCODING
+
+INDEX_NAME = ".token-index.json"
+EXTENSIONS = (".md",)
+
+
+def file_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def count_file(args):
+    """Count tokens in one file. Runs in a worker process; the encoding is loaded once per worker."""
+    file_path, encoding_name = args
+    with open(file_path, 'rb') as f:
+        data = f.read()
+    tokens = get_counter(encoding_name).count(data.decode('utf-8', errors='replace'))
+    return file_path, file_hash(data), tokens
+
+
+def collect_files(paths):
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, names in os.walk(path):
+                dirs[:] = sorted(d for d in dirs if not d.startswith('.'))
+                files.extend(os.path.join(root, name) for name in sorted(names) if name.endswith(EXTENSIONS))
+        elif os.path.isfile(path):
+            files.append(path)
+        else:
+            print(f"⚠️ Not found: {path}", file=sys.stderr)
+    return files
+
+
+def load_index(index_path, encoding_name):
     try:
-        import tiktoken
-        enc = tiktoken.get_encoding('cl100k_base')
-    except ImportError:
-        print("⚠️ Requires `tiktoken`. Install with `pip install tiktoken`.")
-        return
+        with open(index_path, 'r', encoding='utf-8') as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    # Counts from another encoding are not reusable
+    if index.get("encoding") != encoding_name:
+        return {}
+    return index.get("files", {})
+
+
+def save_index(index_path, encoding_name, entries):
+    tmp_path = f"{index_path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({"encoding": encoding_name, "files": entries}, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, index_path)
+
+
+def count_tokens_in_files(files, encoding_name, index_path=None, workers=None):
+    """
+    Count tokens for many files, reusing cached counts from the sidecar index.
+
+    Files whose mtime and size match the index are served directly; files that
+    were touched are re-hashed and only re-counted if their content changed.
+    Remaining files are counted on a process pool.
+    """
+    index = load_index(index_path, encoding_name) if index_path else {}
+    results = {}
+    pending = []
+    stats = {"cached": 0, "counted": 0}
+
+    for file_path in files:
+        key = os.path.abspath(file_path)
+        stat = os.stat(file_path)
+        entry = index.get(key)
+
+        if entry and entry["mtime"] == stat.st_mtime and entry["size"] == stat.st_size:
+            results[file_path] = entry["tokens"]
+            stats["cached"] += 1
+            continue
+
+        if entry:
+            with open(file_path, 'rb') as f:
+                if file_hash(f.read()) == entry["hash"]:
+                    entry.update(mtime=stat.st_mtime, size=stat.st_size)
+                    results[file_path] = entry["tokens"]
+                    stats["cached"] += 1
+                    continue
 
-    with open(file_path, 'r', encoding='utf-8') as f:
-        text = f.read()
+        pending.append(file_path)
+
+    if pending:
+        jobs = [(file_path, encoding_name) for file_path in pending]
+        if len(pending) == 1 or workers == 1:
+            counted = list(map(count_file, jobs))
+        else:
+            pool_size = workers or os.cpu_count() or 1
+            with ProcessPoolExecutor(max_workers=pool_size) as executor:
+                counted = list(executor.map(count_file, jobs, chunksize=max(1, len(jobs) // (pool_size * 4))))
+
+        for file_path, digest, tokens in counted:
+            stat = os.stat(file_path)
+            index[os.path.abspath(file_path)] = {
+                "hash": digest,
+                "mtime": stat.st_mtime,
+                "size": stat.st_size,
+                "tokens": tokens,
+            }
+            results[file_path] = tokens
+            stats["counted"] += 1
+
+    if index_path:
+        # Drop entries for files that no longer exist
+        index = {key: entry for key, entry in index.items() if os.path.exists(key)}
+        save_index(index_path, encoding_name, index)
+
+    return results, stats
+
+
+def build_report(files, results, encoding_name, roots):
+    per_directory = defaultdict(lambda: {"files": 0, "tokens": 0})
+    per_file = []
+
+    for file_path in files:
+        tokens = results[file_path]
+        per_file.append({"path": file_path, "tokens": tokens})
+        directory = os.path.dirname(file_path) or "."
+        per_directory[directory]["files"] += 1
+        per_directory[directory]["tokens"] += tokens
+
+    return {
+        "encoding": encoding_name,
+        "roots": roots,
+        "total": {"files": len(per_file), "tokens": sum(f["tokens"] for f in per_file)},
+        "directories": [{"path": d, **v} for d, v in sorted(per_directory.items())],
+        "files": per_file,
+    }
+
+
+def write_report(report, output_format, output):
+    stream = open(output, 'w', encoding='utf-8', newline='') if output else sys.stdout
+    try:
+        if output_format == "json":
+            json.dump(report, stream, indent=2)
+            stream.write("\n")
+        elif output_format == "csv":
+            writer = csv.writer(stream)
+            writer.writerow(["scope", "path", "files", "tokens"])
+            for entry in report["files"]:
+                writer.writerow(["file", entry["path"], 1, entry["tokens"]])
+            for entry in report["directories"]:
+                writer.writerow(["directory", entry["path"], entry["files"], entry["tokens"]])
+            writer.writerow(["total", "", report["total"]["files"], report["total"]["tokens"]])
+        else:
+            for entry in report["files"]:
+                stream.write(f"{entry['path']}: {entry['tokens']} tokens\n")
+            if len(report["files"]) > 1:
+                for entry in report["directories"]:
+                    stream.write(f"{entry['path']}/: {entry['tokens']} tokens in {entry['files']} files\n")
+                stream.write(f"Total: {report['total']['tokens']} tokens in {report['total']['files']} files\n")
+    finally:
+        if output:
+            stream.close()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Count tokens in context module files or whole module trees"
+    )
+    parser.add_argument("paths", nargs="+", help="Files or directories (directories are walked for *.md)")
+    parser.add_argument("--encoding", help=f"Tokenizer encoding (default: {DEFAULT_ENCODING})")
+    parser.add_argument("--model", help="Target model used to pick the encoding")
+    parser.add_argument("--format", choices=["text", "json", "csv"], default="text", help="Output format")
+    parser.add_argument("--output", help="Write the report to a file instead of stdout")
+    parser.add_argument("--workers", type=int, help="Worker processes for counting (default: CPU count)")
+    parser.add_argument("--index", help=f"Sidecar index path (default: {INDEX_NAME} in the first directory)")
+    parser.add_argument("--no-index", action="store_true", help="Do not read or write the sidecar index")
+    return parser.parse_args()
 
-    tokens = enc.encode(text)
-    print(f"{file_path}: {len(tokens)} tokens")
 
 if __name__ == "__main__":
-    if len(sys.argv) < 2:
-        print("Usage: token-counter.py file1.md [file2.md ...]")
+    args = parse_args()
+
+    requested_encoding = args.encoding or encoding_for_model(args.model)
+    # Counts, the report and the sidecar index use the encoding actually
+    # loaded, so approximate counts are never reused as exact ones
+    encoding_name = get_counter(requested_encoding).encoding_name
+    files = collect_files(args.paths)
+    if not files:
+        print("No files to count.", file=sys.stderr)
         sys.exit(1)
-    for path in sys.argv[1:]:
-        count_tokens(path)
+
+    index_path = None
+    if not args.no_index:
+        directories = [p for p in args.paths if os.path.isdir(p)]
+        if args.index:
+            index_path = args.index
+        elif directories:
+            index_path = os.path.join(directories[0], INDEX_NAME)
+
+    results, stats = count_tokens_in_files(files, encoding_name, index_path, args.workers)
+    if encoding_name != requested_encoding:
+        print(f"⚠️ Approximate counts. Install `tiktoken` for exact {requested_encoding} counts.", file=sys.stderr)
+
+    write_report(build_report(files, results, encoding_name, args.paths), args.format, args.output)
+    if index_path:
+        print(f"({stats['cached']} cached, {stats['counted']} counted)", file=sys.stderr)
@@ -0,0 +1,1330 @@
+#!/usr/bin/env python3
+"""
+Context Module Optimization Pipeline
+
+ContextOptimizer and ContextEvaluator, used by optimize_context.py and the
+optimizer daemon. They live in their own module so Python caches their
+bytecode (optimize_context.py runs as __main__ and is recompiled on every
+invocation) and so CLI commands that neither optimize nor evaluate, such as
+list, feedback, identify and export, never import them.
+"""
+
+import os
+import sys
+import glob
+import logging
+import yaml
+import re
+import shutil
+import time
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import nullcontext
+from datetime import datetime
+from typing import List, Dict, Any, Optional, Tuple
+
+# Add the parent directory to the path to allow importing project modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lib.llm_cache import LLMResponseCache
+from lib.module_manifest import ModuleManifest
+from lib.token_counter import counter_for_model
+
+# libyaml's loader parses the configuration several times faster when available
+YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+# Guidelines sent with every block. The text, including its indentation, is
+# part of the LLM cache key, so changing it invalidates cached optimizations.
+OPTIMIZATION_GUIDELINES = """
+            Please optimize the provided AI context module content. Your task is to:
+            1. Maintain all essential technical information
+            2. Improve clarity and conciseness
+            3. Preserve the original structure and formatting
+            4. Ensure the module remains accurate and aligned with its original purpose
+            5. Format important technical terms in code formatting using backticks (`) where appropriate
+            6. Preserve any existing code examples and format them properly
+            7. Provide detailed and complete information, as this will be used by an AI to answer questions
+            8. Structure the content to make it easy to understand and navigate
+            """
+
+
+
+def load_dspy():
+    """
+    Import DSPy on first use.
+    
+    DSPy and its dependencies take seconds to import, so only commands that
+    call a model load it; list, feedback, identify, export and trace start
+    without it.
+    """
+    try:
+        import dspy
+    except ImportError:
+        print("Error: DSPy not found. Install with: pip install dspy-ai")
+        sys.exit(1)
+    return dspy
+
+
+@functools.lru_cache(maxsize=None)
+def _module_optimizer_class():
+    """Define the DSPy optimizer module once DSPy is loaded."""
+    dspy = load_dspy()
+    
+    class ModuleOptimizer(dspy.Module):
+        """DSPy module rewriting context content according to guidelines."""
+        
+        def __init__(self):
+            super().__init__()
+            self.optimizer = dspy.ChainOfThought(
+                dspy.Predict("optimized_content")
+            )
+        
+        def forward(self, content, guidelines):
+            return self.optimizer(
+                content=content,
+                guidelines=guidelines
+            )
+    
+    return ModuleOptimizer
+
+
+def create_module_optimizer():
+    """Create the DSPy module rewriting context content according to guidelines."""
+    return _module_optimizer_class()()
+
+
+class ContextOptimizer:
+    """Class for optimizing context modules using DSPy."""
+    
+    def __init__(self, config_path: str = "config/dsp_config.yaml", use_cache: bool = True):
+        """
+        Initialize the optimizer with the given configuration.
+        
+        Args:
+            config_path: Path to the DSP configuration file
+            use_cache: Whether to serve repeated block optimizations from the LLM response cache
+        """
+        from lib.retry import RetryPolicy
+        from lib.tracing import Tracer
+        from lib.lm_registry import LMRegistry
+        
+        self.config = self._load_config(config_path)
+        self.logger = logging.getLogger(__name__)
+        
+        # Set up directories
+        self.original_dir = self.config['paths']['original_modules_dir']
+        self.optimized_dir = self.config['paths']['optimized_modules_dir']
+        self.backup_dir = self.config['paths']['backup_modules_dir']
+        
+        # Create directories if they don't exist
+        for directory in [self.original_dir, self.optimized_dir, self.backup_dir]:
+            os.makedirs(directory, exist_ok=True)
+        
+        # Persistent cache of LLM responses keyed by request content
+        self.cache = LLMResponseCache.from_config(self.config) if use_cache else None
+        
+        # Serializes manifest updates from concurrent batches sharing this optimizer
+        self._manifest_lock = threading.Lock()
+        
+        # Backoff for modules requeued after transient provider errors
+        self.retry_policy = RetryPolicy.from_config(self.config)
+        
+        # Per-stage spans, exported to the feedback database when each trace finishes
+        self.tracer = Tracer.from_config(self.config)
+        
+        # Language models, built once per model configuration and reused
+        self.lm_registry = LMRegistry(self.config)
+        
+        # DSPy is loaded and configured with the default model on first use
+        self._dspy_configured = False
+    
+    def _load_config(self, config_path: str) -> Dict[str, Any]:
+        """Load the configuration file."""
+        try:
+            with open(config_path, 'r') as f:
+                return yaml.load(f, Loader=YAML_LOADER)
+        except Exception as e:
+            logging.error(f"Failed to load configuration from {config_path}: {str(e)}")
+            sys.exit(1)
+    
+    def _configure_dspy(self):
+        """Configure DSPy with the model from config, once per optimizer."""
+        if self._dspy_configured:
+            return
+        
+        default_model = self.config["models"]["default"]
+        
+        # Find the model configuration
+        model_config = None
+        for model in self.config["models"]["options"]:
+            if model["name"] == default_model:
+                model_config = model
+                break
+        
+        if not model_config:
+            self.logger.error(f"Model {default_model} not found in configuration")
+            sys.exit(1)
+        
+        # Every request goes through the provider's rate limits and the retry policy
+        provider = model_config.get("provider", "openai")
+        try:
+            lm = self.lm_registry.get_lm(provider, model_config)
+        except ValueError:
+            self.logger.error(f"Unsupported provider: {provider}")
+            sys.exit(1)
+        
+        load_dspy().settings.configure(lm=lm)
+        self._dspy_configured = True
+        self.logger.info(f"Configured DSPy with model: {model_config['name']}")
+    
+    def _get_model_config(self, model_name: str) -> Optional[Dict[str, Any]]:
+        """Find the configuration entry for a model name."""
+        for model in self.config["models"]["options"]:
+            if model["name"] == model_name:
+                return model
+        return None
+    
+    def list_modules(self) -> List[str]:
+        """List all available context modules."""
+        modules = []
+        module_files = glob.glob(os.path.join(self.original_dir, "*.md"))
+        
+        for file_path in module_files:
+            modules.append(os.path.basename(file_path))
+        
+        return sorted(modules)
+    
+    def _create_backup(self, module_path: str) -> str:
+        """Create a backup of the module before optimization."""
+        timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
+        filename = os.path.basename(module_path)
+        backup_filename = f"{os.path.splitext(filename)[0]}_{timestamp}{os.path.splitext(filename)[1]}"
+        backup_path = os.path.join(self.backup_dir, backup_filename)
+        
+        # Create directory if it doesn't exist
+        os.makedirs(self.backup_dir, exist_ok=True)
+        
+        # Copy the file
+        shutil.copy2(module_path, backup_path)
+        self.logger.info(f"Created backup at {backup_path}")
+        
+        return backup_path
+    
+    def _extract_module_content(self, module_path: str) -> str:
+        """Extract the content of a module from file."""
+        return self._read_module(module_path)[0]
+    
+    def _read_module(self, module_path: str) -> Tuple[str, str]:
+        """
+        Read a module once, returning its content and the manifest hash of
+        exactly those bytes.
+        """
+        try:
+            with open(module_path, 'rb') as f:
+                data = f.read()
+        except Exception as e:
+            self.logger.error(f"Failed to read module {module_path}: {str(e)}")
+            raise
+        
+        # Decode with the universal newline handling of text-mode reads
+        content = data.decode('utf-8').replace('\r\n', '\n').replace('\r', '\n')
+        return content, ModuleManifest.hash_bytes(data)
+    
+    def _extract_context_blocks(self, content: str) -> List[Dict[str, Any]]:
+        """Extract context blocks and their priorities from the module content."""
+        blocks = []
+        
+        # Get the patterns from config
+        separator = self.config['dsp']['module_settings']['context_separator']
+        priority_pattern = self.config['dsp']['module_settings']['priority_pattern']
+        context_pattern = self.config['dsp']['module_settings']['context_pattern']
+        
+        # Split the content by separator if present
+        if separator in content:
+            sections = content.split(separator)
+        else:
+            sections = [content]
+        
+        for section in sections:
+            # Extract priority if present
+            priority_match = re.search(priority_pattern, section)
+            priority = priority_match.group(1) if priority_match else "medium"
+            
+            # Extract context if present
+            context_match = re.search(context_pattern, section, re.DOTALL)
+            context = context_match.group(1).strip() if context_match else section.strip()
+            
+            blocks.append({
+                "priority": priority,
+                "content": context
+            })
+        
+        return blocks
+    
+    def optimize_module(self, module_name: str, target_model: Optional[str] = None,
+                        block_workers: Optional[int] = None,
+                        packed_blocks: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        """
+        Optimize a single context module using DSPy.
+        
+        Args:
+            module_name: Name of the module to optimize
+            target_model: Optional model to use for optimization (overrides config default)
+            block_workers: Number of context blocks to optimize concurrently (defaults to
+                dsp.module_settings.max_concurrent_blocks)
+            packed_blocks: Blocks already optimized by the batch's packed requests,
+                by cache key
+            
+        Returns:
+            Dictionary with optimization results
+        """
+        from lib.retry import is_retryable
+        
+        # Ensure .md extension
+        if not module_name.endswith('.md'):
+            module_name = f"{module_name}.md"
+        
+        # Construct paths
+        original_path = os.path.join(self.original_dir, module_name)
+        optimized_path = os.path.join(self.optimized_dir, module_name)
+        
+        # Check if module exists
+        if not os.path.exists(original_path):
+            error_msg = f"Module {module_name} not found in {self.original_dir}"
+            self.logger.error(error_msg)
+            return {"success": False, "error": error_msg}
+        
+        # Prepare result dictionary
+        result = {
+            "module_name": module_name,
+            "success": False,
+            "original_path": original_path,
+            "optimized_path": optimized_path,
+            "backup_path": None,
+            "error": None
+        }
+        timings: Dict[str, float] = {}
+        
+        with self.tracer.span("optimize_module", module=module_name) as module_span:
+            try:
+                self.logger.info(f"Optimizing module: {module_name}")
+                self._configure_dspy()
+                
+                # Create a backup
+                result["backup_path"] = self._create_backup(original_path)
+                
+                # Extract content
+                with self.tracer.span("read", path=original_path) as span:
+                    content, result["content_hash"] = self._read_module(original_path)
+                    span.set_attribute("bytes_read", os.path.getsize(original_path))
+                timings["read"] = span.elapsed
+                result["original_content"] = content
+                
+                # Count tokens with the target model's tokenizer
+                with self.tracer.span("count_tokens") as span:
+                    token_counter = counter_for_model(target_model or self.config["models"]["default"], self.config)
+                    result["original_tokens"] = token_counter.count(content)
+                    result["token_encoding"] = token_counter.encoding_name
+                    span.set_attributes(tokens=result["original_tokens"], encoding=token_counter.encoding_name)
+                timings["count_tokens"] = span.elapsed
+                
+                # Extract context blocks
+                with self.tracer.span("extract_blocks") as span:
+                    blocks = self._extract_context_blocks(content)
+                    span.set_attribute("blocks", len(blocks))
+                timings["extract_blocks"] = span.elapsed
+                result["context_blocks"] = len(blocks)
+                
+                # The target model is bound per request, so modules optimized
+                # concurrently can each use a different model
+                result["model"] = target_model or self.config["models"]["default"]
+                
+                # Initialize the optimizer
+                module_optimizer = create_module_optimizer()
+                optimization_guidelines = OPTIMIZATION_GUIDELINES
+                
+                # Process the blocks with DSPy
+                with self.tracer.span("optimize_blocks", model=result["model"]) as span:
+                    optimized_blocks = self._optimize_blocks(
+                        module_optimizer,
+                        blocks,
+                        optimization_guidelines,
+                        result["model"],
+                        block_workers,
+                        packed_blocks
+                    )
+                timings["optimize_blocks"] = span.elapsed
+                
+                # Reconstruct the optimized content
+                separator = self.config['dsp']['module_settings']['context_separator']
+                optimized_content = ""
+                for i, block in enumerate(optimized_blocks):
+                    if i > 0:
+                        optimized_content += f"\n{separator}\n"
+                    
+                    # Add priority if it was in the original
+                    if "priority" in block and block["priority"] != "medium":
+                        optimized_content += f"#priority: {block['priority']}\n\n"
+                    
+                    optimized_content += block["content"]
+                
+                result["optimized_content"] = optimized_content
+                with self.tracer.span("count_tokens") as span:
+                    result["optimized_tokens"] = token_counter.count(optimized_content)
+                    span.set_attributes(tokens=result["optimized_tokens"], encoding=token_counter.encoding_name)
+                timings["count_tokens"] += span.elapsed
+                
+                # Calculate token reduction
+                original_tokens = result["original_tokens"]
+                optimized_tokens = result["optimized_tokens"]
+                token_reduction = ((original_tokens - optimized_tokens) / original_tokens) * 100 if original_tokens > 0 else 0
+                result["token_reduction"] = round(token_reduction, 2)
+                
+                # Save optimized content
+                with self.tracer.span("write", path=optimized_path) as span:
+                    os.makedirs(os.path.dirname(optimized_path), exist_ok=True)
+                    with open(optimized_path, 'w', encoding='utf-8') as f:
+                        f.write(optimized_content)
+                    span.set_attribute("bytes_written", os.path.getsize(optimized_path))
+                timings["write"] = span.elapsed
+                
+                # Generate diff
+                with self.tracer.span("diff") as span:
+                    result["diff"] = self.generate_diff(original_path, optimized_path)
+                    span.set_attribute("diff_lines", result["diff"].count("\n") + 1 if result["diff"] else 0)
+                timings["diff"] = span.elapsed
+                
+                # Run PromptFoo tests if enabled
+                if self.config.get("evaluation", {}).get("run_tests_after_optimize", False):
+                    self.logger.info(f"Running PromptFoo tests for module {module_name}")
+                    try:
+                        # Use the new CLI command for running tests
+                        module_base = os.path.splitext(module_name)[0]
+                        import subprocess
+                        
+                        # Run the test command using the new CLI integration
+                        cmd = ["dev", "context", "test", module_base]
+                        
+                        # Run the test
+                        with self.tracer.span("evaluation", backend="promptfoo") as span:
+                            process = subprocess.run(
+                                cmd,
+                                capture_output=True,
+                                text=True,
+                                check=False
+                            )
+                            span.set_attribute("returncode", process.returncode)
+                        timings["evaluation"] = span.elapsed
+                        
+                        # Store test results
+                        result["test_results"] = {
+                            "success": process.returncode == 0,
+                            "output": process.stdout,
+                            "error": process.stderr if process.returncode != 0 else None
+                        }
+                        
+                        if process.returncode == 0:
+                            self.logger.info(f"PromptFoo tests passed for module {module_name}")
+                        else:
+                            self.logger.warning(f"PromptFoo tests failed for module {module_name}")
+                    except Exception as e:
+                        self.logger.warning(f"Error running PromptFoo tests: {str(e)}")
+                        result["test_results"] = {
+                            "success": False,
+                            "error": str(e)
+                        }
+                
+                result["success"] = True
+                module_span.set_attribute("token_reduction", result["token_reduction"])
+                self.logger.info(f"Successfully optimized module {module_name}")
+                self.logger.info(f"Token reduction: {token_reduction:.2f}%")
+                
+            except Exception as e:
+                error_msg = f"Error optimizing module {module_name}: {str(e)}"
+                self.logger.error(error_msg)
+                result["error"] = error_msg
+                # Transient provider failures that outlasted the request retries
+                result["retryable"] = is_retryable(e)
+                module_span.record_error(e)
+        
+        # Seconds spent in each stage, plus the whole module
+        timings["total"] = module_span.elapsed
+        result["timings"] = {stage: round(seconds, 4) for stage, seconds in timings.items()}
+        result["trace_id"] = module_span.trace_id
+        
+        return result
+    
+    def _optimize_blocks(self, module_optimizer, blocks: List[Dict[str, Any]],
+                         guidelines: str, model_name: str,
+                         block_workers: Optional[int] = None,
+                         packed_blocks: Optional[Dict[str, str]] = None) -> List[Dict[str, Any]]:
+        """
+        Optimize context blocks, fanning out to a thread pool when allowed.
+        
+        Args:
+            module_optimizer: DSPy module used to optimize each block
+            blocks: Blocks extracted by _extract_context_blocks
+            guidelines: Optimization guidelines passed with every block
+            model_name: Model to optimize with, also part of the response cache key
+            block_workers: Maximum number of blocks optimized at once
+            packed_blocks: Blocks already optimized by packed requests, by cache key
+            
+        Returns:
+            Optimized blocks in their original order with priorities preserved
+        """
+        from lib.tracing import bind_current_span
+        
+        if block_workers is None:
+            block_workers = self.config['dsp']['module_settings'].get('max_concurrent_blocks', 1)
+        block_workers = max(1, min(block_workers, len(blocks) or 1))
+        temperature = (self._get_model_config(model_name) or {}).get("temperature")
+        lm = self._get_lm(model_name)
+        
+        def optimize_block(index: int) -> Dict[str, Any]:
+            content = blocks[index]["content"]
+            
+            cache_key = None
+            if self.cache or packed_blocks:
+                cache_key = LLMResponseCache.make_key(content, None, model_name, temperature, guidelines)
+            
+            packed_content = packed_blocks.get(cache_key) if packed_blocks and cache_key else None
+            if packed_content is not None:
+                self.logger.info(f"Block {index+1}/{len(blocks)} optimized in a packed request")
+                return {
+                    "priority": blocks[index]["priority"],
+                    "content": packed_content
+                }
+            
+            if self.cache:
+                with self.tracer.span("cache_lookup", block=index) as span:
+                    cached_content = self.cache.get(cache_key)
+                    span.set_attribute("hit", cached_content is not None)
+                if cached_content is not None:
+                    self.logger.info(f"Block {index+1}/{len(blocks)} served from cache")
+                    return {
+                        "priority": blocks[index]["priority"],
+                        "content": cached_content
+                    }
+            
+            self.logger.info(f"Optimizing block {index+1}/{len(blocks)}")
+            
+            with self.tracer.span("llm_call", block=index, model=model_name, input_chars=len(content)) as span, \
+                    self._bind_lm(lm):
+                response = module_optimizer(
+                    content=content,
+                    guidelines=guidelines
+                )
+                span.set_attribute("output_chars", len(response.optimized_content))
+            
+            if self.cache:
+                self.cache.set(cache_key, response.optimized_content)
+            
+            return {
+                "priority": blocks[index]["priority"],
+                "content": response.optimized_content
+            }
+        
+        if block_workers == 1:
+            return [optimize_block(i) for i in range(len(blocks))]
+        
+        # executor.map yields results in submission order, so the module is
+        # reassembled exactly as it was split
+        with ThreadPoolExecutor(max_workers=block_workers, thread_name_prefix="block") as executor:
+            return list(executor.map(bind_current_span(optimize_block), range(len(blocks))))
+    
+    def _pack_blocks(self, modules: List[str], target_model: Optional[str], workers: int,
+                     packed_blocks: Dict[str, str]) -> Dict[str, Any]:
+        """
+        Optimize small blocks from many modules in shared, packed requests.
+        
+        Uncached blocks within the token budget are bin-packed into requests
+        of at most `dsp.lm_config.packing.max_tokens` tokens, drawn from at most
+        `dsp.lm_config.modules_per_batch` modules. Each response is split back
+        into blocks and added to `packed_blocks`, which the per-module
+        optimization of this batch then uses like cache hits. They are not
+        written to the persistent cache: they were produced with the packing
+        instructions, which the cache key of an individually optimized block
+        does not include. Blocks missing from a response, and blocks too large
+        to pack, are optimized on their own as usual.
+        
+        Args:
+            modules: Module names in the batch
+            target_model: Optional model to use instead of the default
+            workers: Number of packed requests sent concurrently
+            packed_blocks: Receives the optimized blocks, by cache key
+            
+        Returns:
+            Packing statistics
+        """
+        from lib.tracing import bind_current_span
+        from lib.packing import PACKING_INSTRUCTIONS, pack_items, format_packed_request, split_packed_response
+        
+        lm_config = self.config.get("dsp", {}).get("lm_config", {})
+        budget = (lm_config.get("packing", {}) or {}).get("max_tokens", 2000)
+        max_modules = max(1, lm_config.get("modules_per_batch", 10))
+        model_name = target_model or self.config["models"]["default"]
+        temperature = (self._get_model_config(model_name) or {}).get("temperature")
+        token_counter = counter_for_model(model_name, self.config)
+        
+        # One candidate per distinct uncached block small enough to share a request
+        candidates: Dict[str, Dict[str, Any]] = {}
+        for module_name in modules:
+            module_path = os.path.join(self.original_dir, module_name)
+            if not os.path.exists(module_path):
+                continue
+            
+            for block in self._extract_context_blocks(self._extract_module_content(module_path)):
+                key = LLMResponseCache.make_key(block["content"], None, model_name, temperature,
+                                                OPTIMIZATION_GUIDELINES)
+                if key in candidates or (self.cache and self.cache.contains(key)):
+                    continue
+                
+                tokens = token_counter.count(block["content"])
+                if tokens <= budget:
+                    candidates[key] = {"key": key, "module": module_name,
+                                       "content": block["content"], "tokens": tokens}
+        
+        # A pack of one is no cheaper than the regular request
+        packs = [
+            pack for pack in pack_items(list(candidates.values()), lambda c: c["tokens"],
+                                        lambda c: c["module"], budget, max_modules)
+            if len(pack) > 1
+        ]
+        stats = {"requests": len(packs), "blocks": sum(len(pack) for pack in packs), "unpacked": 0}
+        if not packs:
+            return stats
+        
+        module_optimizer = create_module_optimizer()
+        guidelines = OPTIMIZATION_GUIDELINES + PACKING_INSTRUCTIONS
+        lm = self._get_lm(model_name)
+        
+        def run_pack(pack: List[Dict[str, Any]]) -> int:
+            block_ids = [str(i) for i in range(len(pack))]
+            request = format_packed_request(list(zip(block_ids, (c["content"] for c in pack))))
+            
+            try:
+                with self.tracer.span("llm_call", model=model_name, packed=True, blocks=len(pack),
+                                      modules=len({c["module"] for c in pack}), input_chars=len(request)) as span, \
+                        self._bind_lm(lm):
+                    response = module_optimizer(content=request, guidelines=guidelines)
+                    span.set_attribute("output_chars", len(response.optimized_content))
+            except Exception as e:
+                self.logger.warning(f"Packed request for {len(pack)} blocks failed, "
+                                    f"optimizing them individually: {str(e)}")
+                return len(pack)
+            
+            optimized = split_packed_response(response.optimized_content, block_ids)
+            for block_id, candidate in zip(block_ids, pack):
+                if block_id in optimized:
+                    packed_blocks[candidate["key"]] = optimized[block_id]
+            
+            return len(pack) - len(optimized)
+        
+        with self.tracer.span("pack_blocks", requests=len(packs), blocks=stats["blocks"]):
+            with ThreadPoolExecutor(max_workers=max(1, min(workers, len(packs))),
+                                    thread_name_prefix="pack") as executor:
+                stats["unpacked"] = sum(executor.map(bind_current_span(run_pack), packs))
+        
+        self.logger.info(f"Packed {stats['blocks']} blocks into {stats['requests']} requests "
+                         f"({stats['unpacked']} left for individual requests)")
+        return stats
+    
+    def _get_lm(self, model_name: str) -> Optional[Any]:
+        """
+        Get the shared language model for a configured model name.
+        
+        Args:
+            model_name: Name of the model in `models.options`
+            
+        Returns:
+            The model, or None to fall back to the default model when the name
+            or its provider is unknown
+        """
+        model_config = self._get_model_config(model_name)
+        if not model_config:
+            self.logger.warning(f"Model {model_name} not found in configuration, using default")
+            return None
+        
+        provider = model_config.get("provider", "openai")
+        try:
+            return self.lm_registry.get_lm(provider, model_config)
+        except ValueError:
+            self.logger.warning(f"Unsupported provider {provider} for model {model_name}, using default")
+            return None
+    
+    def _bind_lm(self, lm: Optional[Any]):
+        """
+        Bind a model to DSPy calls made in the current thread.
+        
+        Unlike dspy.settings.configure, the binding is local to the thread and
+        the with-block, so concurrent requests can use different models. It
+        has to be entered in the thread making the request, since worker
+        threads don't inherit it.
+        
+        Args:
+            lm: Model from _get_lm; None keeps the default model
+            
+        Returns:
+            Context manager for the binding
+        """
+        return load_dspy().settings.context(lm=lm) if lm is not None else nullcontext()
+    
+    def generate_diff(self, original_path: str, optimized_path: str) -> str:
+        """Generate a unified diff between original and optimized files."""
+        import difflib
+        
+        with open(original_path, 'r', encoding='utf-8') as f:
+            original_lines = f.readlines()
+        
+        with open(optimized_path, 'r', encoding='utf-8') as f:
+            optimized_lines = f.readlines()
+        
+        diff = difflib.unified_diff(
+            original_lines,
+            optimized_lines,
+            fromfile=f"Original: {os.path.basename(original_path)}",
+            tofile=f"Optimized: {os.path.basename(optimized_path)}",
+            lineterm=''
+        )
+        
+        return '\n'.join(diff)
+
+    def batch_optimize(self, modules: Optional[List[str]] = None, 
+                     max_modules: int = 10, 
+                     target_model: Optional[str] = None,
+                     workers: Optional[int] = None,
+                     block_workers: Optional[int] = None,
+                     changed_only: bool = False,
+                     pack: Optional[bool] = None) -> Dict[str, Any]:
+        """
+        Optimize multiple modules in batch mode.
+        
+        Args:
+            modules: List of module names to optimize (if None, all modules are considered)
+            max_modules: Maximum number of modules to optimize
+            target_model: Optional model to use for optimization
+            workers: Number of modules to optimize concurrently (defaults to
+                dsp.lm_config.max_workers, or 1 for sequential processing)
+            block_workers: Number of blocks to optimize concurrently within each module
+            changed_only: Skip modules whose source has not changed since their last
+                successful optimization with the same model
+            pack: Send small blocks from several modules in shared requests (defaults
+                to dsp.lm_config.packing.enabled)
+            
+        Returns:
+            Dictionary with batch optimization results
+        """
+        if modules is None:
+            # Get all available modules
+            modules = self.list_modules()
+        else:
+            # Ensure all modules have .md extension
+            modules = [m if m.endswith('.md') else f"{m}.md" for m in modules]
+        
+        model_name = target_model or self.config["models"]["default"]
+        manifest = ModuleManifest.from_config(self.config)
+        skipped = 0
+        
+        if changed_only:
+            module_paths = {m: os.path.join(self.original_dir, m) for m in modules}
+            changed = [
+                m for m in modules
+                if not os.path.exists(module_paths[m])
+                or manifest.needs_optimization(module_paths[m], model_name)
+            ]
+            skipped = len(modules) - len(changed)
+            modules = changed
+            self.logger.info(f"Skipping {skipped} unchanged module(s)")
+        
+        # Limit to max_modules
+        modules = modules[:max_modules]
+        
+        if workers is None:
+            workers = self.config.get("dsp", {}).get("lm_config", {}).get("max_workers", 1)
+        workers = max(1, min(workers, len(modules) or 1))
+        
+        self.logger.info(f"Starting batch optimization of {len(modules)} modules with {workers} worker(s)")
+        
+        results = {
+            "timestamp": datetime.now().isoformat(),
+            "target_model": model_name,
+            "total_modules": len(modules),
+            "skipped_unchanged": skipped,
+            "successful": 0,
+            "failed": 0,
+            "modules": []
+        }
+        
+        retry_rounds = self.config.get("dsp", {}).get("compiler_options", {}).get("max_retries", 0)
+        if pack is None:
+            pack = (self.config.get("dsp", {}).get("lm_config", {}).get("packing", {}) or {}).get("enabled", False)
+        
+        # Set up DSPy here rather than in the first worker thread to use it
+        self._configure_dspy()
+        
+        # Blocks optimized by this batch's packed requests, by cache key
+        packed_blocks: Dict[str, str] = {}
+        
+        with self.tracer.span("batch_optimize", model=model_name, modules=len(modules), workers=workers) as batch_span:
+            if pack and modules:
+                results["packing"] = self._pack_blocks(modules, target_model, workers, packed_blocks)
+            
+            module_results = self._optimize_modules(modules, target_model, workers, block_workers, packed_blocks)
+            
+            # Requeue modules that failed on transient provider errors, backing
+            # off between rounds so a rate limited provider can recover
+            for retry_round in range(1, retry_rounds + 1):
+                retry_indices = [i for i, r in enumerate(module_results)
+                                 if not r["success"] and r.get("retryable")]
+                if not retry_indices:
+                    break
+                
+                delay = self.retry_policy.backoff(retry_round)
+                self.logger.info(f"Retrying {len(retry_indices)} module(s) after transient errors in {delay:.1f}s "
+                                 f"(round {retry_round}/{retry_rounds})")
+                time.sleep(delay)
+                
+                retried = self._optimize_modules([modules[i] for i in retry_indices], target_model,
+                                                 min(workers, len(retry_indices)), block_workers, packed_blocks)
+                for index, result in zip(retry_indices, retried):
+                    result["batch_retries"] = retry_round
+                    module_results[index] = result
+        
+        # Wall time of the batch and time summed over modules for each stage
+        stage_seconds: Dict[str, float] = {}
+        for result in module_results:
+            for stage, seconds in result.get("timings", {}).items():
+                if stage != "total":
+                    stage_seconds[stage] = round(stage_seconds.get(stage, 0) + seconds, 4)
+        results["trace_id"] = batch_span.trace_id
+        results["timings"] = {"total": round(batch_span.elapsed, 4), "stages": stage_seconds}
+        
+        for result in module_results:
+            results["modules"].append(result)
+            
+            if result["success"]:
+                results["successful"] += 1
+            else:
+                results["failed"] += 1
+        
+        if results["successful"] > 0:
+            # Reload the manifest under the lock so records saved by concurrent
+            # batches since this one started are kept
+            with self._manifest_lock:
+                manifest = ModuleManifest.from_config(self.config)
+                for result in module_results:
+                    if result["success"]:
+                        # Record the content that was optimized, not the file as it is now
+                        manifest.record_optimization(result["original_path"], model_name,
+                                                     content_hash=result.get("content_hash"))
+                manifest.save()
+        
+        # Calculate average token reduction for successful optimizations
+        successful_modules = [m for m in results["modules"] if m["success"]]
+        if successful_modules:
+            total_reduction = sum(m["token_reduction"] for m in successful_modules)
+            avg_reduction = total_reduction / len(successful_modules)
+            results["average_token_reduction"] = round(avg_reduction, 2)
+        else:
+            results["average_token_reduction"] = 0
+        
+        if self.cache:
+            results["cache"] = self.cache.stats()
+        
+        self.logger.info(f"Batch optimization completed: {results['successful']} successful, {results['failed']} failed")
+        if results["successful"] > 0:
+            self.logger.info(f"Average token reduction: {results.get('average_token_reduction', 0):.2f}%")
+        
+        return results
+    
+    def _optimize_modules(self, modules: List[str],
+                          target_model: Optional[str],
+                          workers: int,
+                          block_workers: Optional[int] = None,
+                          packed_blocks: Optional[Dict[str, str]] = None) -> List[Dict[str, Any]]:
+        """Optimize modules one by one, or on a thread pool when workers > 1."""
+        if workers > 1:
+            return self._optimize_concurrently(modules, target_model, workers, block_workers, packed_blocks)
+        
+        module_results = []
+        for module_name in modules:
+            self.logger.info(f"Processing module: {module_name}")
+            module_results.append(self.optimize_module(module_name, target_model, block_workers, packed_blocks))
+        return module_results
+    
+    def _optimize_concurrently(self, modules: List[str], 
+                               target_model: Optional[str], 
+                               workers: int,
+                               block_workers: Optional[int] = None,
+                               packed_blocks: Optional[Dict[str, str]] = None) -> List[Dict[str, Any]]:
+        """
+        Optimize modules on a bounded thread pool.
+        
+        Returns:
+            Module results in the same order as the input list
+        """
+        from lib.tracing import bind_current_span
+        
+        module_results: List[Optional[Dict[str, Any]]] = [None] * len(modules)
+        
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="optimize") as executor:
+            futures = {
+                executor.submit(bind_current_span(self.optimize_module), module_name, target_model,
+                                block_workers, packed_blocks): index
+                for index, module_name in enumerate(modules)
+            }
+            
+            for future in as_completed(futures):
+                index = futures[future]
+                module_name = modules[index]
+                
+                try:
+                    result = future.result()
+                except Exception as e:
+                    error_msg = f"Error optimizing module {module_name}: {str(e)}"
+                    self.logger.error(error_msg)
+                    result = {"module_name": module_name, "success": False, "error": error_msg}
+                
+                module_results[index] = result
+                self.logger.info(f"Finished module {module_name} "
+                                 f"({'success' if result['success'] else 'failed'})")
+        
+        return module_results
+
+class ContextEvaluator:
+    """Class for evaluating the quality of optimized context modules."""
+    
+    def __init__(self, config_path: str = "config/dsp_config.yaml"):
+        """Initialize the evaluator with the given configuration."""
+        import tempfile
+        
+        self.optimizer = ContextOptimizer(config_path)
+        self.config = self.optimizer.config
+        self.logger = logging.getLogger(__name__)
+        
+        # Set up temporary directory for evaluations
+        self.temp_dir = tempfile.mkdtemp(prefix="context_eval_")
+        self.logger.info(f"Created temporary directory for evaluations: {self.temp_dir}")
+    
+    def __del__(self):
+        """Clean up temporary files when done."""
+        if hasattr(self, 'temp_dir') and os.path.exists(self.temp_dir):
+            shutil.rmtree(self.temp_dir)
+            self.logger.info(f"Removed temporary directory: {self.temp_dir}")
+    
+    def create_evaluation_config(self, 
+                                original_path: str, 
+                                optimized_path: str, 
+                                test_cases: List[Dict[str, str]],
+                                output_path: str) -> str:
+        """
+        Create a PromptFoo evaluation configuration.
+        
+        Args:
+            original_path: Path to the original module
+            optimized_path: Path to the optimized module
+            test_cases: List of test cases for evaluation
+            output_path: Path to save evaluation results
+            
+        Returns:
+            Path to the created configuration file
+        """
+        import tempfile
+        
+        # A unique path per call, since the daemon evaluates modules concurrently
+        module_name = os.path.basename(original_path)
+        fd, config_path = tempfile.mkstemp(prefix=f"{os.path.splitext(module_name)[0]}_eval_config_",
+                                           suffix=".yaml", dir=self.temp_dir)
+        os.close(fd)
+        
+        # Read the module contents
+        with open(original_path, 'r', encoding='utf-8') as f:
+            original_content = f.read()
+        
+        with open(optimized_path, 'r', encoding='utf-8') as f:
+            optimized_content = f.read()
+        
+        # Create PromptFoo configuration
+        config = {
+            "prompts": [
+                {
+                    "name": "Original Module",
+                    "prompt": "{{prompt}}\n\nContext:\n{{context_original}}",
+                    "models": ["openai:gpt-4"]
+                },
+                {
+                    "name": "Optimized Module",
+                    "prompt": "{{prompt}}\n\nContext:\n{{context_optimized}}",
+                    "models": ["openai:gpt-4"]
+                }
+            ],
+            "providers": [
+                {
+                    "id": "openai",
+                    "config": {
+                        "apiKey": "env:OPENAI_API_KEY"
+                    }
+                }
+            ],
+            "tests": test_cases,
+            "outputPath": output_path,
+            "vars": {
+                "context_original": original_content,
+                "context_optimized": optimized_content
+            }
+        }
+        
+        # Write config to file
+        with open(config_path, 'w') as f:
+            yaml.dump(config, f)
+        
+        return config_path
+    
+    def generate_test_cases(self, module_content: str, max_cases: int = 5) -> List[Dict[str, str]]:
+        """
+        Generate test cases based on module content.
+        
+        Args:
+            module_content: Content of the module
+            max_cases: Maximum number of test cases to generate
+            
+        Returns:
+            List of test cases
+        """
+        # Extract key technical terms from content
+        key_terms = self._extract_key_terms(module_content)
+        
+        # Get test prompts from config
+        test_prompts = self.config["evaluation"]["test_prompts"]
+        
+        # Create test cases
+        test_cases = []
+        
+        # If we have key terms, create test cases for each
+        if key_terms:
+            for term in key_terms[:max_cases]:
+                prompt_template = test_prompts[len(test_cases) % len(test_prompts)]
+                prompt = prompt_template.replace("{subject}", term)
+                
+                test_case = {
+                    "vars": {
+                        "prompt": prompt
+                    },
+                    "assert": [
+                        {
+                            "type": "contains",
+                            "value": term
+                        },
+                        {
+                            "type": "similar",
+                            "threshold": 0.7
+                        }
+                    ]
+                }
+                test_cases.append(test_case)
+                
+                if len(test_cases) >= max_cases:
+                    break
+        
+        # If we couldn't create enough test cases, add generic ones
+        while len(test_cases) < max_cases:
+            idx = len(test_cases) % len(test_prompts)
+            generic_prompt = test_prompts[idx].replace("{subject}", "this topic")
+            
+            test_case = {
+                "vars": {
+                    "prompt": generic_prompt
+                },
+                "assert": [
+                    {
+                        "type": "similar",
+                        "threshold": 0.7
+                    }
+                ]
+            }
+            test_cases.append(test_case)
+        
+        return test_cases
+    
+    def _extract_key_terms(self, content: str) -> List[str]:
+        """Extract key technical terms from the module content."""
+        # Use a simple heuristic: look for terms in headings and code blocks
+        terms = []
+        
+        # Extract headings (###, ##)
+        heading_pattern = r'(?:^|\n)#{2,3}\s+([A-Za-z0-9\s_\-]+)'
+        headings = re.findall(heading_pattern, content)
+        terms.extend([h.strip() for h in headings if len(h.strip()) > 3])
+        
+        # Extract terms from code blocks (terms in backticks)
+        code_pattern = r'`([^`]+)`'
+        code_terms = re.findall(code_pattern, content)
+        terms.extend([t.strip() for t in code_terms if len(t.strip()) > 3])
+        
+        # Extract capitalized multi-word terms (likely technical terms)
+        cap_pattern = r'\b([A-Z][a-z]+(?:\s+[A-Z][a-z]+)+)\b'
+        cap_terms = re.findall(cap_pattern, content)
+        terms.extend([t.strip() for t in cap_terms if len(t.strip()) > 3])
+        
+        # Remove duplicates and limit to reasonable terms
+        unique_terms = list(set(terms))
+        return [t for t in unique_terms if 3 < len(t) < 30]
+    
+    def run_evaluation(self, config_path: str) -> Dict[str, Any]:
+        """
+        Run evaluation using PromptFoo.
+        
+        Args:
+            config_path: Path to PromptFoo configuration
+            
+        Returns:
+            Dictionary with evaluation results
+        """
+        import subprocess
+        import json
+        import tempfile
+        
+        # A unique path per call, so concurrent evaluations don't read each other's results
+        fd, output_path = tempfile.mkstemp(prefix="evaluation_results_", suffix=".json", dir=self.temp_dir)
+        os.close(fd)
+        
+        # Prepare the command
+        cmd = [
+            "npx", 
+            "promptfoo", 
+            "eval", 
+            "-c", config_path,
+            "--output", output_path,
+            "--format", "json"
+        ]
+        
+        self.logger.info("Running evaluation with promptfoo")
+        
+        try:
+            # Run the command
+            subprocess.run(
+                cmd, 
+                check=True, 
+                stdout=subprocess.PIPE, 
+                stderr=subprocess.PIPE
+            )
+            
+            # Read the results
+            with open(output_path, 'r') as f:
+                results = json.load(f)
+            
+            # Process the results to calculate scores
+            original_scores = []
+            optimized_scores = []
+            
+            for test in results.get("results", []):
+                for output in test.get("outputs", []):
+                    # Check if this is from the original or optimized prompt
+                    prompt_name = output.get("prompt", {}).get("name", "")
+                    
+                    # Calculate score based on passing assertions
+                    total_assertions = len(output.get("assertions", []))
+                    passed_assertions = sum(1 for a in output.get("assertions", []) if a.get("passed", False))
+                    score = passed_assertions / total_assertions if total_assertions > 0 else 0
+                    
+                    if "Original" in prompt_name:
+                        original_scores.append(score)
+                    elif "Optimized" in prompt_name:
+                        optimized_scores.append(score)
+            
+            # Calculate average scores
+            avg_original = sum(original_scores) / len(original_scores) if original_scores else 0
+            avg_optimized = sum(optimized_scores) / len(optimized_scores) if optimized_scores else 0
+            
+            # Calculate improvement percentage
+            improvement = ((avg_optimized - avg_original) / avg_original) * 100 if avg_original > 0 else 0
+            
+            return {
+                "original_score": round(avg_original, 2),
+                "optimized_score": round(avg_optimized, 2),
+                "improvement": round(improvement, 2),
+                "raw_results": results
+            }
+            
+        except subprocess.CalledProcessError as e:
+            self.logger.error(f"Error running evaluation: {e}")
+            return {
+                "error": f"Evaluation failed: {str(e)}",
+                "original_score": 0,
+                "optimized_score": 0,
+                "improvement": 0
+            }
+        except Exception as e:
+            self.logger.error(f"Error processing evaluation results: {e}")
+            return {
+                "error": f"Error processing evaluation: {str(e)}",
+                "original_score": 0,
+                "optimized_score": 0,
+                "improvement": 0
+            }
+        finally:
+            # Results are returned in raw_results; the daemon's temp dir would otherwise grow
+            if os.path.exists(output_path):
+                os.remove(output_path)
+    
+    def evaluate_module(self, module_name: str) -> Dict[str, Any]:
+        """
+        Evaluate a single module's optimization quality.
+        
+        Args:
+            module_name: Name of the module to evaluate
+            
+        Returns:
+            Dictionary with evaluation results
+        """
+        # Ensure .md extension
+        if not module_name.endswith('.md'):
+            module_name = f"{module_name}.md"
+        
+        # Construct paths
+        original_path = os.path.join(self.optimizer.original_dir, module_name)
+        optimized_path = os.path.join(self.optimizer.optimized_dir, module_name)
+        
+        # Check if files exist
+        if not os.path.exists(original_path):
+            error_msg = f"Original module {module_name} not found"
+            self.logger.error(error_msg)
+            return {"success": False, "error": error_msg, "module_name": module_name}
+        
+        if not os.path.exists(optimized_path):
+            error_msg = f"Optimized module {module_name} not found"
+            self.logger.error(error_msg)
+            return {"success": False, "error": error_msg, "module_name": module_name}
+        
+        result = {
+            "module_name": module_name,
+            "success": False,
+            "original_path": original_path,
+            "optimized_path": optimized_path,
+            "error": None
+        }
+        
+        try:
+            self.logger.info(f"Evaluating module: {module_name}")
+            
+            # Read module content
+            with open(original_path, 'r', encoding='utf-8') as f:
+                original_content = f.read()
+            
+            # Generate test cases
+            max_cases = self.config["evaluation"]["promptfoo"]["vars"]["max_test_cases"]
+            test_cases = self.generate_test_cases(original_content, max_cases)
+            
+            # Create evaluation configuration
+            output_path = os.path.join(self.temp_dir, f"{os.path.splitext(module_name)[0]}_results.json")
+            config_path = self.create_evaluation_config(
+                original_path,
+                optimized_path,
+                test_cases,
+                output_path
+            )
+            
+            # Run evaluation
+            with self.optimizer.tracer.span("evaluation", module=module_name, backend="promptfoo",
+                                            test_cases=len(test_cases)):
+                eval_results = self.run_evaluation(config_path)
+            
+            # Merge results
+            result.update(eval_results)
+            
+            # Set success flag
+            result["success"] = "error" not in eval_results
+            
+            if result["success"]:
+                self.logger.info(f"Evaluation completed: original score={result['original_score']}, " + 
+                                f"optimized score={result['optimized_score']}, " + 
+                                f"improvement={result['improvement']}%")
+            
+        except Exception as e:
+            error_msg = f"Error evaluating module {module_name}: {str(e)}"
+            self.logger.error(error_msg)
+            result["error"] = error_msg
+        
+        return result
+    
+    def batch_evaluate(self, modules: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Evaluate multiple modules in batch mode.
+        
+        Args:
+            modules: List of module names to evaluate (if None, all optimized modules are considered)
+            
+        Returns:
+            Dictionary with batch evaluation results
+        """
+        # If no modules specified, find all modules that have both original and optimized versions
+        if modules is None:
+            optimized_modules = [os.path.basename(f) for f in 
+                                glob.glob(os.path.join(self.optimizer.optimized_dir, "*.md"))]
+            
+            modules = []
+            for module in optimized_modules:
+                original_path = os.path.join(self.optimizer.original_dir, module)
+                if os.path.exists(original_path):
+                    modules.append(module)
+        else:
+            # Ensure all modules have .md extension
+            modules = [m if m.endswith('.md') else f"{m}.md" for m in modules]
+        
+        self.logger.info(f"Starting batch evaluation of {len(modules)} modules")
+        
+        results = {
+            "timestamp": datetime.now().isoformat(),
+            "total_evaluations": len(modules),
+            "successful_evaluations": 0,
+            "failed_evaluations": 0,
+            "improved_count": 0,
+            "regressed_count": 0,
+            "unchanged_count": 0,
+            "average_improvement": 0,
+            "improved_modules": [],
+            "regressed_modules": [],
+            "unchanged_modules": [],
+            "failed_modules": []
+        }
+        
+        for module_name in modules:
+            self.logger.info(f"Evaluating module: {module_name}")
+            
+            result = self.evaluate_module(module_name)
+            
+            if result["success"]:
+                results["successful_evaluations"] += 1
+                
+                # Categorize based on improvement
+                improvement = result.get("improvement", 0)
+                if improvement > 1:  # More than 1% improvement
+                    results["improved_count"] += 1
+                    results["improved_modules"].append(result)
+                elif improvement < -1:  # More than 1% regression
+                    results["regressed_count"] += 1
+                    results["regressed_modules"].append(result)
+                else:  # Roughly the same
+                    results["unchanged_count"] += 1
+                    results["unchanged_modules"].append(result)
+            else:
+                results["failed_evaluations"] += 1
+                results["failed_modules"].append(result)
+        
+        # Calculate average improvement for successful evaluations
+        successful_modules = results["improved_modules"] + results["regressed_modules"] + results["unchanged_modules"]
+        if successful_modules:
+            total_improvement = sum(m.get("improvement", 0) for m in successful_modules)
+            avg_improvement = total_improvement / len(successful_modules)
+            results["average_improvement"] = round(avg_improvement, 2)
+        
+        self.logger.info(f"Batch evaluation completed:")
+        self.logger.info(f"  - Total: {results['total_evaluations']}")
+        self.logger.info(f"  - Successful: {results['successful_evaluations']}")
+        self.logger.info(f"  - Improved: {results['improved_count']}")
+        self.logger.info(f"  - Regressed: {results['regressed_count']}")
+        self.logger.info(f"  - Unchanged: {results['unchanged_count']}")
+        self.logger.info(f"  - Average improvement: {results['average_improvement']:.2f}%")
+        
+        return results
@@ -19,6 +19,7 @@ from typing import List, Dict, Any, Optional
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 # Import project modules
+from lib.module_registry import get_registry
 from dsp_implementation_plan import ContextEvaluator
 
 def setup_logging(log_level: str = "INFO", log_file: Optional[str] = None) -> logging.Logger:
@@ -81,43 +82,42 @@ def get_modules_to_evaluate(
         List of dictionaries with original and optimized module paths
     """
     logger = logging.getLogger(__name__)
+    originals = get_registry(modules_dir, exclude_dirs=())
+    optimized = get_registry(optimized_dir, exclude_dirs=())
     
     modules_to_evaluate = []
     
     if module_names:
         # Evaluate specific modules
         for name in module_names:
-            original_path = os.path.join(modules_dir, f"{name}.md")
-            optimized_path = os.path.join(optimized_dir, f"{name}.md")
+            original_path = originals.resolve(name)
+            optimized_path = optimized.resolve(name)
             
-            if os.path.exists(original_path) and os.path.exists(optimized_path):
+            if original_path and optimized_path:
                 modules_to_evaluate.append({
                     "name": name,
-                    "original_path": original_path,
-                    "optimized_path": optimized_path
+                    "original_path": str(original_path),
+                    "optimized_path": str(optimized_path)
                 })
             else:
-                if not os.path.exists(original_path):
-                    logger.warning(f"Original module not found: {original_path}")
-                if not os.path.exists(optimized_path):
-                    logger.warning(f"Optimized module not found: {optimized_path}")
+                if not original_path:
+                    logger.warning(f"Original module not found: {os.path.join(modules_dir, f'{name}.md')}")
+                if not optimized_path:
+                    logger.warning(f"Optimized module not found: {os.path.join(optimized_dir, f'{name}.md')}")
     else:
         # Find all pairs of original and optimized modules
-        for root, _, files in os.walk(optimized_dir):
-            for file in files:
-                if file.endswith(".md"):
-                    name = file[:-3]  # Remove .md extension
-                    original_path = os.path.join(modules_dir, file)
-                    optimized_path = os.path.join(optimized_dir, file)
-                    
-                    if os.path.exists(original_path):
-                        modules_to_evaluate.append({
-                            "name": name,
-                            "original_path": original_path,
-                            "optimized_path": optimized_path
-                        })
-                    else:
-                        logger.warning(f"Original module not found for optimized module: {file}")
+        optimized.refresh()
+        for name in optimized.names():
+            original_path = originals.resolve(name)
+            
+            if original_path:
+                modules_to_evaluate.append({
+                    "name": name,
+                    "original_path": str(original_path),
+                    "optimized_path": str(optimized.resolve(name))
+                })
+            else:
+                logger.warning(f"Original module not found for optimized module: {name}.md")
     
     return modules_to_evaluate
 
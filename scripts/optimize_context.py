@@ -8,29 +8,25 @@ using DSPy for optimization and PromptFoo for evaluation.
 
 import os
 import sys
-import glob
 import logging
 import argparse
 import json
 import yaml
-import re
-import difflib
-import sqlite3
-import tempfile
-import shutil
+import time
+import threading
 from datetime import datetime
-from typing import List, Dict, Any, Optional, Tuple, Union
+from typing import List, Dict, Any, Optional
 import textwrap
 
 # Add the parent directory to the path to allow importing project modules
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-# Try importing DSPy
-try:
-    import dspy
-except ImportError:
-    print("Error: DSPy not found. Install with: pip install dspy-ai")
-    sys.exit(1)
+# Modules that only some commands need, including the feedback database and
+# ContextOptimizer and ContextEvaluator in context_pipeline.py, are imported
+# where they are used, so commands like `list` and `feedback` start quickly.
+
+# libyaml's loader parses the configuration several times faster when available
+YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
 
 # Logging setup
 def setup_logging(log_level: str = "INFO", log_file: Optional[str] = None) -> logging.Logger:
@@ -57,870 +53,11 @@ def load_config(config_path: str = "config/dsp_config.yaml") -> Dict[str, Any]:
     """Load DSP configuration from the specified YAML file."""
     try:
         with open(config_path, 'r') as f:
-            return yaml.safe_load(f)
+            return yaml.load(f, Loader=YAML_LOADER)
     except Exception as e:
         logging.error(f"Failed to load configuration from {config_path}: {str(e)}")
         sys.exit(1)
 
-class ContextOptimizer:
-    """Class for optimizing context modules using DSPy."""
-    
-    def __init__(self, config_path: str = "config/dsp_config.yaml"):
-        """Initialize the optimizer with the given configuration."""
-        self.config = self._load_config(config_path)
-        self.logger = logging.getLogger(__name__)
-        
-        # Set up directories
-        self.original_dir = self.config['paths']['original_modules_dir']
-        self.optimized_dir = self.config['paths']['optimized_modules_dir']
-        self.backup_dir = self.config['paths']['backup_modules_dir']
-        
-        # Create directories if they don't exist
-        for directory in [self.original_dir, self.optimized_dir, self.backup_dir]:
-            os.makedirs(directory, exist_ok=True)
-        
-        # Configure DSPy with the default model
-        self._configure_dspy()
-    
-    def _load_config(self, config_path: str) -> Dict[str, Any]:
-        """Load the configuration file."""
-        try:
-            with open(config_path, 'r') as f:
-                return yaml.safe_load(f)
-        except Exception as e:
-            logging.error(f"Failed to load configuration from {config_path}: {str(e)}")
-            sys.exit(1)
-    
-    def _configure_dspy(self):
-        """Configure DSPy with the model from config."""
-        default_model = self.config["models"]["default"]
-        
-        # Find the model configuration
-        model_config = None
-        for model in self.config["models"]["options"]:
-            if model["name"] == default_model:
-                model_config = model
-                break
-        
-        if not model_config:
-            self.logger.error(f"Model {default_model} not found in configuration")
-            sys.exit(1)
-        
-        # Configure DSPy based on the provider
-        provider = model_config.get("provider", "openai")
-        if provider == "openai":
-            dspy.settings.configure(
-                lm=dspy.OpenAI(
-                    model=model_config["name"],
-                    api_key=os.environ.get("OPENAI_API_KEY"),
-                    temperature=model_config.get("temperature", 0.2),
-                    max_tokens=model_config.get("max_tokens", 4096)
-                )
-            )
-        elif provider == "anthropic":
-            dspy.settings.configure(
-                lm=dspy.Anthropic(
-                    model=model_config["name"],
-                    api_key=os.environ.get("ANTHROPIC_API_KEY"),
-                    temperature=model_config.get("temperature", 0.2),
-                    max_tokens=model_config.get("max_tokens", 4096)
-                )
-            )
-        else:
-            self.logger.error(f"Unsupported provider: {provider}")
-            sys.exit(1)
-        
-        self.logger.info(f"Configured DSPy with model: {model_config['name']}")
-    
-    def list_modules(self) -> List[str]:
-        """List all available context modules."""
-        modules = []
-        module_files = glob.glob(os.path.join(self.original_dir, "*.md"))
-        
-        for file_path in module_files:
-            modules.append(os.path.basename(file_path))
-        
-        return sorted(modules)
-    
-    def _create_backup(self, module_path: str) -> str:
-        """Create a backup of the module before optimization."""
-        timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
-        filename = os.path.basename(module_path)
-        backup_filename = f"{os.path.splitext(filename)[0]}_{timestamp}{os.path.splitext(filename)[1]}"
-        backup_path = os.path.join(self.backup_dir, backup_filename)
-        
-        # Create directory if it doesn't exist
-        os.makedirs(self.backup_dir, exist_ok=True)
-        
-        # Copy the file
-        shutil.copy2(module_path, backup_path)
-        self.logger.info(f"Created backup at {backup_path}")
-        
-        return backup_path
-    
-    def _extract_module_content(self, module_path: str) -> str:
-        """Extract the content of a module from file."""
-        try:
-            with open(module_path, 'r', encoding='utf-8') as f:
-                return f.read()
-        except Exception as e:
-            self.logger.error(f"Failed to read module {module_path}: {str(e)}")
-            raise
-    
-    def _extract_context_blocks(self, content: str) -> List[Dict[str, Any]]:
-        """Extract context blocks and their priorities from the module content."""
-        blocks = []
-        
-        # Get the patterns from config
-        separator = self.config['dsp']['module_settings']['context_separator']
-        priority_pattern = self.config['dsp']['module_settings']['priority_pattern']
-        context_pattern = self.config['dsp']['module_settings']['context_pattern']
-        
-        # Split the content by separator if present
-        if separator in content:
-            sections = content.split(separator)
-        else:
-            sections = [content]
-        
-        for section in sections:
-            # Extract priority if present
-            priority_match = re.search(priority_pattern, section)
-            priority = priority_match.group(1) if priority_match else "medium"
-            
-            # Extract context if present
-            context_match = re.search(context_pattern, section, re.DOTALL)
-            context = context_match.group(1).strip() if context_match else section.strip()
-            
-            blocks.append({
-                "priority": priority,
-                "content": context
-            })
-        
-        return blocks
-    
-    def optimize_module(self, module_name: str, target_model: Optional[str] = None) -> Dict[str, Any]:
-        """
-        Optimize a single context module using DSPy.
-        
-        Args:
-            module_name: Name of the module to optimize
-            target_model: Optional model to use for optimization (overrides config default)
-            
-        Returns:
-            Dictionary with optimization results
-        """
-        # Ensure .md extension
-        if not module_name.endswith('.md'):
-            module_name = f"{module_name}.md"
-        
-        # Construct paths
-        original_path = os.path.join(self.original_dir, module_name)
-        optimized_path = os.path.join(self.optimized_dir, module_name)
-        
-        # Check if module exists
-        if not os.path.exists(original_path):
-            error_msg = f"Module {module_name} not found in {self.original_dir}"
-            self.logger.error(error_msg)
-            return {"success": False, "error": error_msg}
-        
-        # Prepare result dictionary
-        result = {
-            "module_name": module_name,
-            "success": False,
-            "original_path": original_path,
-            "optimized_path": optimized_path,
-            "backup_path": None,
-            "error": None
-        }
-        
-        try:
-            self.logger.info(f"Optimizing module: {module_name}")
-            
-            # Create a backup
-            result["backup_path"] = self._create_backup(original_path)
-            
-            # Extract content
-            content = self._extract_module_content(original_path)
-            result["original_content"] = content
-            result["original_tokens"] = len(content.split())
-            
-            # Extract context blocks
-            blocks = self._extract_context_blocks(content)
-            result["context_blocks"] = len(blocks)
-            
-            # Configure DSPy with the target model if specified
-            if target_model:
-                # Save current model
-                current_model = self.config["models"]["default"]
-                # Temporarily update the model
-                self._configure_dspy_with_model(target_model)
-                result["model"] = target_model
-            else:
-                result["model"] = self.config["models"]["default"]
-            
-            # Define the DSPy optimization module
-            class ModuleOptimizer(dspy.Module):
-                def __init__(self):
-                    super().__init__()
-                    self.optimizer = dspy.ChainOfThought(
-                        dspy.Predict("optimized_content")
-                    )
-                
-                def forward(self, content, guidelines):
-                    return self.optimizer(
-                        content=content,
-                        guidelines=guidelines
-                    )
-            
-            # Create optimization guidelines
-            optimization_guidelines = """
-            Please optimize the provided AI context module content. Your task is to:
-            1. Maintain all essential technical information
-            2. Improve clarity and conciseness
-            3. Preserve the original structure and formatting
-            4. Ensure the module remains accurate and aligned with its original purpose
-            5. Format important technical terms in code formatting using backticks (`) where appropriate
-            6. Preserve any existing code examples and format them properly
-            7. Provide detailed and complete information, as this will be used by an AI to answer questions
-            8. Structure the content to make it easy to understand and navigate
-            """
-            
-            # Initialize the optimizer
-            module_optimizer = ModuleOptimizer()
-            
-            # Process each block with DSPy
-            optimized_blocks = []
-            
-            for i, block in enumerate(blocks):
-                self.logger.info(f"Optimizing block {i+1}/{len(blocks)}")
-                
-                response = module_optimizer(
-                    content=block["content"],
-                    guidelines=optimization_guidelines
-                )
-                
-                optimized_blocks.append({
-                    "priority": block["priority"],
-                    "content": response.optimized_content
-                })
-            
-            # Reconstruct the optimized content
-            optimized_content = ""
-            for i, block in enumerate(optimized_blocks):
-                if i > 0:
-                    optimized_content += f"\n{separator}\n"
-                
-                # Add priority if it was in the original
-                if "priority" in block and block["priority"] != "medium":
-                    optimized_content += f"#priority: {block['priority']}\n\n"
-                
-                optimized_content += block["content"]
-            
-            result["optimized_content"] = optimized_content
-            result["optimized_tokens"] = len(optimized_content.split())
-            
-            # Calculate token reduction
-            original_tokens = result["original_tokens"]
-            optimized_tokens = result["optimized_tokens"]
-            token_reduction = ((original_tokens - optimized_tokens) / original_tokens) * 100 if original_tokens > 0 else 0
-            result["token_reduction"] = round(token_reduction, 2)
-            
-            # Save optimized content
-            os.makedirs(os.path.dirname(optimized_path), exist_ok=True)
-            with open(optimized_path, 'w', encoding='utf-8') as f:
-                f.write(optimized_content)
-            
-            # Generate diff
-            result["diff"] = self.generate_diff(original_path, optimized_path)
-            
-            # Run PromptFoo tests if enabled
-            if self.config.get("evaluation", {}).get("run_tests_after_optimize", False):
-                self.logger.info(f"Running PromptFoo tests for module {module_name}")
-                try:
-                    # Use the new CLI command for running tests
-                    module_base = os.path.splitext(module_name)[0]
-                    import subprocess
-                    
-                    # Run the test command using the new CLI integration
-                    cmd = ["dev", "context", "test", module_base]
-                    
-                    # Run the test
-                    process = subprocess.run(
-                        cmd,
-                        capture_output=True,
-                        text=True,
-                        check=False
-                    )
-                    
-                    # Store test results
-                    result["test_results"] = {
-                        "success": process.returncode == 0,
-                        "output": process.stdout,
-                        "error": process.stderr if process.returncode != 0 else None
-                    }
-                    
-                    if process.returncode == 0:
-                        self.logger.info(f"PromptFoo tests passed for module {module_name}")
-                    else:
-                        self.logger.warning(f"PromptFoo tests failed for module {module_name}")
-                except Exception as e:
-                    self.logger.warning(f"Error running PromptFoo tests: {str(e)}")
-                    result["test_results"] = {
-                        "success": False,
-                        "error": str(e)
-                    }
-            
-            result["success"] = True
-            self.logger.info(f"Successfully optimized module {module_name}")
-            self.logger.info(f"Token reduction: {token_reduction:.2f}%")
-            
-            # Reset DSPy to use the original model if changed
-            if target_model:
-                self._configure_dspy_with_model(current_model)
-            
-        except Exception as e:
-            error_msg = f"Error optimizing module {module_name}: {str(e)}"
-            self.logger.error(error_msg)
-            result["error"] = error_msg
-        
-        return result
-    
-    def _configure_dspy_with_model(self, model_name: str):
-        """Temporarily configure DSPy with a different model."""
-        # Find the model configuration
-        model_config = None
-        for model in self.config["models"]["options"]:
-            if model["name"] == model_name:
-                model_config = model
-                break
-        
-        if not model_config:
-            self.logger.warning(f"Model {model_name} not found in configuration, using default")
-            return
-        
-        # Configure DSPy based on the provider
-        provider = model_config.get("provider", "openai")
-        if provider == "openai":
-            dspy.settings.configure(
-                lm=dspy.OpenAI(
-                    model=model_config["name"],
-                    api_key=os.environ.get("OPENAI_API_KEY"),
-                    temperature=model_config.get("temperature", 0.2),
-                    max_tokens=model_config.get("max_tokens", 4096)
-                )
-            )
-        elif provider == "anthropic":
-            dspy.settings.configure(
-                lm=dspy.Anthropic(
-                    model=model_config["name"],
-                    api_key=os.environ.get("ANTHROPIC_API_KEY"),
-                    temperature=model_config.get("temperature", 0.2),
-                    max_tokens=model_config.get("max_tokens", 4096)
-                )
-            )
-        
-        self.logger.info(f"Reconfigured DSPy with model: {model_config['name']}")
-    
-    def generate_diff(self, original_path: str, optimized_path: str) -> str:
-        """Generate a unified diff between original and optimized files."""
-        with open(original_path, 'r', encoding='utf-8') as f:
-            original_lines = f.readlines()
-        
-        with open(optimized_path, 'r', encoding='utf-8') as f:
-            optimized_lines = f.readlines()
-        
-        diff = difflib.unified_diff(
-            original_lines,
-            optimized_lines,
-            fromfile=f"Original: {os.path.basename(original_path)}",
-            tofile=f"Optimized: {os.path.basename(optimized_path)}",
-            lineterm=''
-        )
-        
-        return '\n'.join(diff)
-
-    def batch_optimize(self, modules: Optional[List[str]] = None, 
-                     max_modules: int = 10, 
-                     target_model: Optional[str] = None) -> Dict[str, Any]:
-        """
-        Optimize multiple modules in batch mode.
-        
-        Args:
-            modules: List of module names to optimize (if None, all modules are considered)
-            max_modules: Maximum number of modules to optimize
-            target_model: Optional model to use for optimization
-            
-        Returns:
-            Dictionary with batch optimization results
-        """
-        if modules is None:
-            # Get all available modules
-            all_modules = self.list_modules()
-            modules = all_modules[:max_modules]
-        else:
-            # Ensure all modules have .md extension
-            modules = [m if m.endswith('.md') else f"{m}.md" for m in modules]
-            # Limit to max_modules
-            modules = modules[:max_modules]
-        
-        self.logger.info(f"Starting batch optimization of {len(modules)} modules")
-        
-        results = {
-            "timestamp": datetime.now().isoformat(),
-            "target_model": target_model or self.config["models"]["default"],
-            "total_modules": len(modules),
-            "successful": 0,
-            "failed": 0,
-            "modules": []
-        }
-        
-        for module_name in modules:
-            self.logger.info(f"Processing module: {module_name}")
-            
-            result = self.optimize_module(module_name, target_model)
-            results["modules"].append(result)
-            
-            if result["success"]:
-                results["successful"] += 1
-            else:
-                results["failed"] += 1
-        
-        # Calculate average token reduction for successful optimizations
-        successful_modules = [m for m in results["modules"] if m["success"]]
-        if successful_modules:
-            total_reduction = sum(m["token_reduction"] for m in successful_modules)
-            avg_reduction = total_reduction / len(successful_modules)
-            results["average_token_reduction"] = round(avg_reduction, 2)
-        else:
-            results["average_token_reduction"] = 0
-        
-        self.logger.info(f"Batch optimization completed: {results['successful']} successful, {results['failed']} failed")
-        if results["successful"] > 0:
-            self.logger.info(f"Average token reduction: {results.get('average_token_reduction', 0):.2f}%")
-        
-        return results
-
-class ContextEvaluator:
-    """Class for evaluating the quality of optimized context modules."""
-    
-    def __init__(self, config_path: str = "config/dsp_config.yaml"):
-        """Initialize the evaluator with the given configuration."""
-        self.optimizer = ContextOptimizer(config_path)
-        self.config = self.optimizer.config
-        self.logger = logging.getLogger(__name__)
-        
-        # Set up temporary directory for evaluations
-        self.temp_dir = tempfile.mkdtemp(prefix="context_eval_")
-        self.logger.info(f"Created temporary directory for evaluations: {self.temp_dir}")
-    
-    def __del__(self):
-        """Clean up temporary files when done."""
-        if hasattr(self, 'temp_dir') and os.path.exists(self.temp_dir):
-            shutil.rmtree(self.temp_dir)
-            self.logger.info(f"Removed temporary directory: {self.temp_dir}")
-    
-    def create_evaluation_config(self, 
-                                original_path: str, 
-                                optimized_path: str, 
-                                test_cases: List[Dict[str, str]],
-                                output_path: str) -> str:
-        """
-        Create a PromptFoo evaluation configuration.
-        
-        Args:
-            original_path: Path to the original module
-            optimized_path: Path to the optimized module
-            test_cases: List of test cases for evaluation
-            output_path: Path to save evaluation results
-            
-        Returns:
-            Path to the created configuration file
-        """
-        module_name = os.path.basename(original_path)
-        config_path = os.path.join(self.temp_dir, f"{os.path.splitext(module_name)[0]}_eval_config.yaml")
-        
-        # Read the module contents
-        with open(original_path, 'r', encoding='utf-8') as f:
-            original_content = f.read()
-        
-        with open(optimized_path, 'r', encoding='utf-8') as f:
-            optimized_content = f.read()
-        
-        # Create PromptFoo configuration
-        config = {
-            "prompts": [
-                {
-                    "name": "Original Module",
-                    "prompt": "{{prompt}}\n\nContext:\n{{context_original}}",
-                    "models": ["openai:gpt-4"]
-                },
-                {
-                    "name": "Optimized Module",
-                    "prompt": "{{prompt}}\n\nContext:\n{{context_optimized}}",
-                    "models": ["openai:gpt-4"]
-                }
-            ],
-            "providers": [
-                {
-                    "id": "openai",
-                    "config": {
-                        "apiKey": "env:OPENAI_API_KEY"
-                    }
-                }
-            ],
-            "tests": test_cases,
-            "outputPath": output_path,
-            "vars": {
-                "context_original": original_content,
-                "context_optimized": optimized_content
-            }
-        }
-        
-        # Write config to file
-        with open(config_path, 'w') as f:
-            yaml.dump(config, f)
-        
-        return config_path
-    
-    def generate_test_cases(self, module_content: str, max_cases: int = 5) -> List[Dict[str, str]]:
-        """
-        Generate test cases based on module content.
-        
-        Args:
-            module_content: Content of the module
-            max_cases: Maximum number of test cases to generate
-            
-        Returns:
-            List of test cases
-        """
-        # Extract key technical terms from content
-        key_terms = self._extract_key_terms(module_content)
-        
-        # Get test prompts from config
-        test_prompts = self.config["evaluation"]["test_prompts"]
-        
-        # Create test cases
-        test_cases = []
-        
-        # If we have key terms, create test cases for each
-        if key_terms:
-            for term in key_terms[:max_cases]:
-                prompt_template = test_prompts[len(test_cases) % len(test_prompts)]
-                prompt = prompt_template.replace("{subject}", term)
-                
-                test_case = {
-                    "vars": {
-                        "prompt": prompt
-                    },
-                    "assert": [
-                        {
-                            "type": "contains",
-                            "value": term
-                        },
-                        {
-                            "type": "similar",
-                            "threshold": 0.7
-                        }
-                    ]
-                }
-                test_cases.append(test_case)
-                
-                if len(test_cases) >= max_cases:
-                    break
-        
-        # If we couldn't create enough test cases, add generic ones
-        while len(test_cases) < max_cases:
-            idx = len(test_cases) % len(test_prompts)
-            generic_prompt = test_prompts[idx].replace("{subject}", "this topic")
-            
-            test_case = {
-                "vars": {
-                    "prompt": generic_prompt
-                },
-                "assert": [
-                    {
-                        "type": "similar",
-                        "threshold": 0.7
-                    }
-                ]
-            }
-            test_cases.append(test_case)
-        
-        return test_cases
-    
-    def _extract_key_terms(self, content: str) -> List[str]:
-        """Extract key technical terms from the module content."""
-        # Use a simple heuristic: look for terms in headings and code blocks
-        terms = []
-        
-        # Extract headings (###, ##)
-        heading_pattern = r'(?:^|\n)#{2,3}\s+([A-Za-z0-9\s_\-]+)'
-        headings = re.findall(heading_pattern, content)
-        terms.extend([h.strip() for h in headings if len(h.strip()) > 3])
-        
-        # Extract terms from code blocks (terms in backticks)
-        code_pattern = r'`([^`]+)`'
-        code_terms = re.findall(code_pattern, content)
-        terms.extend([t.strip() for t in code_terms if len(t.strip()) > 3])
-        
-        # Extract capitalized multi-word terms (likely technical terms)
-        cap_pattern = r'\b([A-Z][a-z]+(?:\s+[A-Z][a-z]+)+)\b'
-        cap_terms = re.findall(cap_pattern, content)
-        terms.extend([t.strip() for t in cap_terms if len(t.strip()) > 3])
-        
-        # Remove duplicates and limit to reasonable terms
-        unique_terms = list(set(terms))
-        return [t for t in unique_terms if 3 < len(t) < 30]
-    
-    def run_evaluation(self, config_path: str) -> Dict[str, Any]:
-        """
-        Run evaluation using PromptFoo.
-        
-        Args:
-            config_path: Path to PromptFoo configuration
-            
-        Returns:
-            Dictionary with evaluation results
-        """
-        import subprocess
-        import json
-        
-        output_path = os.path.join(self.temp_dir, "evaluation_results.json")
-        
-        # Prepare the command
-        cmd = [
-            "npx", 
-            "promptfoo", 
-            "eval", 
-            "-c", config_path,
-            "--output", output_path,
-            "--format", "json"
-        ]
-        
-        self.logger.info("Running evaluation with promptfoo")
-        
-        try:
-            # Run the command
-            subprocess.run(
-                cmd, 
-                check=True, 
-                stdout=subprocess.PIPE, 
-                stderr=subprocess.PIPE
-            )
-            
-            # Read the results
-            with open(output_path, 'r') as f:
-                results = json.load(f)
-            
-            # Process the results to calculate scores
-            original_scores = []
-            optimized_scores = []
-            
-            for test in results.get("results", []):
-                for output in test.get("outputs", []):
-                    # Check if this is from the original or optimized prompt
-                    prompt_name = output.get("prompt", {}).get("name", "")
-                    
-                    # Calculate score based on passing assertions
-                    total_assertions = len(output.get("assertions", []))
-                    passed_assertions = sum(1 for a in output.get("assertions", []) if a.get("passed", False))
-                    score = passed_assertions / total_assertions if total_assertions > 0 else 0
-                    
-                    if "Original" in prompt_name:
-                        original_scores.append(score)
-                    elif "Optimized" in prompt_name:
-                        optimized_scores.append(score)
-            
-            # Calculate average scores
-            avg_original = sum(original_scores) / len(original_scores) if original_scores else 0
-            avg_optimized = sum(optimized_scores) / len(optimized_scores) if optimized_scores else 0
-            
-            # Calculate improvement percentage
-            improvement = ((avg_optimized - avg_original) / avg_original) * 100 if avg_original > 0 else 0
-            
-            return {
-                "original_score": round(avg_original, 2),
-                "optimized_score": round(avg_optimized, 2),
-                "improvement": round(improvement, 2),
-                "raw_results": results
-            }
-            
-        except subprocess.CalledProcessError as e:
-            self.logger.error(f"Error running evaluation: {e}")
-            return {
-                "error": f"Evaluation failed: {str(e)}",
-                "original_score": 0,
-                "optimized_score": 0,
-                "improvement": 0
-            }
-        except Exception as e:
-            self.logger.error(f"Error processing evaluation results: {e}")
-            return {
-                "error": f"Error processing evaluation: {str(e)}",
-                "original_score": 0,
-                "optimized_score": 0,
-                "improvement": 0
-            }
-    
-    def evaluate_module(self, module_name: str) -> Dict[str, Any]:
-        """
-        Evaluate a single module's optimization quality.
-        
-        Args:
-            module_name: Name of the module to evaluate
-            
-        Returns:
-            Dictionary with evaluation results
-        """
-        # Ensure .md extension
-        if not module_name.endswith('.md'):
-            module_name = f"{module_name}.md"
-        
-        # Construct paths
-        original_path = os.path.join(self.optimizer.original_dir, module_name)
-        optimized_path = os.path.join(self.optimizer.optimized_dir, module_name)
-        
-        # Check if files exist
-        if not os.path.exists(original_path):
-            error_msg = f"Original module {module_name} not found"
-            self.logger.error(error_msg)
-            return {"success": False, "error": error_msg, "module_name": module_name}
-        
-        if not os.path.exists(optimized_path):
-            error_msg = f"Optimized module {module_name} not found"
-            self.logger.error(error_msg)
-            return {"success": False, "error": error_msg, "module_name": module_name}
-        
-        result = {
-            "module_name": module_name,
-            "success": False,
-            "original_path": original_path,
-            "optimized_path": optimized_path,
-            "error": None
-        }
-        
-        try:
-            self.logger.info(f"Evaluating module: {module_name}")
-            
-            # Read module content
-            with open(original_path, 'r', encoding='utf-8') as f:
-                original_content = f.read()
-            
-            # Generate test cases
-            max_cases = self.config["evaluation"]["promptfoo"]["vars"]["max_test_cases"]
-            test_cases = self.generate_test_cases(original_content, max_cases)
-            
-            # Create evaluation configuration
-            output_path = os.path.join(self.temp_dir, f"{os.path.splitext(module_name)[0]}_results.json")
-            config_path = self.create_evaluation_config(
-                original_path,
-                optimized_path,
-                test_cases,
-                output_path
-            )
-            
-            # Run evaluation
-            eval_results = self.run_evaluation(config_path)
-            
-            # Merge results
-            result.update(eval_results)
-            
-            # Set success flag
-            result["success"] = "error" not in eval_results
-            
-            if result["success"]:
-                self.logger.info(f"Evaluation completed: original score={result['original_score']}, " + 
-                                f"optimized score={result['optimized_score']}, " + 
-                                f"improvement={result['improvement']}%")
-            
-        except Exception as e:
-            error_msg = f"Error evaluating module {module_name}: {str(e)}"
-            self.logger.error(error_msg)
-            result["error"] = error_msg
-        
-        return result
-    
-    def batch_evaluate(self, modules: Optional[List[str]] = None) -> Dict[str, Any]:
-        """
-        Evaluate multiple modules in batch mode.
-        
-        Args:
-            modules: List of module names to evaluate (if None, all optimized modules are considered)
-            
-        Returns:
-            Dictionary with batch evaluation results
-        """
-        # If no modules specified, find all modules that have both original and optimized versions
-        if modules is None:
-            optimized_modules = [os.path.basename(f) for f in 
-                                glob.glob(os.path.join(self.optimizer.optimized_dir, "*.md"))]
-            
-            modules = []
-            for module in optimized_modules:
-                original_path = os.path.join(self.optimizer.original_dir, module)
-                if os.path.exists(original_path):
-                    modules.append(module)
-        else:
-            # Ensure all modules have .md extension
-            modules = [m if m.endswith('.md') else f"{m}.md" for m in modules]
-        
-        self.logger.info(f"Starting batch evaluation of {len(modules)} modules")
-        
-        results = {
-            "timestamp": datetime.now().isoformat(),
-            "total_evaluations": len(modules),
-            "successful_evaluations": 0,
-            "failed_evaluations": 0,
-            "improved_count": 0,
-            "regressed_count": 0,
-            "unchanged_count": 0,
-            "average_improvement": 0,
-            "improved_modules": [],
-            "regressed_modules": [],
-            "unchanged_modules": [],
-            "failed_modules": []
-        }
-        
-        for module_name in modules:
-            self.logger.info(f"Evaluating module: {module_name}")
-            
-            result = self.evaluate_module(module_name)
-            
-            if result["success"]:
-                results["successful_evaluations"] += 1
-                
-                # Categorize based on improvement
-                improvement = result.get("improvement", 0)
-                if improvement > 1:  # More than 1% improvement
-                    results["improved_count"] += 1
-                    results["improved_modules"].append(result)
-                elif improvement < -1:  # More than 1% regression
-                    results["regressed_count"] += 1
-                    results["regressed_modules"].append(result)
-                else:  # Roughly the same
-                    results["unchanged_count"] += 1
-                    results["unchanged_modules"].append(result)
-            else:
-                results["failed_evaluations"] += 1
-                results["failed_modules"].append(result)
-        
-        # Calculate average improvement for successful evaluations
-        successful_modules = results["improved_modules"] + results["regressed_modules"] + results["unchanged_modules"]
-        if successful_modules:
-            total_improvement = sum(m.get("improvement", 0) for m in successful_modules)
-            avg_improvement = total_improvement / len(successful_modules)
-            results["average_improvement"] = round(avg_improvement, 2)
-        
-        self.logger.info(f"Batch evaluation completed:")
-        self.logger.info(f"  - Total: {results['total_evaluations']}")
-        self.logger.info(f"  - Successful: {results['successful_evaluations']}")
-        self.logger.info(f"  - Improved: {results['improved_count']}")
-        self.logger.info(f"  - Regressed: {results['regressed_count']}")
-        self.logger.info(f"  - Unchanged: {results['unchanged_count']}")
-        self.logger.info(f"  - Average improvement: {results['average_improvement']:.2f}%")
-        
-        return results
-
 class ContextFeedback:
     """Class for collecting and managing feedback on context modules."""
     
@@ -932,13 +69,15 @@ class ContextFeedback:
         
         # Ensure directory exists
         os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        from lib.db import get_connection_manager
+        self._db = get_connection_manager(self.db_path)
         
         # Initialize database
         self._init_database()
     
     def _init_database(self):
         """Initialize the SQLite database."""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._db.connection()
         cursor = conn.cursor()
         
         # Create tables if they don't exist
@@ -967,7 +106,6 @@ class ContextFeedback:
         ''')
         
         conn.commit()
-        conn.close()
     
     def add_feedback(self, module_name: str, feedback_type: str, score: float, comments: str = ""):
         """
@@ -983,7 +121,7 @@ class ContextFeedback:
         if not module_name.endswith('.md'):
             module_name = f"{module_name}.md"
             
-        conn = sqlite3.connect(self.db_path)
+        conn = self._db.connection()
         cursor = conn.cursor()
         
         cursor.execute(
@@ -992,7 +130,6 @@ class ContextFeedback:
         )
         
         conn.commit()
-        conn.close()
         
         self.logger.info(f"Added {feedback_type} feedback for {module_name} with score {score}")
     
@@ -1007,7 +144,7 @@ class ContextFeedback:
             self.logger.warning(f"Skipping failed optimization for {result.get('module_name', 'unknown')}")
             return
         
-        conn = sqlite3.connect(self.db_path)
+        conn = self._db.connection()
         cursor = conn.cursor()
         
         cursor.execute(
@@ -1028,7 +165,6 @@ class ContextFeedback:
         )
         
         conn.commit()
-        conn.close()
         
         self.logger.info(f"Added optimization result for {result.get('module_name', 'unknown')}")
     
@@ -1042,9 +178,11 @@ class ContextFeedback:
         Returns:
             List of feedback entries
         """
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
+        import sqlite3
+        
+        conn = self._db.connection()
         cursor = conn.cursor()
+        cursor.row_factory = sqlite3.Row
         
         if module_name:
             if not module_name.endswith('.md'):
@@ -1058,7 +196,6 @@ class ContextFeedback:
             cursor.execute("SELECT * FROM feedback ORDER BY module_name, timestamp DESC")
         
         rows = cursor.fetchall()
-        conn.close()
         
         return [dict(row) for row in rows]
     
@@ -1072,9 +209,11 @@ class ContextFeedback:
         Returns:
             List of optimization result entries
         """
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
+        import sqlite3
+        
+        conn = self._db.connection()
         cursor = conn.cursor()
+        cursor.row_factory = sqlite3.Row
         
         if module_name:
             if not module_name.endswith('.md'):
@@ -1088,7 +227,6 @@ class ContextFeedback:
             cursor.execute("SELECT * FROM optimization_results ORDER BY module_name, timestamp DESC")
         
         rows = cursor.fetchall()
-        conn.close()
         
         return [dict(row) for row in rows]
     
@@ -1104,7 +242,7 @@ class ContextFeedback:
         Returns:
             List of module names that need optimization
         """
-        conn = sqlite3.connect(self.db_path)
+        conn = self._db.connection()
         cursor = conn.cursor()
         
         # Get all module names
@@ -1127,22 +265,37 @@ class ContextFeedback:
                     need_optimization.append(module)
                     self.logger.info(f"Module {module} needs optimization: avg score {avg_score:.2f} from {count} feedbacks")
         
-        conn.close()
         return need_optimization
     
-    def export_data(self, output_path: str = "data/feedback_export.json") -> str:
+    def export_data(self, output_path: str = "data/feedback_export.json", 
+                    since: Optional[str] = None) -> str:
         """
-        Export all data to a JSON file.
+        Export all data to a file.
+        
+        Paths ending in .ndjson/.jsonl (optionally .gz) or .parquet are streamed
+        from the database in batches; .json paths get a single JSON document.
         
         Args:
             output_path: Path to save the export
+            since: Cursor printed by the previous export, or a timestamp (streaming formats)
             
         Returns:
             Path to the exported file
         """
+        from lib.stream_export import StreamingExporter, detect_format
+        
         # Ensure directory exists
         os.makedirs(os.path.dirname(output_path), exist_ok=True)
         
+        if detect_format(output_path) != "json":
+            result = StreamingExporter(self._db.connection()).export(
+                output_path,
+                {"feedback": "timestamp", "optimization_results": "timestamp"},
+                since=since
+            )
+            self.logger.info(f"Exported feedback data to {output_path} (next --since cursor: {result['cursor']})")
+            return output_path
+        
         data = {
             "feedback": self.get_feedback(),
             "optimization_results": self.get_optimization_results(),
@@ -1181,6 +334,12 @@ def parse_arguments():
           
           # Identify modules that need optimization based on feedback
           python optimize_context.py identify
+          
+          # Show where the most recent traced run spent its time
+          python optimize_context.py trace
+          
+          # Re-optimize and re-evaluate modules as they are edited
+          python optimize_context.py watch
         ''')
     )
     
@@ -1194,6 +353,8 @@ def parse_arguments():
     optimize_parser = subparsers.add_parser('optimize', help='Optimize a single module')
     optimize_parser.add_argument('--module', required=True, help='Module name to optimize')
     optimize_parser.add_argument('--model', help='Model to use for optimization')
+    optimize_parser.add_argument('--block-workers', type=int, help='Number of context blocks to optimize concurrently')
+    optimize_parser.add_argument('--no-cache', action='store_true', help='Bypass the LLM response cache')
     optimize_parser.add_argument('--config', default='config/dsp_config.yaml', help='Path to config file')
     optimize_parser.add_argument('--output', help='Path to save optimization results JSON')
     
@@ -1202,6 +363,13 @@ def parse_arguments():
     batch_parser.add_argument('--modules', nargs='+', help='List of module names to optimize')
     batch_parser.add_argument('--max', type=int, default=5, help='Maximum number of modules to optimize')
     batch_parser.add_argument('--model', help='Model to use for optimization')
+    batch_parser.add_argument('--workers', type=int, help='Number of modules to optimize concurrently')
+    batch_parser.add_argument('--block-workers', type=int, help='Number of context blocks to optimize concurrently per module')
+    batch_parser.add_argument('--no-cache', action='store_true', help='Bypass the LLM response cache')
+    batch_parser.add_argument('--changed-only', action='store_true',
+                              help='Only optimize modules changed since their last successful optimization')
+    batch_parser.add_argument('--pack', action='store_true', default=None,
+                              help='Send small blocks from several modules in shared LLM requests')
     batch_parser.add_argument('--config', default='config/dsp_config.yaml', help='Path to config file')
     batch_parser.add_argument('--output', help='Path to save batch optimization results JSON')
     
@@ -1234,153 +402,425 @@ def parse_arguments():
     
     # Export feedback data command
     export_parser = subparsers.add_parser('export', help='Export feedback and optimization data')
-    export_parser.add_argument('--output', default='data/feedback_export.json', help='Path to save export JSON')
+    export_parser.add_argument('--output', default='data/feedback_export.json', 
+                               help='Path to save the export (.json, .ndjson[.gz] or .parquet)')
+    export_parser.add_argument('--since', help='Cursor printed by the previous export, or a timestamp (ndjson/parquet)')
     export_parser.add_argument('--config', default='config/dsp_config.yaml', help='Path to config file')
     
+    # Trace summary command
+    trace_parser = subparsers.add_parser('trace', help='Summarize the spans of a traced run')
+    trace_parser.add_argument('--trace-id', help='Trace to summarize (default: the most recent trace)')
+    trace_parser.add_argument('--config', default='config/dsp_config.yaml', help='Path to config file')
+    trace_parser.add_argument('--output', help='Path to save the trace summary JSON')
+    
+    # Watch command
+    watch_parser = subparsers.add_parser('watch', help='Re-optimize and re-evaluate modules as they are edited')
+    watch_parser.add_argument('--model', help='Model to use for optimization')
+    watch_parser.add_argument('--debounce', type=float,
+                              help='Seconds a module must go unchanged before it is processed')
+    watch_parser.add_argument('--interval', type=float, help='Seconds between checks for changes')
+    watch_parser.add_argument('--workers', type=int, help='Number of modules to process concurrently')
+    watch_parser.add_argument('--no-evaluate', action='store_true', help='Only count tokens and optimize')
+    watch_parser.add_argument('--no-cache', action='store_true', help='Bypass the LLM response cache')
+    watch_parser.add_argument('--config', default='config/dsp_config.yaml', help='Path to config file')
+    
     # Global options
     parser.add_argument('--log-level', default='info', 
                        choices=['debug', 'info', 'warning', 'error'], 
                        help='Logging level')
     parser.add_argument('--log-file', help='Log to file instead of console')
+    parser.add_argument('--no-daemon', action='store_true',
+                        help='Run locally even if an optimizer daemon is running (scripts/optimizer_daemon.py)')
     
     return parser.parse_args()
 
 
+def _daemon_client(args: argparse.Namespace):
+    """
+    Connect to an optimizer daemon serving the same configuration, if one is running.
+    
+    Returns:
+        Connected OptimizerClient, or None to run the command locally
+    """
+    if args.no_daemon:
+        return None
+    
+    from lib.optimizer_rpc import RPCError, connect_to_daemon, config_hash
+    
+    client = connect_to_daemon(load_config(args.config))
+    if client is None:
+        return None
+    
+    # Module and config paths are relative, so only share a daemon started alike
+    logger = logging.getLogger(__name__)
+    try:
+        status = client.ping()
+    except (OSError, RPCError):
+        client.close()
+        return None
+    if status["config_path"] != os.path.abspath(args.config) or status["cwd"] != os.getcwd():
+        logger.info("Optimizer daemon serves another configuration, running locally")
+        client.close()
+        return None
+    
+    # The daemon loads the configuration once, so it would ignore later edits
+    if status.get("config_hash") != config_hash(args.config):
+        logger.warning("Configuration changed since the optimizer daemon started, running locally; "
+                       "restart the daemon to use the new settings")
+        client.close()
+        return None
+    
+    return client
+
+
+# Command handlers. Each one builds only what its command needs, so commands
+# that never call a model don't load DSPy. Commands that do are forwarded to
+# the optimizer daemon when one is running.
+def cmd_list(args: argparse.Namespace) -> Optional[int]:
+    """List available modules."""
+    from lib.module_registry import get_registry
+    
+    config = load_config(args.config)
+    registry = get_registry(config['paths']['original_modules_dir'], exclude_dirs=())
+    registry.refresh()
+    # Top-level modules only, as ContextOptimizer.list_modules returns them
+    modules = [f"{name}.md" for name in registry.names() if "/" not in name]
+    
+    print(f"Found {len(modules)} modules:")
+    for module in modules:
+        print(f"  - {module}")
+
+
+def cmd_optimize(args: argparse.Namespace) -> Optional[int]:
+    """Optimize a single module."""
+    logger = logging.getLogger(__name__)
+    
+    client = _daemon_client(args)
+    if client is not None:
+        with client:
+            result = client.call("optimize", module=args.module, model=args.model,
+                                 block_workers=args.block_workers, use_cache=not args.no_cache)
+    else:
+        from context_pipeline import ContextOptimizer
+        optimizer = ContextOptimizer(args.config, use_cache=not args.no_cache)
+        result = optimizer.optimize_module(args.module, args.model, args.block_workers)
+    
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2)
+        logger.info(f"Saved optimization results to {args.output}")
+    
+    if result['success']:
+        print(f"Module {args.module} optimized successfully")
+        print(f"Token reduction: {result['token_reduction']:.2f}%")
+        print(f"Optimized file saved to: {result['optimized_path']}")
+    else:
+        print(f"Failed to optimize module {args.module}")
+        print(f"Error: {result.get('error', 'Unknown error')}")
+
+
+def cmd_batch_optimize(args: argparse.Namespace) -> Optional[int]:
+    """Optimize multiple modules."""
+    logger = logging.getLogger(__name__)
+    
+    client = _daemon_client(args)
+    if client is not None:
+        with client:
+            results = client.call("batch_optimize", modules=args.modules, max_modules=args.max,
+                                  model=args.model, workers=args.workers, block_workers=args.block_workers,
+                                  changed_only=args.changed_only, pack=args.pack, use_cache=not args.no_cache)
+    else:
+        from context_pipeline import ContextOptimizer
+        optimizer = ContextOptimizer(args.config, use_cache=not args.no_cache)
+        results = optimizer.batch_optimize(args.modules, args.max, args.model, args.workers,
+                                           args.block_workers, args.changed_only, args.pack)
+    
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        logger.info(f"Saved batch optimization results to {args.output}")
+    
+    print(f"Batch optimization completed:")
+    print(f"  - Total: {results['total_modules']}")
+    if args.changed_only:
+        print(f"  - Skipped (unchanged): {results['skipped_unchanged']}")
+    print(f"  - Successful: {results['successful']}")
+    print(f"  - Failed: {results['failed']}")
+    if results['successful'] > 0:
+        print(f"  - Average token reduction: {results['average_token_reduction']:.2f}%")
+    if 'cache' in results:
+        print(f"  - Cache hits: {results['cache']['hits']}/{results['cache']['hits'] + results['cache']['misses']}")
+    if 'packing' in results:
+        print(f"  - Packed requests: {results['packing']['requests']} "
+              f"({results['packing']['blocks']} blocks)")
+    print(f"  - Time: {results['timings']['total']:.2f}s (trace {results['trace_id']})")
+
+
+def cmd_evaluate(args: argparse.Namespace) -> Optional[int]:
+    """Evaluate a single optimized module."""
+    logger = logging.getLogger(__name__)
+    
+    client = _daemon_client(args)
+    if client is not None:
+        with client:
+            result = client.call("evaluate", module=args.module)
+    else:
+        from context_pipeline import ContextEvaluator
+        evaluator = ContextEvaluator(args.config)
+        result = evaluator.evaluate_module(args.module)
+    
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2)
+        logger.info(f"Saved evaluation results to {args.output}")
+    
+    if result['success']:
+        print(f"Module {args.module} evaluated successfully")
+        print(f"Original score: {result['original_score']:.2f}")
+        print(f"Optimized score: {result['optimized_score']:.2f}")
+        print(f"Improvement: {result['improvement']:.2f}%")
+    else:
+        print(f"Failed to evaluate module {args.module}")
+        print(f"Error: {result.get('error', 'Unknown error')}")
+
+
+def cmd_batch_evaluate(args: argparse.Namespace) -> Optional[int]:
+    """Evaluate multiple optimized modules."""
+    logger = logging.getLogger(__name__)
+    
+    client = _daemon_client(args)
+    if client is not None:
+        with client:
+            results = client.call("batch_evaluate", modules=args.modules)
+    else:
+        from context_pipeline import ContextEvaluator
+        evaluator = ContextEvaluator(args.config)
+        results = evaluator.batch_evaluate(args.modules)
+    
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        logger.info(f"Saved batch evaluation results to {args.output}")
+    
+    print(f"Batch evaluation completed:")
+    print(f"  - Total: {results['total_evaluations']}")
+    print(f"  - Successful: {results['successful_evaluations']}")
+    print(f"  - Improved: {results['improved_count']}")
+    print(f"  - Regressed: {results['regressed_count']}")
+    print(f"  - Unchanged: {results['unchanged_count']}")
+    print(f"  - Average improvement: {results['average_improvement']:.2f}%")
+
+
+def cmd_feedback(args: argparse.Namespace) -> Optional[int]:
+    """Record feedback for a module."""
+    feedback_manager = ContextFeedback(args.config)
+    feedback_manager.add_feedback(args.module, args.type, args.score, args.comments)
+    
+    print(f"Recorded {args.type} feedback for {args.module} with score {args.score}")
+
+
+def cmd_identify(args: argparse.Namespace) -> Optional[int]:
+    """Identify modules that need optimization."""
+    logger = logging.getLogger(__name__)
+    
+    feedback_manager = ContextFeedback(args.config)
+    modules = feedback_manager.identify_modules_for_optimization(
+        args.min_feedback, args.threshold
+    )
+    
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'modules_for_optimization': modules}, f, indent=2)
+        logger.info(f"Saved identification results to {args.output}")
+    
+    print(f"Found {len(modules)} modules that need optimization:")
+    for module in modules:
+        print(f"  - {module}")
+
+
+def cmd_trace(args: argparse.Namespace) -> Optional[int]:
+    """Summarize a trace from the feedback database."""
+    from lib.tracing import Tracer, summarize_spans, load_trace
+    
+    logger = logging.getLogger(__name__)
+    
+    config = load_config(args.config)
+    # Traces are written where the tracer writes them, which tracing settings can override
+    db_path = Tracer.from_config(config).db_path
+    if not db_path:
+        print("Traces are not saved to a database (tracing.export_to_database is false)")
+        return 1
+    
+    spans = load_trace(db_path, args.trace_id)
+    if not spans:
+        print("No traces found")
+        return 1
+    
+    summary = summarize_spans(spans)
+    
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'trace_id': spans[0]['trace_id'], 'spans': summary}, f, indent=2)
+        logger.info(f"Saved trace summary to {args.output}")
+    
+    print(f"Trace {spans[0]['trace_id']} ({len(spans)} spans):")
+    print(f"  {'span':<18}{'count':>7}{'total ms':>12}{'avg ms':>10}{'max ms':>10}{'errors':>8}")
+    for name, entry in sorted(summary.items(), key=lambda item: -item[1]['total_ms']):
+        print(f"  {name:<18}{entry['count']:>7}{entry['total_ms']:>12.1f}"
+              f"{entry['avg_ms']:>10.1f}{entry['max_ms']:>10.1f}{entry['errors']:>8}")
+
+
+def cmd_export(args: argparse.Namespace) -> Optional[int]:
+    """Export feedback and optimization data."""
+    feedback_manager = ContextFeedback(args.config)
+    output_path = feedback_manager.export_data(args.output, args.since)
+    
+    print(f"Exported feedback data to {output_path}")
+
+
+def cmd_watch(args: argparse.Namespace) -> Optional[int]:
+    """Re-run token counting, optimization and evaluation for modules as they are edited."""
+    from lib.module_registry import get_registry
+    from lib.module_watcher import ModuleWatcher, ModuleStatusTable, format_status_row
+    from lib.optimizer_rpc import OptimizerClient, socket_path_from_config
+    from lib.token_counter import counter_for_model
+    from concurrent.futures import ThreadPoolExecutor
+    
+    config = load_config(args.config)
+    watch_config = config.get("watch", {}) or {}
+    debounce = args.debounce if args.debounce is not None else watch_config.get("debounce_seconds", 2.0)
+    interval = args.interval if args.interval is not None else watch_config.get("poll_interval", 1.0)
+    workers = args.workers or watch_config.get("workers", 1)
+    evaluate = watch_config.get("evaluate", True) and not args.no_evaluate
+    
+    modules_dir = config['paths']['original_modules_dir']
+    watcher = ModuleWatcher(get_registry(modules_dir, exclude_dirs=()), debounce)
+    model_name = args.model or config["models"]["default"]
+    token_counter = counter_for_model(model_name, config)
+    
+    # Optimize and evaluate through the daemon when one serves this configuration
+    client = _daemon_client(args)
+    if client is not None:
+        client.close()
+        socket_path = socket_path_from_config(config)
+        
+        def call(method: str, **params) -> Dict[str, Any]:
+            with OptimizerClient(socket_path) as module_client:
+                return module_client.call(method, **params)
+    else:
+        # Shared by the workers: evaluations write PromptFoo output to a temp
+        # file per call, and a module is never processed by two workers at once
+        from context_pipeline import ContextOptimizer, ContextEvaluator
+        optimizer = ContextOptimizer(args.config, use_cache=not args.no_cache)
+        evaluator = ContextEvaluator(args.config) if evaluate else None
+        
+        def call(method: str, **params) -> Dict[str, Any]:
+            if method == "optimize":
+                return optimizer.optimize_module(params["module"], params["model"])
+            return evaluator.evaluate_module(params["module"])
+    
+    status = ModuleStatusTable()
+    live = sys.stdout.isatty()
+    output_lock = threading.Lock()
+    # Token counts are local, so they use this configuration's tokenizer even
+    # when a daemon optimizes with a different default model
+    tokenizer = f"Token counts use the {token_counter.encoding_name} tokenizer of {model_name}"
+    if client is not None and not args.model:
+        tokenizer += "; the daemon optimizes with its own default model"
+    header = f"Watching {modules_dir} (debounce {debounce}s, Ctrl+C to stop)\n{tokenizer}"
+    
+    def report(module: str, **fields: Any) -> None:
+        row = status.update(module, **fields)
+        with output_lock:
+            if live:
+                # Redraw the whole table in place
+                print(f"\033[H\033[2J{header}\n\n{status.render()}", flush=True)
+            else:
+                print(format_status_row(row), flush=True)
+    
+    def process(name: str) -> None:
+        module = f"{name}.md"
+        try:
+            with open(os.path.join(modules_dir, module), 'r', encoding='utf-8') as f:
+                tokens = token_counter.count(f.read())
+            report(name, state="optimizing", tokens=tokens, optimized_tokens=None,
+                   token_reduction=None, improvement=None, error=None)
+            
+            result = call("optimize", module=module, model=args.model, use_cache=not args.no_cache)
+            if not result["success"]:
+                report(name, state="failed", error=result.get("error"))
+                return
+            report(name, state="evaluating" if evaluate else "optimized",
+                   optimized_tokens=result["optimized_tokens"], token_reduction=result["token_reduction"])
+            
+            if evaluate:
+                evaluation = call("evaluate", module=module)
+                if evaluation["success"]:
+                    report(name, state="done", improvement=evaluation["improvement"])
+                else:
+                    report(name, state="eval failed", error=evaluation.get("error"))
+        except Exception as e:
+            report(name, state="failed", error=str(e))
+    
+    print(header if not live else f"\033[H\033[2J{header}", flush=True)
+    running: Dict[str, Any] = {}
+    executor = ThreadPoolExecutor(max_workers=workers)
+    try:
+        while True:
+            running = {name: future for name, future in running.items() if not future.done()}
+            ready, removed = watcher.poll(busy=set(running))
+            
+            for name in removed:
+                report(name, state="removed")
+            for name in ready:
+                report(name, state="queued")
+                running[name] = executor.submit(process, name)
+            
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        print(f"\nStopping; waiting for {len(running)} running modules")
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+COMMAND_HANDLERS = {
+    'list': cmd_list,
+    'optimize': cmd_optimize,
+    'batch-optimize': cmd_batch_optimize,
+    'evaluate': cmd_evaluate,
+    'batch-evaluate': cmd_batch_evaluate,
+    'feedback': cmd_feedback,
+    'identify': cmd_identify,
+    'trace': cmd_trace,
+    'export': cmd_export,
+    'watch': cmd_watch,
+}
+
+
 def main():
     """Main entry point for the script."""
     args = parse_arguments()
     
     # Setup logging
-    log_level = getattr(logging, args.log_level.upper())
-    setup_logging(log_level, args.log_file)
+    setup_logging(args.log_level.upper(), args.log_file)
     
     logger = logging.getLogger(__name__)
     logger.info(f"Starting command: {args.command}")
     
-    try:
-        if args.command == 'list':
-            # List available modules
-            optimizer = ContextOptimizer(args.config)
-            modules = optimizer.list_modules()
-            
-            print(f"Found {len(modules)} modules:")
-            for module in modules:
-                print(f"  - {module}")
-            
-        elif args.command == 'optimize':
-            # Optimize a single module
-            optimizer = ContextOptimizer(args.config)
-            result = optimizer.optimize_module(args.module, args.model)
-            
-            if args.output:
-                with open(args.output, 'w', encoding='utf-8') as f:
-                    json.dump(result, f, indent=2)
-                logger.info(f"Saved optimization results to {args.output}")
-            
-            if result['success']:
-                print(f"Module {args.module} optimized successfully")
-                print(f"Token reduction: {result['token_reduction']:.2f}%")
-                print(f"Optimized file saved to: {result['optimized_path']}")
-            else:
-                print(f"Failed to optimize module {args.module}")
-                print(f"Error: {result.get('error', 'Unknown error')}")
-            
-        elif args.command == 'batch-optimize':
-            # Batch optimize modules
-            optimizer = ContextOptimizer(args.config)
-            results = optimizer.batch_optimize(args.modules, args.max, args.model)
-            
-            if args.output:
-                with open(args.output, 'w', encoding='utf-8') as f:
-                    json.dump(results, f, indent=2)
-                logger.info(f"Saved batch optimization results to {args.output}")
-            
-            print(f"Batch optimization completed:")
-            print(f"  - Total: {results['total_modules']}")
-            print(f"  - Successful: {results['successful']}")
-            print(f"  - Failed: {results['failed']}")
-            if results['successful'] > 0:
-                print(f"  - Average token reduction: {results['average_token_reduction']:.2f}%")
-            
-        elif args.command == 'evaluate':
-            # Evaluate a single module
-            evaluator = ContextEvaluator(args.config)
-            result = evaluator.evaluate_module(args.module)
-            
-            if args.output:
-                with open(args.output, 'w', encoding='utf-8') as f:
-                    json.dump(result, f, indent=2)
-                logger.info(f"Saved evaluation results to {args.output}")
-            
-            if result['success']:
-                print(f"Module {args.module} evaluated successfully")
-                print(f"Original score: {result['original_score']:.2f}")
-                print(f"Optimized score: {result['optimized_score']:.2f}")
-                print(f"Improvement: {result['improvement']:.2f}%")
-            else:
-                print(f"Failed to evaluate module {args.module}")
-                print(f"Error: {result.get('error', 'Unknown error')}")
-            
-        elif args.command == 'batch-evaluate':
-            # Batch evaluate modules
-            evaluator = ContextEvaluator(args.config)
-            results = evaluator.batch_evaluate(args.modules)
-            
-            if args.output:
-                with open(args.output, 'w', encoding='utf-8') as f:
-                    json.dump(results, f, indent=2)
-                logger.info(f"Saved batch evaluation results to {args.output}")
-            
-            print(f"Batch evaluation completed:")
-            print(f"  - Total: {results['total_evaluations']}")
-            print(f"  - Successful: {results['successful_evaluations']}")
-            print(f"  - Improved: {results['improved_count']}")
-            print(f"  - Regressed: {results['regressed_count']}")
-            print(f"  - Unchanged: {results['unchanged_count']}")
-            print(f"  - Average improvement: {results['average_improvement']:.2f}%")
-            
-        elif args.command == 'feedback':
-            # Record feedback
-            feedback_manager = ContextFeedback(args.config)
-            feedback_manager.add_feedback(args.module, args.type, args.score, args.comments)
-            
-            print(f"Recorded {args.type} feedback for {args.module} with score {args.score}")
-            
-        elif args.command == 'identify':
-            # Identify modules that need optimization
-            feedback_manager = ContextFeedback(args.config)
-            modules = feedback_manager.identify_modules_for_optimization(
-                args.min_feedback, args.threshold
-            )
-            
-            if args.output:
-                with open(args.output, 'w', encoding='utf-8') as f:
-                    json.dump({'modules_for_optimization': modules}, f, indent=2)
-                logger.info(f"Saved identification results to {args.output}")
-            
-            print(f"Found {len(modules)} modules that need optimization:")
-            for module in modules:
-                print(f"  - {module}")
-            
-        elif args.command == 'export':
-            # Export feedback data
-            feedback_manager = ContextFeedback(args.config)
-            output_path = feedback_manager.export_data(args.output)
-            
-            print(f"Exported feedback data to {output_path}")
-            
-        else:
-            # No command or unknown command
-            print("No command specified. Use --help for usage information.")
+    handler = COMMAND_HANDLERS.get(args.command)
+    if handler is None:
+        # No command or unknown command
+        print("No command specified. Use --help for usage information.")
+        return 0
     
+    try:
+        return handler(args) or 0
     except Exception as e:
         logger.error(f"Error in command {args.command}: {str(e)}")
         print(f"Error: {str(e)}")
         import traceback
         logger.error(traceback.format_exc())
         return 1
-    
-    return 0
 
 
 if __name__ == "__main__":
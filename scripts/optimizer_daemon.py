@@ -0,0 +1,444 @@
+#!/usr/bin/env python3
+"""
+Optimizer Daemon
+
+This script runs a resident optimizer process that keeps DSPy loaded, LM
+clients connected and the response cache and databases open. It serves
+optimize, evaluate and feedback operations as JSON-RPC 2.0 over a Unix
+domain socket (see lib/optimizer_rpc.py), so repeated CLI calls skip
+interpreter startup, imports and configuration parsing.
+
+optimize_context.py forwards optimize, batch-optimize, evaluate and
+batch-evaluate to a running daemon started with the same configuration.
+"""
+
+import os
+import sys
+import time
+import json
+import signal
+import inspect
+import logging
+import argparse
+import threading
+import subprocess
+import socketserver
+import textwrap
+from typing import Any, Callable, Dict, List, Optional
+
+# Add the project root and scripts directory to the path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from lib.optimizer_rpc import (
+    OptimizerClient, RPCError, read_message, write_message, socket_path_from_config, config_hash,
+    INVALID_REQUEST, METHOD_NOT_FOUND, INVALID_PARAMS, INTERNAL_ERROR
+)
+from context_pipeline import ContextOptimizer, ContextEvaluator
+from optimize_context import ContextFeedback, load_config, setup_logging
+
+logger = logging.getLogger(__name__)
+
+
+class OptimizerService:
+    """
+    Operations served by the daemon.
+    
+    The optimizer, evaluator and feedback store are created on first use and
+    then shared by every request, so LM clients, compiled programs and
+    database connections stay warm between calls.
+    """
+    
+    def __init__(self, config_path: str):
+        """
+        Initialize the service.
+        
+        Args:
+            config_path: Path to the configuration file
+        """
+        self.config_path = os.path.abspath(config_path)
+        # Hashed before loading, so an edit made meanwhile still shows as a change
+        self.config_hash = config_hash(config_path)
+        self.config = load_config(config_path)
+        self.started = time.time()
+        self.requests = 0
+        self.active = 0
+        self.last_request = time.monotonic()
+        
+        self._lock = threading.Lock()
+        self._optimizers: Dict[bool, ContextOptimizer] = {}
+        self._evaluator: Optional[ContextEvaluator] = None
+        self._feedback: Optional[ContextFeedback] = None
+        
+        self.methods: Dict[str, Callable[..., Any]] = {
+            "ping": self.ping,
+            "stats": self.stats,
+            "list": self.list_modules,
+            "optimize": self.optimize,
+            "batch_optimize": self.batch_optimize,
+            "evaluate": self.evaluate,
+            "batch_evaluate": self.batch_evaluate,
+            "feedback": self.feedback,
+            "identify": self.identify,
+        }
+    
+    def _optimizer(self, use_cache: bool = True) -> ContextOptimizer:
+        with self._lock:
+            if use_cache not in self._optimizers:
+                self._optimizers[use_cache] = ContextOptimizer(self.config_path, use_cache=use_cache)
+            return self._optimizers[use_cache]
+    
+    def _get_evaluator(self) -> ContextEvaluator:
+        with self._lock:
+            if self._evaluator is None:
+                self._evaluator = ContextEvaluator(self.config_path)
+            return self._evaluator
+    
+    def _get_feedback(self) -> ContextFeedback:
+        with self._lock:
+            if self._feedback is None:
+                self._feedback = ContextFeedback(self.config_path)
+            return self._feedback
+    
+    def warm_up(self) -> None:
+        """Load DSPy and build the default model before the first request."""
+        self._optimizer()._configure_dspy()
+    
+    def dispatch(self, method: str, params: Any) -> Any:
+        """
+        Run a method with the request's parameters.
+        
+        Args:
+            method: Method name
+            params: Parameters object from the request
+        
+        Returns:
+            The method's result
+        
+        Raises:
+            RPCError: For unknown methods and invalid parameters
+        """
+        handler = self.methods.get(method)
+        if handler is None:
+            raise RPCError(METHOD_NOT_FOUND, f"Method not found: {method}")
+        
+        if params is None:
+            params = {}
+        if not isinstance(params, dict):
+            raise RPCError(INVALID_PARAMS, "params must be an object")
+        
+        try:
+            bound = inspect.signature(handler).bind(**params)
+        except TypeError as e:
+            raise RPCError(INVALID_PARAMS, f"Invalid params for {method}: {str(e)}")
+        
+        with self._lock:
+            self.requests += 1
+            self.active += 1
+        try:
+            return handler(*bound.args, **bound.kwargs)
+        finally:
+            with self._lock:
+                self.active -= 1
+                self.last_request = time.monotonic()
+    
+    def idle_seconds(self) -> float:
+        """Seconds since the last request finished, or 0 while requests are running."""
+        with self._lock:
+            return 0.0 if self.active else time.monotonic() - self.last_request
+    
+    def ping(self) -> Dict[str, Any]:
+        """Identify the daemon."""
+        return {
+            "pid": os.getpid(),
+            "config_path": self.config_path,
+            "config_hash": self.config_hash,
+            "cwd": os.getcwd(),
+            "uptime": round(time.time() - self.started, 3)
+        }
+    
+    def stats(self) -> Dict[str, Any]:
+        """Request counters and response cache statistics."""
+        optimizer = self._optimizers.get(True)
+        return {
+            **self.ping(),
+            "requests": self.requests,
+            "active": self.active,
+            "cache": optimizer.cache.stats() if optimizer and optimizer.cache else None
+        }
+    
+    def list_modules(self) -> List[str]:
+        return self._optimizer().list_modules()
+    
+    def optimize(self, module: str, model: Optional[str] = None, block_workers: Optional[int] = None,
+                 use_cache: bool = True) -> Dict[str, Any]:
+        return self._optimizer(use_cache).optimize_module(module, model, block_workers)
+    
+    def batch_optimize(self, modules: Optional[List[str]] = None, max_modules: int = 10,
+                       model: Optional[str] = None, workers: Optional[int] = None,
+                       block_workers: Optional[int] = None, changed_only: bool = False,
+                       pack: Optional[bool] = None, use_cache: bool = True) -> Dict[str, Any]:
+        return self._optimizer(use_cache).batch_optimize(modules, max_modules, model, workers,
+                                                         block_workers, changed_only, pack)
+    
+    def evaluate(self, module: str) -> Dict[str, Any]:
+        return self._get_evaluator().evaluate_module(module)
+    
+    def batch_evaluate(self, modules: Optional[List[str]] = None) -> Dict[str, Any]:
+        return self._get_evaluator().batch_evaluate(modules)
+    
+    def feedback(self, module: str, type: str, score: float, comments: str = "") -> Dict[str, Any]:
+        self._get_feedback().add_feedback(module, type, score, comments)
+        return {"module": module, "type": type, "score": score}
+    
+    def identify(self, min_feedback: int = 3, threshold: float = 6.0) -> List[str]:
+        return self._get_feedback().identify_modules_for_optimization(min_feedback, threshold)
+
+
+class RequestHandler(socketserver.StreamRequestHandler):
+    """Serves JSON-RPC requests on one connection until the client disconnects."""
+    
+    def handle(self) -> None:
+        service: OptimizerService = self.server.service
+        
+        while True:
+            request_id = None
+            try:
+                request = read_message(self.rfile)
+                if request is None:
+                    return
+                
+                request_id = request.get("id")
+                method = request.get("method")
+                if not isinstance(method, str):
+                    raise RPCError(INVALID_REQUEST, "Request has no method")
+                
+                response = {"jsonrpc": "2.0", "id": request_id,
+                            "result": service.dispatch(method, request.get("params"))}
+            except RPCError as e:
+                response = {"jsonrpc": "2.0", "id": request_id, "error": e.to_dict()}
+            except Exception as e:
+                logger.exception(f"Error handling request {request_id}")
+                response = {"jsonrpc": "2.0", "id": request_id,
+                            "error": RPCError(INTERNAL_ERROR, str(e)).to_dict()}
+            
+            try:
+                write_message(self.wfile, response)
+            except OSError:
+                return
+
+
+class OptimizerDaemon(socketserver.ThreadingUnixStreamServer):
+    """Unix socket server running each connection on its own thread."""
+    
+    daemon_threads = True
+    
+    def __init__(self, socket_path: str, service: OptimizerService, idle_timeout: float = 0):
+        """
+        Bind the socket.
+        
+        Args:
+            socket_path: Path to the Unix socket
+            service: Service handling the requests
+            idle_timeout: Seconds without requests before the daemon exits (0 = never)
+        """
+        self.service = service
+        self.idle_timeout = idle_timeout
+        
+        # Only the owner may connect
+        old_umask = os.umask(0o177)
+        try:
+            super().__init__(socket_path, RequestHandler)
+        finally:
+            os.umask(old_umask)
+        
+        self._register_shutdown()
+    
+    def _register_shutdown(self) -> None:
+        """Register the shutdown method, which needs the server."""
+        def shutdown() -> Dict[str, Any]:
+            # Answer first; shutdown() waits for serve_forever to return
+            threading.Thread(target=self.shutdown, daemon=True).start()
+            return {"stopping": True, "pid": os.getpid()}
+        
+        self.service.methods["shutdown"] = shutdown
+    
+    def watch_idle(self) -> None:
+        """Shut down once no request has arrived for idle_timeout seconds."""
+        while True:
+            time.sleep(min(self.idle_timeout, 1.0))
+            if self.service.idle_seconds() > self.idle_timeout:
+                logger.info(f"No requests for {self.idle_timeout}s, shutting down")
+                self.shutdown()
+                return
+
+
+def serve(config_path: str, socket_path: Optional[str] = None, idle_timeout: Optional[float] = None) -> int:
+    """
+    Run the daemon in the foreground until it is stopped.
+    
+    Args:
+        config_path: Path to the configuration file
+        socket_path: Socket path (defaults to daemon.socket_path)
+        idle_timeout: Seconds without requests before exiting (defaults to daemon.idle_timeout)
+    
+    Returns:
+        Exit code
+    """
+    config = load_config(config_path)
+    daemon_config = config.get("daemon", {}) or {}
+    socket_path = socket_path or socket_path_from_config(config)
+    if idle_timeout is None:
+        idle_timeout = daemon_config.get("idle_timeout", 0)
+    
+    if OptimizerClient(socket_path).is_running():
+        logger.error(f"An optimizer daemon is already listening on {socket_path}")
+        return 1
+    if os.path.exists(socket_path):
+        # Left behind by a daemon that did not shut down cleanly
+        os.unlink(socket_path)
+    if os.path.dirname(socket_path):
+        os.makedirs(os.path.dirname(socket_path), exist_ok=True)
+    
+    service = OptimizerService(config_path)
+    started = time.perf_counter()
+    service.warm_up()
+    logger.info(f"Warmed up in {time.perf_counter() - started:.2f}s")
+    
+    server = OptimizerDaemon(socket_path, service, idle_timeout)
+    
+    def stop(signum, frame):
+        threading.Thread(target=server.shutdown, daemon=True).start()
+    
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    
+    if idle_timeout:
+        threading.Thread(target=server.watch_idle, name="idle-watch", daemon=True).start()
+    
+    logger.info(f"Optimizer daemon {os.getpid()} listening on {socket_path}")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        logger.info("Optimizer daemon stopped")
+    
+    return 0
+
+
+def start_background(args: argparse.Namespace, socket_path: str, wait: float = 60.0) -> int:
+    """Start the daemon as a detached process and wait until it answers."""
+    command = [sys.executable, os.path.abspath(__file__), "--log-level", args.log_level,
+               "--log-file", args.log_file or "logs/optimizer_daemon.log",
+               "start", "--config", args.config]
+    if args.socket:
+        command += ["--socket", args.socket]
+    if args.idle_timeout is not None:
+        command += ["--idle-timeout", str(args.idle_timeout)]
+    
+    process = subprocess.Popen(command, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                               stderr=subprocess.DEVNULL, start_new_session=True)
+    
+    deadline = time.monotonic() + wait
+    client = OptimizerClient(socket_path)
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            print(f"Optimizer daemon exited with code {process.returncode}")
+            return 1
+        if client.is_running():
+            client.close()
+            print(f"Optimizer daemon {process.pid} listening on {socket_path}")
+            return 0
+        time.sleep(0.1)
+    
+    print(f"Optimizer daemon did not start within {wait:.0f}s")
+    return 1
+
+
+def parse_arguments():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(
+        description="Resident optimizer process serving JSON-RPC over a Unix socket",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=textwrap.dedent('''
+        Examples:
+          # Start the daemon in the background
+          python optimizer_daemon.py start --background
+          
+          # Call a method directly
+          python optimizer_daemon.py call optimize '{"module": "introduction.md"}'
+          
+          # Show request counts and cache statistics, then stop the daemon
+          python optimizer_daemon.py status
+          python optimizer_daemon.py stop
+        ''')
+    )
+    parser.add_argument('--log-level', choices=['debug', 'info', 'warning', 'error'], default='info',
+                        help='Logging level')
+    parser.add_argument('--log-file', help='Path to log file')
+    
+    subparsers = parser.add_subparsers(dest='command', help='Command to execute')
+    
+    start_parser = subparsers.add_parser('start', help='Start the daemon')
+    start_parser.add_argument('--background', action='store_true', help='Detach and return once the daemon answers')
+    start_parser.add_argument('--idle-timeout', type=float,
+                              help='Seconds without requests before exiting (0 = never)')
+    
+    subparsers.add_parser('stop', help='Stop the daemon')
+    subparsers.add_parser('status', help='Show whether the daemon is running, with its statistics')
+    
+    call_parser = subparsers.add_parser('call', help='Call a daemon method and print the JSON result')
+    call_parser.add_argument('method', help='Method name (e.g. optimize, evaluate, feedback, identify)')
+    call_parser.add_argument('params', nargs='?', default='{}', help='Parameters as a JSON object')
+    
+    for subparser in subparsers.choices.values():
+        subparser.add_argument('--config', default='config/dsp_config.yaml', help='Path to config file')
+        subparser.add_argument('--socket', help='Socket path (defaults to daemon.socket_path)')
+    
+    return parser.parse_args()
+
+
+def main():
+    """Main entry point for the script."""
+    args = parse_arguments()
+    setup_logging(args.log_level.upper(), args.log_file)
+    
+    if args.command is None:
+        print("No command specified. Use --help for usage information.")
+        return 0
+    
+    socket_path = args.socket or socket_path_from_config(load_config(args.config))
+    
+    if args.command == 'start':
+        if args.background:
+            return start_background(args, socket_path)
+        return serve(args.config, socket_path, args.idle_timeout)
+    
+    with OptimizerClient(socket_path) as client:
+        if not client.is_running():
+            print(f"No optimizer daemon is listening on {socket_path}")
+            return 1
+        
+        try:
+            if args.command == 'stop':
+                result = client.call("shutdown")
+                print(f"Stopped optimizer daemon {result['pid']}")
+            elif args.command == 'status':
+                print(json.dumps(client.call("stats"), indent=2))
+            elif args.command == 'call':
+                params = json.loads(args.params)
+                if not isinstance(params, dict):
+                    print("Error: params must be a JSON object")
+                    return 1
+                print(json.dumps(client.call(args.method, **params), indent=2, default=str))
+        except RPCError as e:
+            print(f"Error: {e.message}")
+            return 1
+    
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,65 @@
+"""
+Tests for buffered feedback ingestion (feedback_system.BufferedFeedbackWriter).
+
+Run with: python -m unittest discover tests
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from feedback_system import ContextFeedback
+
+
+def make_events(count, module_name="module.md"):
+    return [
+        {"module_name": module_name, "model_used": "gpt-4", "feedback_type": "positive",
+         "feedback_detail": f"event {i}"}
+        for i in range(count)
+    ]
+
+
+class BufferedFeedbackWriterTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.feedback = ContextFeedback(os.path.join(self.tmp_dir.name, "feedback.db"))
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def stored_rows(self):
+        conn = self.feedback._db.connection()
+        return conn.execute("SELECT COUNT(*) FROM module_feedback").fetchone()[0]
+
+    def test_event_missing_required_field_is_rejected(self):
+        events = make_events(100)
+        events.insert(50, {"module_name": "module.md", "feedback_type": "negative"})
+
+        with self.feedback.buffered_writer(max_batch_size=500, flush_interval=60) as writer:
+            queued = writer.submit_many(events)
+
+        self.assertEqual(queued, 100)
+        self.assertEqual(writer.metrics()["written"], 100)
+        self.assertEqual(writer.metrics()["failed"], 1)
+        self.assertEqual(self.stored_rows(), 100)
+
+    def test_failed_insert_only_drops_bad_rows(self):
+        events = make_events(100)
+        # Passes validation, but SQLite cannot bind a dict
+        events.insert(50, {"module_name": "module.md", "model_used": "gpt-4",
+                           "feedback_type": "negative", "feedback_detail": {"nested": True}})
+
+        with self.feedback.buffered_writer(max_batch_size=500, flush_interval=60) as writer:
+            writer.submit_many(events)
+
+        self.assertEqual(writer.metrics()["written"], 100)
+        self.assertEqual(writer.metrics()["failed"], 1)
+        self.assertEqual(self.stored_rows(), 100)
+
+
+if __name__ == "__main__":
+    unittest.main()